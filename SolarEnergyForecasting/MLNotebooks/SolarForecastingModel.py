@@ -8,114 +8,46 @@ import seaborn as sns
 from datetime import datetime, timedelta
 import json
 import os
-from azure.storage.blob import BlobServiceClient
-from sklearn.model_selection import train_test_split
+import joblib
+from blob_loader import get_container_client, iter_blob_records
+from features import FeaturePipeline, feature_sidecar_path, materialize_features
+from flat_forest import export_forest, flat_model_path
+from prophet_model import fit_prophet, future_frame, load_previous, prophet_frame, prophet_model_path
+from site_registry import load_site_registry
+from training import RF_PARAMS, generate_synthetic_solar_data, recent_window, time_holdout_split, warm_start_base, warm_start_forest
+from weather_processing import clean_weather_data, process_weather_data
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from prophet import Prophet
+from prophet.serialize import model_to_json
 
 # Set display options
 pd.set_option('display.max_columns', None)
 sns.set(style="whitegrid")
 
-# Connect to Azure Storage
-connection_string = os.environ["STORAGE_CONNECTION_STRING"]
-container_name = "solar-data"
-blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-container_client = blob_service_client.get_container_client(container_name)
-
-# Function to load data from blob storage
-def load_data_from_blob(location_name):
-    data_list = []
-    
-    # List blobs in the location folder
-    location_prefix = f"{location_name}/"
-    blobs = container_client.list_blobs(name_starts_with=location_prefix)
-    
-    for blob in blobs:
-        blob_client = container_client.get_blob_client(blob.name)
-        data = json.loads(blob_client.download_blob().readall())
-        data_list.append(data)
-    
-    return data_list
-
-# Load data for location
-location_name = "solar_farm_1"  # Change as needed
-raw_data = load_data_from_blob(location_name)
-
-print(f"Loaded {len(raw_data)} data points for {location_name}")
-
-# Function to process raw data into a clean DataFrame
-def process_weather_data(raw_data):
-    records = []
-    
-    for entry in raw_data:
-        # Current weather
-        current = entry.get('current', {})
-        timestamp = datetime.fromisoformat(entry.get('timestamp').replace('Z', '+00:00'))
-        
-        record = {
-            'timestamp': timestamp,
-            'location': entry.get('location'),
-            'temperature': current.get('temperature'),
-            'cloud_cover': current.get('clouds'),
-            'wind_speed': current.get('wind_speed'),
-            'weather_description': current.get('weather_description')
-        }
-        
-        records.append(record)
-        
-        # Process forecast entries
-        for forecast in entry.get('forecast', []):
-            forecast_time = datetime.fromtimestamp(forecast.get('dt'))
-            
-            forecast_record = {
-                'timestamp': forecast_time,
-                'location': entry.get('location'),
-                'temperature': forecast.get('main', {}).get('temp'),
-                'cloud_cover': forecast.get('clouds', {}).get('all'),
-                'wind_speed': forecast.get('wind', {}).get('speed'),
-                'weather_description': forecast.get('weather', [{}])[0].get('description'),
-                'is_forecast': True
-            }
-            
-            records.append(forecast_record)
-    
-    df = pd.DataFrame(records)
-    return df
+# Connect to Azure Storage, or to a local folder standing in for the container
+container_client = get_container_client("solar-data")
+
+# Load data for a site from the registry (set SITE_NAME to pick another one)
+registry = load_site_registry()
+location_name = os.environ.get("SITE_NAME", registry.names()[0])
+site = registry.get(location_name)
+
+# Records are downloaded concurrently and streamed straight into processing below;
+# blobs already in the local cache (same name and etag) are not fetched again.
+# Pass start_date/end_date (YYYY-MM-DD) to only read part of the history.
+raw_data = iter_blob_records(container_client, location_name,
+                             keep_fields=['timestamp', 'location', 'current', 'forecast'])
 
 # Process the data
-weather_df = process_weather_data(raw_data)
+# One observation per hour and only the freshest forecast per target hour (see clean_weather_data)
+weather_df = clean_weather_data(process_weather_data(raw_data))
 print(f"Processed data shape: {weather_df.shape}")
 weather_df.head()
 
 # Load sample solar production data
 # In a real project, you would load actual solar production data
 # For this example, we'll create synthetic data based on weather conditions
-
-def generate_synthetic_solar_data(weather_df):
-    # Filter out forecast data
-    actual_weather = weather_df[weather_df.get('is_forecast', False) == False].copy()
-    
-    # Simple model: more sun (less cloud) = more energy
-    # Temperature also affects panel efficiency
-    actual_weather['solar_energy_kwh'] = (
-        (100 - actual_weather['cloud_cover']) / 100 * 
-        (1 + (actual_weather['temperature'] - 25) * 0.005) *  # Temperature coefficient
-        100  # Base energy for a 100kW installation
-    )
-    
-    # Add noise to make it more realistic
-    actual_weather['solar_energy_kwh'] += np.random.normal(0, 5, size=len(actual_weather))
-    
-    # No production at night (simplification)
-    actual_weather['hour'] = actual_weather['timestamp'].dt.hour
-    night_mask = (actual_weather['hour'] < 6) | (actual_weather['hour'] > 18)
-    actual_weather.loc[night_mask, 'solar_energy_kwh'] = 0
-    
-    return actual_weather
-
-solar_df = generate_synthetic_solar_data(weather_df)
+solar_df = generate_synthetic_solar_data(weather_df, site['capacity_kw'], site['lat'], site['lon'])
 print(f"Solar data shape: {solar_df.shape}")
 solar_df.head()
 
@@ -143,66 +75,57 @@ plt.show()
 
 # Feature Engineering
 
-def engineer_features(df):
-    # Extract time components
-    df['hour'] = df['timestamp'].dt.hour
-    df['day'] = df['timestamp'].dt.day
-    df['month'] = df['timestamp'].dt.month
-    df['year'] = df['timestamp'].dt.year
-    df['dayofweek'] = df['timestamp'].dt.dayofweek
-    
-    # Time features: sin and cos transformations for cyclical features
-    df['hour_sin'] = np.sin(2 * np.pi * df['hour'] / 24)
-    df['hour_cos'] = np.cos(2 * np.pi * df['hour'] / 24)
-    df['month_sin'] = np.sin(2 * np.pi * df['month'] / 12)
-    df['month_cos'] = np.cos(2 * np.pi * df['month'] / 12)
-    
-    # Weather description encoding (one-hot)
-    if 'weather_description' in df.columns:
-        weather_dummies = pd.get_dummies(df['weather_description'], prefix='weather')
-        df = pd.concat([df, weather_dummies], axis=1)
-    
-    return df
-
-solar_df = engineer_features(solar_df)
+# The one-hot vocabulary starts from the one saved with the previous model, so the
+# feature snapshot stays valid and only rows new since the last run are engineered
+model_file = "solar_forecast_rf_model.joblib"
+feature_pipeline = FeaturePipeline.for_model(model_file).fit(solar_df)
+solar_df = materialize_features(solar_df, feature_pipeline, f"features/{location_name}.parquet")
 print(f"Data shape after feature engineering: {solar_df.shape}")
 solar_df.head()
 
 # Train-Test Split for Model Training
 
-# Select features and target
-features = ['temperature', 'cloud_cover', 'wind_speed', 
-            'hour_sin', 'hour_cos', 'month_sin', 'month_cos']
-
-# Add weather dummies if they exist
-weather_cols = [col for col in solar_df.columns if col.startswith('weather_')]
-features.extend(weather_cols)
+# Select features and target (the pipeline's fixed feature list, weather dummies included)
+features = feature_pipeline.feature_names
 
 X = solar_df[features]
 y = solar_df['solar_energy_kwh']
 
-# Split data
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42
-)
+# Split data: the most recent 20% of hours is the test set, so the model is never
+# trained on hours after the ones it is scored on (backtest.py runs several such
+# folds and searches the RF and Prophet hyperparameters)
+train_df, test_df = time_holdout_split(solar_df)
+X_train, X_test = train_df[features], test_df[features]
+y_train, y_test = train_df['solar_energy_kwh'], test_df['solar_energy_kwh']
 
 print(f"Training set: {X_train.shape}, Test set: {X_test.shape}")
 
 # Train Random Forest Model
-rf_model = RandomForestRegressor(
-    n_estimators=100, 
-    max_depth=15,
-    random_state=42,
-    n_jobs=-1
-)
-
-rf_model.fit(X_train, y_train)
+# RETRAIN_MODE=warm_start keeps the previous forest and adds trees fitted on the
+# last RETRAIN_WINDOW_DAYS of data instead of refitting on all history.
+# See retrain.py to compare strategies (fit time, memory, holdout error).
+retrain_mode = os.environ.get("RETRAIN_MODE", "full")
+previous_model = None
+if retrain_mode == "warm_start" and os.path.exists(model_file):
+    # A changed feature set (e.g. a new weather description) or a saved hist_gb
+    # model needs a full refit
+    previous_model = warm_start_base(joblib.load(model_file), features)
+
+if previous_model is not None:
+    recent = recent_window(train_df, int(os.environ.get("RETRAIN_WINDOW_DAYS", 14)))
+    rf_model = warm_start_forest(previous_model, recent[features], recent['solar_energy_kwh'])
+    print(f"Warm start: added trees on {len(recent)} recent rows, forest now {len(rf_model.estimators_)} trees")
+else:
+    # RF_PARAMS_JSON overrides the defaults, e.g. with the best parameters from backtest.py
+    rf_model = RandomForestRegressor(**{**RF_PARAMS, **json.loads(os.environ.get("RF_PARAMS_JSON", "{}"))})
+
+    rf_model.fit(X_train, y_train)
 
 # Evaluate the model
 y_pred = rf_model.predict(X_test)
 
 mae = mean_absolute_error(y_test, y_pred)
-rmse = mean_squared_error(y_test, y_pred, squared=False)
+rmse = np.sqrt(mean_squared_error(y_test, y_pred))
 r2 = r2_score(y_test, y_pred)
 
 print(f"Model Performance:")
@@ -222,50 +145,34 @@ plt.title('Feature Importance')
 plt.tight_layout()
 plt.show()
 
-# Save the model
-import joblib
-model_file = "solar_forecast_rf_model.joblib"
+# Save the model, with its feature pipeline alongside for score.py
 joblib.dump(rf_model, model_file)
+feature_pipeline.save(feature_sidecar_path(model_file))
+# Memory-mappable copy for the scoring endpoint (see flat_forest.py)
+export_forest(rf_model, flat_model_path(model_file))
 print(f"Model saved to {model_file}")
 
 # Time Series Forecasting with Prophet
 
-# Prepare data for Prophet (requires 'ds' and 'y' columns)
-prophet_df = solar_df[['timestamp', 'solar_energy_kwh']].copy()
-prophet_df.columns = ['ds', 'y']
-
-# Filter for complete days only
-prophet_df = prophet_df.sort_values('ds')
-
-# Initialize and train Prophet model
-m = Prophet(
-    daily_seasonality=True,
-    yearly_seasonality=True,
-    weekly_seasonality=True
-)
+# Prepare data for Prophet (requires 'ds' and 'y' columns; ds is tz-naive UTC)
+prophet_df = prophet_frame(solar_df)
 
-# Add weather as regressors
-for feature in ['temperature', 'cloud_cover', 'wind_speed']:
-    if feature in solar_df.columns:
-        prophet_df[feature] = solar_df[feature].values
-        m.add_regressor(feature)
+# Fit with weather regressors, warm-started from the previous run's model if there is one
+prophet_file = prophet_model_path("models", location_name)
+m, prophet_seconds = fit_prophet(prophet_df, load_previous(prophet_file))
+print(f"Prophet fit in {prophet_seconds:.1f}s")
 
-m.fit(prophet_df)
-
-# Create a dataframe for future predictions
-future = m.make_future_dataframe(periods=24*7, freq='H')  # 7 days ahead
-
-# Add the regressor values for the forecast period
-# In a real application, you would use weather forecast data
-for feature in ['temperature', 'cloud_cover', 'wind_speed']:
-    if feature in solar_df.columns:
-        # This is a simplification - in reality you'd use actual forecasts
-        # Here we're just using the last 24*7 values as a placeholder
-        future[feature] = list(solar_df[feature].values) + list(solar_df[feature].values[-24*7:])
+# 7 days ahead; future regressors come from the latest stored weather forecast
+future = future_frame(m, prophet_df, weather_df, periods=24*7)
 
 # Make the forecast
 forecast = m.predict(future)
 
+os.makedirs("models", exist_ok=True)
+with open(prophet_file, 'w') as f:
+    f.write(model_to_json(m))
+print(f"Prophet model saved to {prophet_file}")
+
 # Plot the forecast
 fig = m.plot(forecast)
 plt.title('Solar Energy Production Forecast')
@@ -0,0 +1,274 @@
+# Rolling-origin backtesting and hyperparameter search for the RF and Prophet models
+# A random train/test split lets a time series model train on hours after the
+# ones it is scored on. Here every fold trains on all history up to an origin and
+# is scored on the next --horizon-days; origins step back from the newest data:
+#
+#   fold 0: [train ..........]  [test]
+#   fold 1: [train ..................]  [test]
+#   fold 2: [train ..........................]  [test]
+#
+# Rows are sorted by time once and written as .npy files (X, y, timestamps), so
+# every fold's train/test matrices are row ranges of the same memory-mapped
+# arrays: materialized once, shared by every candidate and worker process through
+# the page cache, and reused by later runs on unchanged data.
+#
+# Candidates run in parallel across a process pool, one (candidate, fold) per
+# task, fold by fold from the oldest (cheapest) fold. After each fold only the
+# best --keep-fraction of each model family (by mean MAE so far) goes on to the
+# next one; the rest are recorded as pruned. Prophet is scored with the observed
+# weather as its regressors, so its error is a lower bound on what it would get
+# with forecast weather.
+# Usage:
+#   python backtest.py [--site solar_farm_1] [--models rf prophet] [--folds 4]
+#                      [--horizon-days 7] [--min-train-days 14] [--workers 4]
+#                      [--keep-fraction 0.5] [--grid grid.json] [--output backtest_results.csv]
+# Set LOCAL_BLOB_ROOT to read from a local folder instead of Azure Storage.
+
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+from training import fit_full_forest
+
+MODELS = ('rf', 'prophet')
+
+# Search spaces: every combination is a candidate. Override with --grid, a JSON
+# file shaped like {"rf": {...}, "prophet": {...}}.
+RF_GRID = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [10, 15, None],
+    'min_samples_leaf': [1, 5]
+}
+PROPHET_GRID = {
+    'changepoint_prior_scale': [0.01, 0.05, 0.5],
+    'seasonality_prior_scale': [1.0, 10.0]
+}
+
+# Prophet regressors, taken from the feature matrix columns of the same name
+PROPHET_REGRESSORS = ['temperature', 'cloud_cover', 'wind_speed']
+
+def candidates(grid):
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+# (train_end, test_end) row offsets into time-sorted timestamps (datetime64[ns] int64):
+# train is rows [0, train_end), test is [train_end, test_end)
+def rolling_origin_folds(timestamps, n_folds=4, horizon_days=7, min_train_days=14, step_days=None):
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    day = np.int64(86400 * 10**9)
+    step = (step_days or horizon_days) * day
+    horizon = horizon_days * day
+    end = timestamps[-1] + 1
+
+    folds = []
+    for k in range(n_folds, 0, -1):
+        origin = end - k * step
+        if origin - timestamps[0] < min_train_days * day:
+            continue
+        train_end = int(np.searchsorted(timestamps, origin))
+        test_end = int(np.searchsorted(timestamps, min(origin + horizon, end)))
+        if test_end > train_end:
+            folds.append((train_end, test_end))
+    if not folds:
+        raise ValueError(f"Not enough history for a fold: need more than {min_train_days} days "
+                         f"before the first {horizon_days}-day test window")
+    return folds
+
+# Writes the time-sorted feature matrix, target and timestamps under cache_dir once
+# per distinct input (a hash of the data and fold settings) and returns that folder
+def materialize_folds(features_df, features, cache_dir, target='solar_energy_kwh', **fold_options):
+    df = features_df.sort_values('timestamp', kind='stable')
+    timestamps = df['timestamp'].dt.tz_convert(None).to_numpy().astype('datetime64[ns]').astype(np.int64)
+    X = df[features].to_numpy(dtype=np.float32)
+    y = df[target].to_numpy(dtype=np.float64)
+
+    digest = hashlib.sha256()
+    for array in (timestamps, X, y):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    digest.update(json.dumps([features, fold_options], sort_keys=True).encode())
+    fold_dir = os.path.join(cache_dir, digest.hexdigest()[:16])
+    if os.path.exists(os.path.join(fold_dir, "folds.json")):
+        return fold_dir
+
+    os.makedirs(fold_dir, exist_ok=True)
+    np.save(os.path.join(fold_dir, "X.npy"), X)
+    np.save(os.path.join(fold_dir, "y.npy"), y)
+    np.save(os.path.join(fold_dir, "timestamps.npy"), timestamps)
+    folds = rolling_origin_folds(timestamps, **fold_options)
+    # Written last: its presence marks a complete cache entry
+    with open(os.path.join(fold_dir, "folds.json"), 'w') as f:
+        json.dump({"features": list(features), "folds": folds}, f)
+    return fold_dir
+
+_fold_data = {}
+
+# Memory-mapped arrays of a materialized fold folder, opened once per process
+def open_folds(fold_dir):
+    data = _fold_data.get(fold_dir)
+    if data is None:
+        with open(os.path.join(fold_dir, "folds.json")) as f:
+            meta = json.load(f)
+        data = {name: np.load(os.path.join(fold_dir, f"{name}.npy"), mmap_mode='r')
+                for name in ('X', 'y', 'timestamps')}
+        data.update(meta)
+        _fold_data[fold_dir] = data
+    return data
+
+def fit_predict_rf(params, X_train, y_train, X_test):
+    # Parallelism is across candidates, so each forest fits single-threaded
+    model = fit_full_forest(X_train, y_train, **{**params, 'n_jobs': 1})
+    return model.predict(X_test)
+
+def fit_predict_prophet(params, X_train, y_train, X_test, ts_train, ts_test, features):
+    from prophet_model import build_model
+    columns = {name: features.index(name) for name in PROPHET_REGRESSORS if name in features}
+
+    def frame(X, timestamps):
+        df = pd.DataFrame({'ds': timestamps.astype('datetime64[ns]')})
+        for name, i in columns.items():
+            df[name] = X[:, i].astype(float)
+        return df
+
+    history = frame(X_train, ts_train)
+    history['y'] = y_train
+    model = build_model(list(columns), **params)
+    model.fit(history)
+    return np.maximum(model.predict(frame(X_test, ts_test))['yhat'].to_numpy(), 0)
+
+# One (candidate, fold) task in a worker: fit on the fold's train rows, score its test rows
+def evaluate_candidate(model_name, params, fold_dir, fold_index):
+    data = open_folds(fold_dir)
+    train_end, test_end = data["folds"][fold_index]
+    X, y, timestamps = data["X"], data["y"], data["timestamps"]
+
+    start = time.perf_counter()
+    if model_name == 'rf':
+        y_pred = fit_predict_rf(params, X[:train_end], y[:train_end], X[train_end:test_end])
+    elif model_name == 'prophet':
+        y_pred = fit_predict_prophet(params, X[:train_end], y[:train_end], X[train_end:test_end],
+                                     timestamps[:train_end], timestamps[train_end:test_end], data["features"])
+    else:
+        raise ValueError(f"Unknown model {model_name!r}, expected one of {MODELS}")
+    y_test = y[train_end:test_end]
+    return {
+        'mae': float(mean_absolute_error(y_test, y_pred)),
+        'rmse': float(np.sqrt(mean_squared_error(y_test, y_pred))),
+        'fit_seconds': time.perf_counter() - start
+    }
+
+# Evaluates every candidate fold by fold, pruning each family to its best
+# keep_fraction after every fold; returns one result dict per candidate
+def run_search(fold_dir, grids, workers=None, keep_fraction=0.5):
+    n_folds = len(open_folds(fold_dir)["folds"])
+    results = [{'model': model_name, 'params': params, 'status': 'complete', 'folds': []}
+               for model_name, grid in grids.items() for params in candidates(grid)]
+    active = list(results)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for fold_index in range(n_folds):
+            futures = [(result, executor.submit(evaluate_candidate, result['model'], result['params'],
+                                                fold_dir, fold_index))
+                       for result in active]
+            for result, future in futures:
+                try:
+                    result['folds'].append(future.result())
+                except Exception as e:
+                    result['status'] = f"failed: {type(e).__name__}: {e}"
+            active = [result for result in active if result['status'] == 'complete']
+
+            if fold_index == n_folds - 1:
+                break
+            survivors = []
+            for model_name in grids:
+                family = sorted((r for r in active if r['model'] == model_name), key=mean_mae)
+                keep = max(1, math.ceil(len(family) * keep_fraction))
+                survivors.extend(family[:keep])
+                for result in family[keep:]:
+                    result['status'] = f"pruned after fold {fold_index}"
+            print(f"fold {fold_index}: {len(active)} evaluated, {len(survivors)} continue")
+            active = survivors
+    return results
+
+def mean_mae(result):
+    return float(np.mean([fold['mae'] for fold in result['folds']])) if result['folds'] else float('inf')
+
+# One row per candidate, best first; per-fold MAE in mae_fold_<i> columns
+def results_table(results):
+    rows = []
+    for result in results:
+        folds = result['folds']
+        row = {
+            'model': result['model'],
+            'params': json.dumps(result['params'], sort_keys=True),
+            'status': result['status'],
+            'folds_evaluated': len(folds),
+            'mae': mean_mae(result),
+            'rmse': float(np.mean([fold['rmse'] for fold in folds])) if folds else float('inf'),
+            'fit_seconds': round(sum(fold['fit_seconds'] for fold in folds), 3)
+        }
+        for i, fold in enumerate(folds):
+            row[f'mae_fold_{i}'] = fold['mae']
+        rows.append(row)
+    table = pd.DataFrame(rows)
+    # Candidates that saw every fold rank ahead of pruned ones
+    table['_rank'] = table['status'] != 'complete'
+    return table.sort_values(['_rank', 'mae'], kind='stable').drop(columns='_rank').reset_index(drop=True)
+
+def main():
+    from retrain import load_site_features
+    from site_registry import load_site_registry
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--site', default=None, help="Site name (default: first in the registry)")
+    parser.add_argument('--model', default='solar_forecast_rf_model.joblib',
+                        help="Model whose saved feature vocabulary is extended")
+    parser.add_argument('--models', nargs='*', default=list(MODELS), choices=MODELS)
+    parser.add_argument('--folds', type=int, default=4)
+    parser.add_argument('--horizon-days', type=int, default=7)
+    parser.add_argument('--min-train-days', type=int, default=14)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--keep-fraction', type=float, default=0.5,
+                        help="Share of each model family kept after every fold")
+    parser.add_argument('--grid', help="JSON file with search spaces per model")
+    parser.add_argument('--cache-dir', default='backtest_cache')
+    parser.add_argument('--output', default='backtest_results.csv')
+    args = parser.parse_args()
+
+    site_name = args.site or load_site_registry().names()[0]
+    grids = {'rf': RF_GRID, 'prophet': PROPHET_GRID}
+    if args.grid:
+        with open(args.grid) as f:
+            grids.update(json.load(f))
+    grids = {name: grids[name] for name in args.models}
+
+    features_df, pipeline = load_site_features(site_name, args.model)
+    start = time.perf_counter()
+    fold_dir = materialize_folds(features_df, pipeline.feature_names, os.path.join(args.cache_dir, site_name),
+                                 n_folds=args.folds, horizon_days=args.horizon_days,
+                                 min_train_days=args.min_train_days)
+    folds = open_folds(fold_dir)["folds"]
+    print(f"{site_name}: {len(features_df)} rows, {len(folds)} folds "
+          f"(test rows {[test_end - train_end for train_end, test_end in folds]}) "
+          f"in {fold_dir} ({time.perf_counter() - start:.1f}s)")
+
+    start = time.perf_counter()
+    table = results_table(run_search(fold_dir, grids, args.workers, args.keep_fraction))
+    table.to_csv(args.output, index=False)
+    print(f"{len(table)} candidates in {time.perf_counter() - start:.1f}s; results in {args.output}")
+    print(table[['model', 'params', 'status', 'mae', 'rmse', 'fit_seconds']].head(10).to_string(index=False))
+
+    for model_name in grids:
+        best = table[(table['model'] == model_name) & (table['status'] == 'complete')].head(1)
+        if not best.empty:
+            print(f"Best {model_name}: {best['params'].iloc[0]} (MAE {best['mae'].iloc[0]:.2f} kWh)")
+
+if __name__ == '__main__':
+    main()
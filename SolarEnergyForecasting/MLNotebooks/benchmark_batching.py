@@ -0,0 +1,123 @@
+# Load test: throughput and tail latency of score_server.py with and without micro-batching
+# Starts the server once per mode and drives it with --concurrency closed-loop
+# clients, each sending single-site forecast requests back to back over a
+# keep-alive connection. Mean batch size comes from the server's /metrics.
+# Usage: python benchmark_batching.py [--model solar_forecast_rf_model.joblib] [--days 7]
+#                                    [--concurrency 1 8 32] [--seconds 10] [--batch-wait-ms 5]
+# Without the model file a synthetic forest of the production shape is served.
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import joblib
+import numpy as np
+import requests
+
+from benchmark_score import synthetic_model
+from features import FeaturePipeline, feature_sidecar_path
+from flat_forest import export_forest, flat_model_path
+
+SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "score_server.py")
+
+def start_server(model_path, port, batch_wait_ms, max_batch_size):
+    process = subprocess.Popen([sys.executable, SERVER, "--model", model_path, "--port", str(port),
+                                "--batch-wait-ms", str(batch_wait_ms), "--max-batch-size", str(max_batch_size)],
+                               stdout=subprocess.DEVNULL)
+    url = f"http://localhost:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            requests.get(f"{url}/health", timeout=1)
+            return process, url
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Scoring server did not start on {url}")
+
+# (sum, count) of a histogram in the server's Prometheus output
+def histogram_totals(url, name):
+    text = requests.get(f"{url}/metrics").text
+    total = re.search(rf"^{name}_sum (\S+)$", text, re.M)
+    count = re.search(rf"^{name}_count (\S+)$", text, re.M)
+    return (float(total.group(1)), int(count.group(1))) if total else (0.0, 0)
+
+# Closed-loop clients for `seconds`; returns requests per second and latencies in ms
+def drive(url, payload, concurrency, seconds):
+    latencies = [[] for _ in range(concurrency)]
+    errors = []
+    stop_at = time.perf_counter() + seconds
+
+    def client(i):
+        session = requests.Session()
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            response = session.post(f"{url}/score", data=payload)
+            latencies[i].append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                errors.append(response.text)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise RuntimeError(f"{len(errors)} failed requests, first: {errors[0]}")
+    latencies = np.concatenate([np.asarray(l) for l in latencies])
+    return len(latencies) / elapsed, latencies
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='solar_forecast_rf_model.joblib')
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--concurrency', type=int, nargs='*', default=[1, 8, 32])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--batch-wait-ms', type=float, default=5)
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--port', type=int, default=8890)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = args.model
+        if not os.path.exists(model_path):
+            print(f"{model_path} not found, serving a synthetic forest")
+            model_path = os.path.join(tmp, "solar_forecast_rf_model.joblib")
+            model = synthetic_model()
+            joblib.dump(model, model_path)
+            FeaturePipeline().save(feature_sidecar_path(model_path))
+            export_forest(model, flat_model_path(model_path))
+
+        payload = json.dumps({"location": "solar_farm_1", "forecast_days": args.days})
+        rows = []
+        for batch_wait_ms in (0, args.batch_wait_ms):
+            process, url = start_server(model_path, args.port, batch_wait_ms, args.max_batch_size)
+            try:
+                drive(url, payload, 1, 1)  # warm-up (numba compilation, first-request setup)
+                for concurrency in args.concurrency:
+                    before = histogram_totals(url, "score_batch_requests")
+                    throughput, latencies = drive(url, payload, concurrency, args.seconds)
+                    after = histogram_totals(url, "score_batch_requests")
+                    batches = after[1] - before[1]
+                    mean_batch = (after[0] - before[0]) / batches if batches else 1.0
+                    rows.append((batch_wait_ms, concurrency, throughput, np.percentile(latencies, 50),
+                                 np.percentile(latencies, 99), mean_batch))
+            finally:
+                process.terminate()
+                process.wait()
+
+    print(f"single-site {args.days}-day requests, {args.seconds:g}s per row, max batch {args.max_batch_size}")
+    print(f"{'batching':>12} {'clients':>8} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'batch':>7}")
+    for batch_wait_ms, concurrency, throughput, p50, p99, mean_batch in rows:
+        mode = f"{batch_wait_ms:g} ms" if batch_wait_ms else "off"
+        print(f"{mode:>12} {concurrency:>8} {throughput:>9.1f} {p50:>9.1f} {p99:>9.1f} {mean_batch:>7.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# Benchmark: model artifact size, load time and memory per worker
+#   joblib       - the sklearn forest as score.init loaded it originally
+#   joblib-z3    - the same, compressed (smaller file, slower load)
+#   flat-mmap    - flat_forest export loaded with mmap_mode='r'
+# Each variant is loaded by --workers spawned processes at once. RSS counts shared
+# pages in full for every process; PSS splits them between the sharers, so it
+# shows what each extra worker really costs (Linux only, via smaps_rollup).
+# Usage: python benchmark_load.py [--model solar_forecast_rf_model.joblib] [--workers 4]
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+import joblib
+import numpy as np
+
+from flat_forest import export_forest, load_forest
+from training import fit_full_forest
+
+def synthetic_forest(n_rows=50000, n_features=7):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(n_rows, n_features))
+    y = 50 * X[:, 0] + 10 * np.sin(X[:, 1]) + rng.normal(size=n_rows)
+    # Same shape as the production model: 100 trees, depth 15
+    return fit_full_forest(X, y)
+
+def _memory_mb():
+    usage = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                name, value = line.split(':', 1)
+                if name in ('Rss', 'Pss'):
+                    usage[name] = int(value.split()[0]) / 1024
+    except OSError:
+        pass
+    return usage.get('Rss', float('nan')), usage.get('Pss', float('nan'))
+
+def _load(variant, path):
+    if variant == 'flat-mmap':
+        return load_forest(path)
+    return joblib.load(path)
+
+def _worker(variant, path, n_features, ready, go, queue):
+    rss_before, pss_before = _memory_mb()
+    start = time.perf_counter()
+    model = _load(variant, path)
+    # First prediction touches every page a real request would
+    model.predict(np.zeros((24, n_features)))
+    elapsed = time.perf_counter() - start
+
+    # Measure only once every worker holds the model, so shared pages are split
+    ready.wait()
+    go.wait()
+    rss, pss = _memory_mb()
+    queue.put((elapsed, rss - rss_before, pss - pss_before))
+
+def measure(variant, path, n_features, n_workers):
+    ctx = multiprocessing.get_context('spawn')
+    ready = ctx.Barrier(n_workers)
+    go = ctx.Barrier(n_workers)
+    queue = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(variant, path, n_features, ready, go, queue))
+             for _ in range(n_workers)]
+    for proc in procs:
+        proc.start()
+    results = [queue.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    return np.array(results).mean(axis=0)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', help="Fitted model to export (default: a synthetic 100-tree, depth-15 forest)")
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    model = joblib.load(args.model) if args.model else synthetic_forest()
+    workdir = tempfile.mkdtemp(prefix="model_load_")
+    paths = {
+        'joblib': os.path.join(workdir, "model.joblib"),
+        'joblib-z3': os.path.join(workdir, "model.z3.joblib"),
+        'flat-mmap': os.path.join(workdir, "model.flat.joblib")
+    }
+    joblib.dump(model, paths['joblib'])
+    joblib.dump(model, paths['joblib-z3'], compress=3)
+    export_forest(model, paths['flat-mmap'])
+
+    n_nodes = sum(estimator.tree_.node_count for estimator in model.estimators_)
+    print(f"{len(model.estimators_)} trees, {n_nodes:,} nodes, {args.workers} workers")
+    print(f"{'variant':>10} {'file MB':>8} {'load ms':>8} {'RSS +MB':>8} {'PSS +MB':>8}")
+    for variant, path in paths.items():
+        elapsed, rss, pss = measure(variant, path, model.n_features_in_, args.workers)
+        print(f"{variant:>10} {os.path.getsize(path) / 1e6:>8.1f} {elapsed * 1000:>8.1f} "
+              f"{rss:>8.1f} {pss:>8.1f}")
+
+if __name__ == '__main__':
+    main()
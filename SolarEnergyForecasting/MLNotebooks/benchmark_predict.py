@@ -0,0 +1,85 @@
+# Benchmark: RandomForest prediction latency and throughput, sklearn vs flat_forest
+# Single-row latency is the median over --calls predictions of one row; batch
+# throughput is rows/sec on a --batch-row matrix (best of 3).
+# The "+q" variants return P10/P50/P90 from every tree's prediction (score.py's
+# quantile mode); their slowdown is against the same backend's point forecast.
+# Usage: python benchmark_predict.py [--model solar_forecast_rf_model.joblib]
+#                                    [--calls 500] [--batch-rows 20000]
+
+import argparse
+import time
+import joblib
+import numpy as np
+
+from benchmark_load import synthetic_forest
+from flat_forest import FlatForest, numba, tree_predictions, tree_quantiles
+
+QUANTILES = (0.1, 0.5, 0.9)
+
+def single_row_us(predict, X, calls):
+    timings = np.empty(calls)
+    for i in range(calls):
+        row = X[i % len(X):i % len(X) + 1]
+        start = time.perf_counter()
+        predict(row)
+        timings[i] = time.perf_counter() - start
+    return np.median(timings) * 1e6
+
+def batch_rows_per_sec(predict, X, repeat=3):
+    best = min(timeit(predict, X) for _ in range(repeat))
+    return len(X) / best
+
+def timeit(predict, X):
+    start = time.perf_counter()
+    predict(X)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', help="Fitted forest (default: a synthetic 100-tree, depth-15 forest)")
+    parser.add_argument('--calls', type=int, default=500)
+    parser.add_argument('--batch-rows', type=int, default=20000)
+    args = parser.parse_args()
+
+    model = joblib.load(args.model) if args.model else synthetic_forest()
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(args.batch_rows, model.n_features_in_))
+
+    variants = {'sklearn': model.predict}
+    for backend in ('numpy', 'numba'):
+        if backend == 'numba' and numba is None:
+            print("numba not installed; skipping the numba backend")
+            continue
+        flat = FlatForest.from_model(model, backend)
+        flat.predict(X[:1])  # JIT compile / warm up outside the timings
+        variants[f"flat-{backend}"] = flat.predict
+
+    expected = model.predict(X)
+    per_tree = tree_predictions(model, X)
+    assert np.allclose(tree_quantiles(per_tree, QUANTILES), np.quantile(per_tree, QUANTILES, axis=1).T)
+    for name, predict in variants.items():
+        max_error = np.abs(predict(X) - expected).max()
+        assert max_error < 1e-12, f"{name} differs from sklearn by {max_error}"
+    print(f"All variants match sklearn on {len(X)} rows; "
+          f"{len(model.estimators_)} trees, n_jobs={model.n_jobs}")
+
+    results = {name: (single_row_us(predict, X, args.calls), batch_rows_per_sec(predict, X))
+               for name, predict in variants.items()}
+    base_latency, base_throughput = results['sklearn']
+    print(f"{'variant':>12} {'1-row us':>10} {'speedup':>8} {'rows/sec':>12} {'speedup':>8}")
+    for name, (latency, throughput) in results.items():
+        print(f"{name:>12} {latency:>10.1f} {base_latency / latency:>7.1f}x "
+              f"{throughput:>12,.0f} {throughput / base_throughput:>7.1f}x")
+
+    # Quantile mode: per-tree predictions plus their quantiles, same backends
+    print(f"\n{'variant':>12} {'1-row us':>10} {'slowdown':>9} {'rows/sec':>12} {'slowdown':>9}")
+    for name, predict in variants.items():
+        model_or_flat = model if name == 'sklearn' else predict.__self__
+        quantile_predict = lambda rows, m=model_or_flat: tree_quantiles(tree_predictions(m, rows), QUANTILES)
+        latency, throughput = single_row_us(quantile_predict, X, args.calls), batch_rows_per_sec(quantile_predict, X)
+        point_latency, point_throughput = results[name]
+        print(f"{name + ' +q':>12} {latency:>10.1f} {latency / point_latency:>8.2f}x "
+              f"{throughput:>12,.0f} {point_throughput / throughput:>8.2f}x")
+
+if __name__ == '__main__':
+    main()
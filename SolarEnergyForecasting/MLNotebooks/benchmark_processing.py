@@ -0,0 +1,94 @@
+# Benchmark: columnar process_weather_data vs the original per-record dict version
+# Each variant runs in a fresh process so peak RSS is measured in isolation.
+# Usage: python benchmark_processing.py [--snapshots 2000] [--periods 40]
+
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+
+from synthetic_fleet import synthetic_snapshots
+from weather_processing import process_weather_data
+
+# The processing function as it was before the columnar rewrite
+def process_weather_data_records(raw_data):
+    records = []
+
+    for entry in raw_data:
+        current = entry.get('current', {})
+        timestamp = datetime.fromisoformat(entry.get('timestamp').replace('Z', '+00:00'))
+
+        records.append({
+            'timestamp': timestamp,
+            'location': entry.get('location'),
+            'temperature': current.get('temperature'),
+            'cloud_cover': current.get('clouds'),
+            'wind_speed': current.get('wind_speed'),
+            'weather_description': current.get('weather_description')
+        })
+
+        for forecast in entry.get('forecast', []):
+            records.append({
+                'timestamp': datetime.fromtimestamp(forecast.get('dt')),
+                'location': entry.get('location'),
+                'temperature': forecast.get('main', {}).get('temp'),
+                'cloud_cover': forecast.get('clouds', {}).get('all'),
+                'wind_speed': forecast.get('wind', {}).get('speed'),
+                'weather_description': forecast.get('weather', [{}])[0].get('description'),
+                'is_forecast': True
+            })
+
+    return pd.DataFrame(records)
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+def _measure(name, n_snapshots, n_periods, queue):
+    fn = process_weather_data if name == 'columnar' else process_weather_data_records
+    raw_data = synthetic_snapshots(n_snapshots, n_periods)
+    rss_before = _peak_rss_mb()
+    start = time.perf_counter()
+    df = fn(raw_data)
+    elapsed = time.perf_counter() - start
+    queue.put((len(df), elapsed, _peak_rss_mb() - rss_before))
+
+def check_equivalence(n_snapshots=50, n_periods=40):
+    raw_data = synthetic_snapshots(n_snapshots, n_periods)
+    new = process_weather_data(raw_data)
+    old = process_weather_data_records(raw_data)
+
+    # The old path stored forecast times as naive local time; compare instants instead
+    old_ts = [pd.Timestamp(ts.astimezone(timezone.utc)) for ts in old['timestamp']]
+    assert list(new['timestamp']) == old_ts
+    for col in ['temperature', 'cloud_cover', 'wind_speed']:
+        np.testing.assert_allclose(new[col].to_numpy(), old[col].astype(float).to_numpy(), rtol=1e-6)
+    assert list(new['weather_description'].astype(str)) == list(old['weather_description'])
+    assert list(new['is_forecast']) == list(old['is_forecast'].fillna(False).astype(bool))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--snapshots', type=int, default=2000)
+    parser.add_argument('--periods', type=int, default=40)
+    args = parser.parse_args()
+
+    check_equivalence()
+    print("Outputs match the per-record implementation")
+
+    ctx = multiprocessing.get_context('spawn')
+    print(f"{'variant':>10} {'rows':>9} {'seconds':>8} {'rows/sec':>11} {'peak RSS +MB':>13}")
+    for name in ('records', 'columnar'):
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_measure, args=(name, args.snapshots, args.periods, queue))
+        proc.start()
+        rows, elapsed, rss = queue.get()
+        proc.join()
+        print(f"{name:>10} {rows:>9} {elapsed:>8.2f} {rows / elapsed:>11,.0f} {rss:>13.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# Benchmark: Prophet fit time for the original path vs prophet_model's fast path
+#   baseline     - plain Prophet per site, backend loaded per instance, cold start
+#   cached       - shared cmdstan backend, cold start
+#   warm         - shared backend, initialised from the previous run's parameters
+#   parallel     - warm fits spread across a process pool
+# Usage: python benchmark_prophet.py [--sites 4] [--days 60] [--workers 4]
+
+import argparse
+import tempfile
+import time
+from prophet import Prophet
+
+import prophet_model
+from synthetic_fleet import synthetic_snapshots
+from training import generate_synthetic_solar_data
+from weather_processing import process_weather_data
+
+def site_jobs(n_sites, days):
+    jobs = []
+    for i in range(n_sites):
+        raw_data = synthetic_snapshots(days * 24, 40, seed=i, location=f"bench_site_{i}")
+        weather_df = process_weather_data(raw_data)
+        jobs.append((f"bench_site_{i}", generate_synthetic_solar_data(weather_df), weather_df))
+    return jobs
+
+# The original notebook flow: fit, then predict with regressors copied from history
+def fit_baseline(jobs):
+    for _, solar_df, _ in jobs:
+        history_df = prophet_model.prophet_frame(solar_df)
+        model = Prophet(daily_seasonality=True, yearly_seasonality=True, weekly_seasonality=True)
+        for feature in prophet_model.REGRESSORS:
+            model.add_regressor(feature)
+        model.fit(history_df)
+        future = model.make_future_dataframe(periods=24 * 7, freq='h')
+        for feature in prophet_model.REGRESSORS:
+            future[feature] = list(history_df[feature].values) + list(history_df[feature].values[-24 * 7:])
+        model.predict(future)
+
+def fit_sequential(jobs, model_dir, warm_start):
+    for site_name, solar_df, weather_df in jobs:
+        prophet_model.fit_site(site_name, solar_df, weather_df, model_dir, warm_start=warm_start)
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sites', type=int, default=4)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    jobs = site_jobs(args.sites, args.days)
+    model_dir = tempfile.mkdtemp(prefix="prophet_bench_")
+
+    timings = {}
+    timings['baseline'] = timed(fit_baseline, jobs)
+    timings['cached'] = timed(fit_sequential, jobs, model_dir, warm_start=False)
+    # Stored models from the previous step seed the warm starts
+    timings['warm'] = timed(fit_sequential, jobs, model_dir, warm_start=True)
+    timings['parallel'] = timed(prophet_model.fit_sites_parallel, jobs, model_dir,
+                                workers=args.workers, warm_start=True)
+
+    print(f"{args.sites} sites x {args.days} days")
+    print(f"{'variant':>10} {'seconds':>8} {'per site':>9} {'speedup':>8}")
+    for name, seconds in timings.items():
+        print(f"{name:>10} {seconds:>8.2f} {seconds / args.sites:>9.2f} "
+              f"{timings['baseline'] / seconds:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# Micro-benchmark: batched score.run vs the original per-hour predict loop,
+# and the cost of adding P10/P50/P90 bands ("quantiles": true) to the batched run
+# Usage: python benchmark_score.py [--model solar_forecast_rf_model.joblib] [--repeat 5] [--flat]
+# --flat scores with the flat forest, as score.init does when the flat export exists
+
+import argparse
+import json
+import os
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+import score
+from features import BASE_FEATURES, FeaturePipeline
+from flat_forest import FlatForest
+from solar_geometry import DEFAULT_LATITUDE, DEFAULT_LONGITUDE, clear_sky_ghi
+
+# The scoring loop as it was before batching: one model.predict per hour
+# (with today's features, so both variants run the same model)
+def run_per_hour(raw_data):
+    data = json.loads(raw_data)
+    forecast_days = data.get('forecast_days', 7)
+    timestamps = []
+    forecast_values = []
+    start_time = pd.Timestamp.now().floor('h')
+
+    for i in range(forecast_days * 24):
+        current_time = start_time + pd.Timedelta(hours=i)
+        hour = current_time.hour
+        month = current_time.month
+        ghi = clear_sky_ghi(DEFAULT_LATITUDE, DEFAULT_LONGITUDE, [current_time.timestamp()])[0]
+        features = [25, 30, 5,
+                    np.sin(2 * np.pi * hour / 24), np.cos(2 * np.pi * hour / 24),
+                    np.sin(2 * np.pi * month / 12), np.cos(2 * np.pi * month / 12), ghi]
+        prediction = score.model.predict([features])[0]
+        if ghi == 0:
+            prediction = 0
+        timestamps.append(current_time.isoformat())
+        forecast_values.append(float(prediction))
+
+    return json.dumps({"timestamps": timestamps, "forecast_values": forecast_values})
+
+# Fit a forest with the production shape on random data when no artifact is available
+def synthetic_model():
+    rng = np.random.default_rng(42)
+    X = rng.random((5000, len(BASE_FEATURES)))
+    y = rng.random(5000) * 100
+    model = RandomForestRegressor(n_estimators=100, max_depth=15, random_state=42, n_jobs=-1)
+    return model.fit(X, y)
+
+def best_of(fn, payload, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(payload)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='solar_forecast_rf_model.joblib')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--flat', action='store_true', help="Score with the flat forest (flat_forest.py)")
+    args = parser.parse_args()
+
+    if os.path.exists(args.model):
+        score.model = joblib.load(args.model)
+        score.feature_pipeline = FeaturePipeline.for_model(args.model)
+    else:
+        print(f"{args.model} not found, using a synthetic 100-tree forest")
+        score.model = synthetic_model()
+        score.feature_pipeline = FeaturePipeline()
+    if args.flat:
+        score.model = FlatForest.from_model(score.model)
+        score.model.predict(np.zeros((1, score.model.n_features_in_)))  # JIT compile outside the timings
+
+    print(f"{'days':>5} {'per-hour (ms)':>14} {'batched (ms)':>13} {'speedup':>8} "
+          f"{'+quantiles (ms)':>16} {'overhead':>9}")
+    for days in (1, 7, 30):
+        payload = json.dumps({"location": "solar_farm_1", "forecast_days": days})
+        quantile_payload = json.dumps({"location": "solar_farm_1", "forecast_days": days, "quantiles": True})
+        loop_time = best_of(run_per_hour, payload, args.repeat)
+        batch_time = best_of(score.run, payload, args.repeat)
+        quantile_time = best_of(score.run, quantile_payload, args.repeat)
+        print(f"{days:>5} {loop_time * 1000:>14.1f} {batch_time * 1000:>13.1f} {loop_time / batch_time:>7.1f}x "
+              f"{quantile_time * 1000:>16.1f} {quantile_time / batch_time:>8.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# Benchmark: clear-sky irradiance for a fleet over a year of hours
+#   vectorised  - solar_geometry.clear_sky_ghi for every site in one call
+#   per-site    - the same function called once per site (--loop-sites of them,
+#                 scaled to the fleet)
+#   cache       - ClearSkyCache.hourly for one site's 7-day horizon, cold then warm
+# Usage: python benchmark_solar_geometry.py [--sites 2000] [--hours 8760] [--loop-sites 200]
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+from solar_geometry import ClearSkyCache, clear_sky_ghi
+
+def best_of(fn, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sites', type=int, default=2000)
+    parser.add_argument('--hours', type=int, default=8760)
+    parser.add_argument('--loop-sites', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    latitudes = rng.uniform(25, 49, args.sites)
+    longitudes = rng.uniform(-124, -67, args.sites)
+    hours = pd.date_range('2024-01-01', periods=args.hours, freq='h', tz='UTC')
+
+    vector_seconds, ghi = best_of(lambda: clear_sky_ghi(latitudes, longitudes, hours))
+    n_loop = min(args.loop_sites, args.sites)
+    loop_seconds, _ = best_of(lambda: [clear_sky_ghi(latitudes[i], longitudes[i], hours) for i in range(n_loop)], 1)
+    loop_seconds *= args.sites / n_loop
+
+    cells = args.sites * args.hours
+    print(f"{args.sites} sites x {args.hours} hours = {cells:,} site-hours, "
+          f"{(ghi == 0).mean():.0%} dark, {ghi.nbytes / 1e6:.0f} MB")
+    print(f"{'variant':>12} {'seconds':>9} {'site-hours/s':>14}")
+    print(f"{'vectorised':>12} {vector_seconds:>9.3f} {cells / vector_seconds:>14,.0f}")
+    print(f"{'per-site':>12} {loop_seconds:>9.3f} {cells / loop_seconds:>14,.0f}")
+
+    cache = ClearSkyCache()
+    start = pd.Timestamp('2024-06-21 05:00')
+    cold, _ = best_of(lambda: cache.hourly(latitudes[0], longitudes[0], start, 168), 1)
+    warm, _ = best_of(lambda: cache.hourly(latitudes[0], longitudes[0], start, 168), 100)
+    print(f"cache, one site x 168 h: cold {cold * 1e6:.0f} us, warm {warm * 1e6:.0f} us")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+# End-to-end benchmark suite on a synthetic fleet
+# Writes N sites x M days of collector snapshots to a local blob folder, then
+# times every stage of the pipeline on them:
+#   blob_read -> process -> clean -> features -> rf_fit -> prophet_fit
+#   -> feature_store -> score_run -> dashboard
+# Each stage records seconds, throughput and peak RSS growth (sampled from
+# /proc/self/statm while the stage runs). The JSON report can be compared with
+# one from another commit to catch regressions.
+# Usage:
+#   python benchmark_suite.py [--sites 20] [--days 30] [--output report.json]
+#                             [--compare baseline.json] [--tolerance 0.2] [--skip-prophet]
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+import pandas as pd
+
+from blob_loader import iter_blob_records
+from features import FeaturePipeline
+from flat_forest import FlatForest
+from local_blob import LocalContainerClient
+from synthetic_fleet import synthetic_sites, write_fleet
+from training import fit_full_forest, generate_synthetic_solar_data
+from weather_processing import clean_weather_data, process_weather_data
+
+DASHBOARD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SolarDashboard")
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+def current_rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE / (1024 * 1024)
+    except OSError:
+        return 0.0
+
+# Samples RSS on a background thread; peak_mb is the growth over the starting RSS
+class PeakRSS:
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak_mb = 0.0
+
+    def __enter__(self):
+        self._start = current_rss_mb()
+        self._peak = self._start
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._peak = max(self._peak, current_rss_mb())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._peak = max(self._peak, current_rss_mb())
+        self.peak_mb = self._peak - self._start
+
+class Suite:
+    def __init__(self):
+        self.stages = {}
+
+    # fn returns the number of items it processed
+    def run(self, name, unit, fn, *args, **kwargs):
+        with PeakRSS() as memory:
+            start = time.perf_counter()
+            items = fn(*args, **kwargs)
+            seconds = time.perf_counter() - start
+        self.stages[name] = {
+            "seconds": round(seconds, 4),
+            "items": items,
+            "unit": unit,
+            "throughput": round(items / seconds, 1) if seconds > 0 else None,
+            "peak_rss_mb": round(memory.peak_mb, 1)
+        }
+        print(f"{name:>14} {seconds:>9.3f}s {items:>10,} {unit:<10} "
+              f"{self.stages[name]['throughput'] or 0:>12,.0f}/s {memory.peak_mb:>8.1f} MB")
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(n_sites, days, skip_prophet=False, workdir=None):
+    workdir = workdir or tempfile.mkdtemp(prefix="bench_suite_")
+    blob_root = os.path.join(workdir, "blobs")
+    container_client = LocalContainerClient(blob_root)
+    sites = synthetic_sites(n_sites)
+    suite = Suite()
+    state = {}
+
+    print(f"{n_sites} sites x {days} days in {workdir}")
+
+    def generate():
+        n_snapshots, n_bytes = write_fleet(container_client, sites, days)
+        state['bytes'] = n_bytes
+        return n_snapshots
+
+    def blob_read():
+        # Fresh cache dir: every blob is downloaded and parsed
+        cache_dir = os.path.join(workdir, "cache")
+        state['raw'] = {site["name"]: list(iter_blob_records(container_client, site["name"], cache_dir=cache_dir))
+                        for site in sites}
+        return sum(len(raw) for raw in state['raw'].values())
+
+    def process():
+        state['weather'] = {name: process_weather_data(raw) for name, raw in state.pop('raw').items()}
+        return sum(len(df) for df in state['weather'].values())
+
+    def clean():
+        n_rows = sum(len(df) for df in state['weather'].values())
+        state['weather'] = {name: clean_weather_data(df) for name, df in state['weather'].items()}
+        return n_rows
+
+    def features():
+        state['solar'] = {site["name"]: generate_synthetic_solar_data(state['weather'][site["name"]], site["capacity_kw"],
+                                                                      site["lat"], site["lon"])
+                          for site in sites}
+        pipeline = FeaturePipeline().fit(pd.concat(state['solar'].values()))
+        state['pipeline'] = pipeline
+        state['features'] = {name: pipeline.transform(df) for name, df in state['solar'].items()}
+        return sum(len(df) for df in state['features'].values())
+
+    def rf_fit():
+        pipeline = state['pipeline']
+        models = {}
+        for name, df in state['features'].items():
+            models[name] = fit_full_forest(df[pipeline.feature_names], df['solar_energy_kwh'])
+        state['models'] = models
+        return sum(len(df) for df in state['features'].values())
+
+    def prophet_fit():
+        from prophet_model import fit_prophet, prophet_frame
+        name = sites[0]["name"]
+        history_df = prophet_frame(state['solar'][name])
+        fit_prophet(history_df)
+        return len(history_df)
+
+    def feature_store():
+        from feature_store import ForecastFeatureStore
+        # Every stored day is in range, whatever today's date is
+        state['store'] = ForecastFeatureStore(container_client, [site["name"] for site in sites],
+                                              lookback_days=(datetime.now(timezone.utc) -
+                                                             datetime(2024, 1, 1, tzinfo=timezone.utc)).days + 1)
+        state['store'].refresh()
+        return len(sites)
+
+    def score_setup():
+        import score
+        score.model = FlatForest.from_model(state['models'][sites[0]["name"]])
+        score.feature_pipeline = state['pipeline']
+        score.feature_store = state['store']
+        # Compile (numba) / warm up outside the timed stage
+        score.model.predict(state['features'][sites[0]["name"]][state['pipeline'].feature_names].to_numpy()[:1])
+        return score
+
+    def score_run(score):
+        payload = json.dumps({"requests": [{"location": site["name"], "forecast_days": 7} for site in sites]})
+        result = json.loads(score.run(payload))
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        return sum(len(forecast["forecast_values"]) for forecast in result["forecasts"])
+
+    def dashboard_setup():
+        sys.path.insert(0, DASHBOARD_DIR)
+        import app as dashboard_app
+        return dashboard_app
+
+    def dashboard(dashboard_app):
+        client = dashboard_app.app.test_client()
+        for site in sites:
+            # Cold cache for every site, so this times forecast computation
+            dashboard_app.forecast_cache.clear()
+            client.post('/forecast', data={'location': site["name"], 'forecast_days': 7})
+            response = client.get(f'/forecast/data?location={site["name"]}&days=7')
+            if response.status_code != 200:
+                raise RuntimeError(f"/forecast/data returned {response.status_code}")
+        return len(sites)
+
+    print(f"{'stage':>14} {'time':>10} {'items':>10} {'unit':<10} {'throughput':>14} {'peak RSS':>11}")
+    suite.run('generate', 'snapshots', generate)
+    suite.run('blob_read', 'snapshots', blob_read)
+    suite.run('process', 'rows', process)
+    suite.run('clean', 'rows', clean)
+    suite.run('features', 'rows', features)
+    suite.run('rf_fit', 'rows', rf_fit)
+    if not skip_prophet:
+        suite.run('prophet_fit', 'rows', prophet_fit)
+    suite.run('feature_store', 'sites', feature_store)
+    suite.run('score_run', 'hours', score_run, score_setup())
+    suite.run('dashboard', 'requests', dashboard, dashboard_setup())
+
+    return {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": {"sites": n_sites, "days": days, "skip_prophet": skip_prophet},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count()},
+        "data_bytes": state['bytes'],
+        "stages": suite.stages
+    }
+
+# Stages whose time grew by more than `tolerance` (0.2 = 20%) against the baseline
+def compare_reports(report, baseline, tolerance=0.2):
+    regressions = []
+    print(f"\n{'stage':>14} {'baseline s':>11} {'current s':>10} {'change':>8}")
+    for name, stage in report["stages"].items():
+        before = baseline.get("stages", {}).get(name)
+        if before is None or not before["seconds"]:
+            continue
+        change = stage["seconds"] / before["seconds"] - 1
+        flag = "  REGRESSION" if change > tolerance else ""
+        print(f"{name:>14} {before['seconds']:>11.3f} {stage['seconds']:>10.3f} {change:>+7.0%}{flag}")
+        if flag:
+            regressions.append(name)
+    if baseline.get("config") != report["config"]:
+        print("Note: baseline was run with a different config", baseline.get("config"))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sites', type=int, default=20)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--output', default='benchmark_report.json')
+    parser.add_argument('--compare', help="Baseline report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed slowdown per stage")
+    parser.add_argument('--skip-prophet', action='store_true')
+    args = parser.parse_args()
+
+    report = run_suite(args.sites, args.days, args.skip_prophet)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_reports(report, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressions in: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
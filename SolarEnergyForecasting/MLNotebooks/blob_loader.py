@@ -0,0 +1,110 @@
+# Concurrent blob ingestion for the training pipeline
+# Downloads run on a bounded thread pool and parsed records are streamed to the
+# caller in listing order. Raw payloads are cached locally in Parquet, keyed by
+# blob name and etag, so a re-run only fetches blobs it hasn't seen.
+# Reads both the daily NDJSON layout and the original per-run JSON blobs, with
+# date-range pruning on blob names; keep_fields drops unused top-level fields
+# from the parsed records (see parse_snapshots).
+
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import pandas as pd
+from azure.storage.blob import BlobServiceClient
+
+from local_blob import LocalContainerClient
+from snapshot_store import in_date_range, parse_snapshots
+
+CACHE_DIR = os.environ.get("BLOB_CACHE_DIR", ".blob_cache")
+
+# Azure Storage container, or a local folder standing in for it when LOCAL_BLOB_ROOT is set
+def get_container_client(container_name="solar-data"):
+    if os.environ.get("LOCAL_BLOB_ROOT"):
+        return LocalContainerClient(os.environ["LOCAL_BLOB_ROOT"])
+    connection_string = os.environ["STORAGE_CONNECTION_STRING"]
+    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+    return blob_service_client.get_container_client(container_name)
+
+def read_blob_cache(cache_file):
+    if not cache_file or not os.path.exists(cache_file):
+        return {}
+    cache_df = pd.read_parquet(cache_file)
+    return {
+        name: (etag, payload)
+        for name, etag, payload in zip(cache_df['name'], cache_df['etag'], cache_df['payload'])
+    }
+
+def write_blob_cache(cache_file, entries):
+    if not cache_file:
+        return
+    os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)
+    cache_df = pd.DataFrame(
+        [(name, etag, payload) for name, (etag, payload) in entries.items()],
+        columns=['name', 'etag', 'payload']
+    )
+    # Write to a temp file first so an interrupted run never leaves a torn cache
+    tmp_file = cache_file + ".tmp"
+    cache_df.to_parquet(tmp_file, index=False)
+    os.replace(tmp_file, cache_file)
+
+def _cache_file(cache_dir, location_name):
+    if not cache_dir:
+        return None
+    return os.path.join(cache_dir, f"{location_name}.parquet")
+
+def _download_text(container_client, blob_name):
+    blob_client = container_client.get_blob_client(blob_name)
+    return blob_client.download_blob().readall().decode('utf-8')
+
+# Stream parsed records for a location, downloading only uncached blobs
+def iter_blob_records(container_client, location_name, max_workers=8, cache_dir=CACHE_DIR,
+                      start_date=None, end_date=None, keep_fields=None):
+    cache_file = _cache_file(cache_dir, location_name)
+    cached = read_blob_cache(cache_file)
+    seen = {}
+
+    # Keep a bounded window of in-flight downloads so memory stays flat
+    window = deque()
+    max_in_flight = max_workers * 4
+
+    def resolve(entry):
+        name, etag, payload = entry
+        if isinstance(payload, Future):
+            payload = payload.result()
+        seen[name] = (etag, payload)
+        return parse_snapshots(name, payload, keep_fields)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        location_prefix = f"{location_name}/"
+        for blob in container_client.list_blobs(name_starts_with=location_prefix):
+            hit = cached.get(blob.name)
+            if hit is not None and hit[0] != blob.etag:
+                hit = None
+
+            # Date-range pushdown: skip blobs outside the range without downloading
+            if not in_date_range(blob.name, start_date, end_date):
+                if hit is not None:
+                    seen[blob.name] = hit
+                continue
+
+            if hit is not None:
+                window.append((blob.name, blob.etag, hit[1]))
+            else:
+                future = executor.submit(_download_text, container_client, blob.name)
+                window.append((blob.name, blob.etag, future))
+
+            while len(window) >= max_in_flight:
+                yield from resolve(window.popleft())
+
+        while window:
+            yield from resolve(window.popleft())
+
+    # Only reached when the stream was fully consumed; blobs deleted upstream drop out
+    write_blob_cache(cache_file, seen)
+
+# Function to load data from blob storage
+def load_data_from_blob(container_client, location_name, max_workers=8, cache_dir=CACHE_DIR,
+                        start_date=None, end_date=None, keep_fields=None):
+    return list(iter_blob_records(container_client, location_name,
+                                  max_workers=max_workers, cache_dir=cache_dir,
+                                  start_date=start_date, end_date=end_date, keep_fields=keep_fields))
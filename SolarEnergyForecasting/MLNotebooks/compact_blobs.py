@@ -0,0 +1,100 @@
+# Migration tool: compact per-run JSON blobs into daily NDJSON append blobs
+# Converts {location}/{date}/{time}.json into {location}/{date}.ndjson, merging
+# with any lines the collector has already appended for that day.
+# The rewrite is conditional on the daily blob's etag, so lines appended after
+# it was read are never lost: a day that changed meanwhile is skipped (run again
+# later). Today's blobs are skipped by default, since the collector is still
+# appending to them.
+# Usage: python compact_blobs.py [--location solar_farm_1] [--delete] [--dry-run]
+# Set LOCAL_BLOB_ROOT to run against a local folder instead of Azure Storage.
+
+import argparse
+from collections import defaultdict
+from datetime import datetime, timezone
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+from azure.storage.blob import ContentSettings
+
+from blob_loader import get_container_client
+from snapshot_store import (NDJSON_CONTENT_TYPE, append_lines, encode_snapshot,
+                            parse_snapshots, snapshot_blob_name)
+
+# Group legacy blobs by (location, date)
+def find_legacy_blobs(container_client, location_name=None):
+    prefix = f"{location_name}/" if location_name else None
+    groups = defaultdict(list)
+    for blob in container_client.list_blobs(name_starts_with=prefix):
+        parts = blob.name.split('/')
+        if len(parts) == 3 and parts[2].endswith('.json'):
+            groups[(parts[0], parts[1])].append(blob.name)
+    return groups
+
+def read_text(container_client, blob_name):
+    return container_client.get_blob_client(blob_name).download_blob().readall().decode('utf-8')
+
+# (target blob, snapshots written), or (target blob, None) when the daily blob
+# changed while it was being merged and was left alone
+def compact_day(container_client, location_name, date_str, legacy_names, delete=False):
+    target_name = snapshot_blob_name(location_name, date_str)
+    target_client = container_client.get_blob_client(target_name)
+
+    snapshots = []
+    for name in legacy_names:
+        snapshots.extend(parse_snapshots(name, read_text(container_client, name)))
+    try:
+        etag = target_client.get_blob_properties().etag
+        snapshots.extend(parse_snapshots(target_name, read_text(container_client, target_name)))
+    except ResourceNotFoundError:
+        etag = None
+
+    # One line per collection run, in time order
+    by_timestamp = {snapshot["timestamp"]: snapshot for snapshot in snapshots}
+    payload = "".join(encode_snapshot(by_timestamp[ts]) for ts in sorted(by_timestamp))
+
+    # Recreate the blob only if nothing was appended since it was read
+    try:
+        if etag is None:
+            target_client.create_append_blob(content_settings=ContentSettings(content_type=NDJSON_CONTENT_TYPE),
+                                             match_condition=MatchConditions.IfMissing)
+        else:
+            target_client.create_append_blob(content_settings=ContentSettings(content_type=NDJSON_CONTENT_TYPE),
+                                             etag=etag, match_condition=MatchConditions.IfNotModified)
+    except (ResourceExistsError, ResourceModifiedError):
+        return target_name, None
+    append_lines(target_client, payload)
+
+    if delete:
+        for name in legacy_names:
+            container_client.get_blob_client(name).delete_blob()
+
+    return target_name, len(by_timestamp)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--location', help="Only compact this location (default: all)")
+    parser.add_argument('--delete', action='store_true', help="Delete the per-run blobs afterwards")
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--include-today', action='store_true',
+                        help="Also compact today's blobs (only when the collector is stopped)")
+    args = parser.parse_args()
+
+    container_client = get_container_client()
+    groups = find_legacy_blobs(container_client, args.location)
+    today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+    for (location_name, date_str), names in sorted(groups.items()):
+        if date_str >= today and not args.include_today:
+            print(f"{location_name}/{date_str}: skipped, the collector may still be appending")
+            continue
+        if args.dry_run:
+            print(f"{location_name}/{date_str}: {len(names)} blobs")
+            continue
+        target_name, lines = compact_day(container_client, location_name, date_str,
+                                         names, delete=args.delete)
+        if lines is None:
+            print(f"{target_name} changed while it was merged; skipped, run again to compact it")
+        else:
+            print(f"{len(names)} blobs -> {target_name} ({lines} snapshots)")
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,23 @@
 import os
-import joblib
+import shutil
 from azure.ai.ml import MLClient
 from azure.ai.ml.entities import ManagedOnlineEndpoint, ManagedOnlineDeployment
 from azure.ai.ml.constants import AssetTypes
 from azure.identity import DefaultAzureCredential
 
-# Load the model
-model = joblib.load("solar_forecast_rf_model.joblib")
+# Artifacts are registered from disk; nothing here needs the model in memory.
+# The .flat.joblib export is what score.init memory-maps at startup.
+model_files = [
+    "solar_forecast_rf_model.joblib",
+    "solar_forecast_rf_model.features.json",
+    "solar_forecast_rf_model.flat.joblib"
+]
+os.makedirs("model_artifacts", exist_ok=True)
+for model_file in model_files:
+    if not os.path.exists(model_file):
+        raise FileNotFoundError(f"{model_file} not found; run the training script first")
+    shutil.copy(model_file, "model_artifacts")
+    print(f"{model_file}: {os.path.getsize(model_file) / 1e6:.1f} MB")
 
 # Azure ML details
 subscription_id = "YOUR_SUBSCRIPTION_ID"
@@ -28,7 +39,7 @@ endpoint_name = "solar-forecast-endpoint"
 # Register the model
 model = ml_client.models.create_or_update(
     model_name,
-    path="solar_forecast_rf_model.joblib",
+    path="model_artifacts",
     description="Solar energy production forecasting model",
     type=AssetTypes.CUSTOM_MODEL
 )
@@ -0,0 +1,170 @@
+# In-memory forecast feature store for scoring
+# Holds, per location, the latest collected OpenWeatherMap forecast interpolated
+# from 3-hourly to hourly NumPy arrays on a grid of whole UTC hours. A lookup is
+# index arithmetic plus array indexing, with no I/O on the request path.
+# A background thread rebuilds the store from blob storage and swaps it in whole,
+# so readers never see a half-refreshed location. Locations load in parallel
+# (max_workers threads), since each one is mostly blob downloads.
+
+import logging
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+
+from blob_loader import CACHE_DIR, iter_blob_records
+from weather_processing import (EPOCH, ONE_SECOND, interpolate_to_hourly, latest_forecasts, process_weather_data,
+                                quality_filter)
+
+WEATHER_COLUMNS = ('temperature', 'cloud_cover', 'wind_speed')
+# Used for locations or hours with no collected data (the old placeholder values)
+DEFAULT_WEATHER = {'temperature': 25.0, 'cloud_cover': 30.0, 'wind_speed': 5.0}
+
+# Blob cache of its own: the store only reads the last lookback_days, and sharing
+# the trainer's cache would have each evict the other's older days
+FEATURE_STORE_CACHE_DIR = os.path.join(CACHE_DIR, "feature_store")
+
+# FNV-1a constants, for hour_hashes
+HASH_SEED = np.uint64(0xcbf29ce484222325)
+HASH_MULTIPLIER = np.uint64(0x100000001b3)
+
+def epoch_hours(timestamps):
+    index = pd.DatetimeIndex(timestamps)
+    if index.tz is None:
+        index = index.tz_localize('UTC')
+    return ((index - EPOCH) / ONE_SECOND).to_numpy(dtype=np.float64) // 3600
+
+# Hourly arrays for one location starting at first_hour (hours since the epoch)
+class LocationForecast:
+    def __init__(self, first_hour, columns, descriptions):
+        self.first_hour = int(first_hour)
+        self.columns = columns
+        self.descriptions = descriptions
+
+    def __len__(self):
+        return len(self.descriptions)
+
+# Latest observation followed by the freshest forecast for every later target time
+def build_location_forecast(weather_df):
+    if weather_df.empty:
+        return None
+    observations = weather_df[~weather_df['is_forecast']]
+    anchor = observations.iloc[[-1]] if not observations.empty else observations
+    after = anchor['timestamp'].iloc[0] if not anchor.empty else None
+    points = pd.concat([anchor, latest_forecasts(weather_df, after=after)], ignore_index=True)
+    if points.empty:
+        return None
+
+    point_hours = epoch_hours(points['timestamp'])
+    first_hour, last_hour = point_hours.min(), point_hours.max()
+    hours = np.arange(first_hour, last_hour + 1)
+    hourly = interpolate_to_hourly(points, pd.to_datetime(hours * 3600, unit='s', utc=True), WEATHER_COLUMNS)
+    columns = {name: values.astype(np.float32) for name, values in hourly.items()}
+
+    # Descriptions are categorical, so each hour takes the most recent point's
+    descriptions = points['weather_description'].astype(object).to_numpy()
+    descriptions = descriptions[np.searchsorted(point_hours, hours, side='right') - 1]
+    return LocationForecast(first_hour, columns, descriptions)
+
+class ForecastFeatureStore:
+    def __init__(self, container_client, locations, lookback_days=2, refresh_seconds=900, max_workers=8,
+                 cache_dir=FEATURE_STORE_CACHE_DIR):
+        self.container_client = container_client
+        self.cache_dir = cache_dir
+        self.locations = list(locations)
+        self.lookback_days = lookback_days
+        self.refresh_seconds = refresh_seconds
+        self.max_workers = max_workers
+        self.loaded_at = None
+        self._forecasts = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def load_location(self, location):
+        start_date = (datetime.now(timezone.utc) - timedelta(days=self.lookback_days)).strftime('%Y-%m-%d')
+        raw_data = iter_blob_records(self.container_client, location, cache_dir=self.cache_dir, start_date=start_date,
+                                     keep_fields=['timestamp', 'location', 'current', 'forecast'])
+        # A missing or implausible reading would be interpolated into the hours around it
+        return build_location_forecast(quality_filter(process_weather_data(raw_data)))
+
+    def refresh(self):
+        forecasts = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="feature-store-load") as executor:
+            futures = {location: executor.submit(self.load_location, location) for location in self.locations}
+            for location, future in futures.items():
+                try:
+                    forecast = future.result()
+                except Exception:
+                    # Keep serving the previous forecast for this location
+                    logging.exception(f"Feature store refresh failed for {location}")
+                    forecast = self._forecasts.get(location)
+                if forecast is not None:
+                    forecasts[location] = forecast
+        self._forecasts = forecasts
+        self.loaded_at = time.time()
+        return self
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_seconds):
+            self.refresh()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._refresh_loop, name="feature-store-refresh", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    # Weather arrays for `timestamps` (whole hours); hours outside the stored
+    # forecast hold its first/last value, unknown locations get DEFAULT_WEATHER
+    def lookup(self, location, timestamps):
+        return self.weather_at(location, epoch_hours(timestamps).astype(np.int64))
+
+    # lookup() for hours since the epoch
+    def weather_at(self, location, hours):
+        n_rows = len(hours)
+        forecast = self._forecasts.get(location)
+        if forecast is None:
+            weather = {name: np.full(n_rows, value, dtype=np.float32) for name, value in DEFAULT_WEATHER.items()}
+            weather['weather_description'] = None
+            return weather
+
+        index = np.asarray(hours, dtype=np.int64) - forecast.first_hour
+        np.clip(index, 0, len(forecast) - 1, out=index)
+        weather = {name: values[index] for name, values in forecast.columns.items()}
+        weather['weather_description'] = forecast.descriptions[index]
+        return weather
+
+    # One hash per hour of the inputs lookup() returns for `hours` hours from
+    # from_hour (hours since the epoch). Hour by hour, so forecasts issued at
+    # different hours can be compared over the hours they share: the precompute
+    # job keeps a stored forecast while its overlapping hours hash the same.
+    def hour_hashes(self, location, from_hour, hours):
+        weather = self.weather_at(location, np.arange(int(from_hour), int(from_hour) + hours))
+        descriptions = weather['weather_description']
+        if descriptions is None:
+            codes = np.zeros(hours, dtype=np.uint64)
+        else:
+            names, inverse = np.unique(descriptions.astype(str), return_inverse=True)
+            name_codes = np.array([zlib.crc32(name.encode()) for name in names], dtype=np.uint64)
+            codes = name_codes[inverse.reshape(-1)]
+
+        # Polynomial mix of the float32 bit patterns (wraps modulo 2**64)
+        digest = np.full(hours, HASH_SEED, dtype=np.uint64)
+        for name in WEATHER_COLUMNS:
+            bits = np.ascontiguousarray(weather[name], dtype=np.float32).view(np.uint32).astype(np.uint64)
+            digest = (digest ^ bits) * HASH_MULTIPLIER
+        return (digest ^ codes) * HASH_MULTIPLIER
+
+    def stats(self):
+        return {
+            "locations": len(self._forecasts),
+            "hours": {location: len(forecast) for location, forecast in self._forecasts.items()},
+            "loaded_at": self.loaded_at
+        }
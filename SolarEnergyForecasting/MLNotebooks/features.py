@@ -0,0 +1,170 @@
+# Shared feature pipeline for training (SolarForecastingModel.py) and scoring (score.py)
+# The weather_description one-hot vocabulary is fixed when the model is trained
+# and saved next to the model file, so scoring builds exactly the columns the model saw.
+# Engineered features are materialized to a per-location Parquet snapshot and only
+# rows that are new or changed since the last run (keyed by location + timestamp
+# and a hash of the row's inputs) are processed.
+# clear_sky_ghi (solar_geometry) is an input column like the weather values: the
+# hour's clear-sky irradiance at the site, so the model doesn't have to learn the
+# sun's position from hour/month alone. Pipelines loaded from older sidecars keep
+# the base features their model was trained with.
+
+import json
+import os
+import numpy as np
+import pandas as pd
+
+BASE_FEATURES = ['temperature', 'cloud_cover', 'wind_speed',
+                 'hour_sin', 'hour_cos', 'month_sin', 'month_cos', 'clear_sky_ghi']
+
+# What models saved without a feature sidecar were trained on (before clear_sky_ghi)
+LEGACY_BASE_FEATURES = ['temperature', 'cloud_cover', 'wind_speed',
+                        'hour_sin', 'hour_cos', 'month_sin', 'month_cos']
+
+WEATHER_PREFIX = 'weather_'
+
+def feature_sidecar_path(model_path):
+    return os.path.splitext(model_path)[0] + '.features.json'
+
+def time_features(timestamps):
+    timestamps = pd.DatetimeIndex(timestamps)
+    hour = timestamps.hour.to_numpy()
+    month = timestamps.month.to_numpy()
+    return {
+        'hour': hour,
+        'day': timestamps.day.to_numpy(),
+        'month': month,
+        'year': timestamps.year.to_numpy(),
+        'dayofweek': timestamps.dayofweek.to_numpy(),
+        # Time features: sin and cos transformations for cyclical features
+        'hour_sin': np.sin(2 * np.pi * hour / 24),
+        'hour_cos': np.cos(2 * np.pi * hour / 24),
+        'month_sin': np.sin(2 * np.pi * month / 12),
+        'month_cos': np.cos(2 * np.pi * month / 12)
+    }
+
+class FeaturePipeline:
+    def __init__(self, weather_vocabulary=None, base_features=None):
+        self.weather_vocabulary = sorted(weather_vocabulary or [])
+        self.base_features = list(base_features or BASE_FEATURES)
+
+    @property
+    def weather_columns(self):
+        return [f'{WEATHER_PREFIX}{desc}' for desc in self.weather_vocabulary]
+
+    @property
+    def feature_names(self):
+        return self.base_features + self.weather_columns
+
+    # Extend the vocabulary with any descriptions seen in df; existing entries are kept.
+    # Fitting is training, so it moves an older pipeline onto the current base features.
+    def fit(self, df):
+        self.base_features = list(BASE_FEATURES)
+        if 'weather_description' in df.columns:
+            seen = pd.Series(df['weather_description']).dropna().astype(str).unique()
+            self.weather_vocabulary = sorted(set(self.weather_vocabulary) | set(seen))
+        return self
+
+    # Weather description encoding (one-hot) against the fixed vocabulary;
+    # unseen descriptions encode as all zeros
+    def one_hot(self, descriptions, n_rows):
+        encoded = np.zeros((n_rows, len(self.weather_vocabulary)), dtype=np.uint8)
+        if descriptions is not None and self.weather_vocabulary:
+            codes = pd.Categorical(descriptions, categories=self.weather_vocabulary).codes
+            known = codes >= 0
+            encoded[np.flatnonzero(known), codes[known]] = 1
+        return encoded
+
+    # Add the engineered columns to a DataFrame with timestamp/weather columns
+    def transform(self, df):
+        columns = time_features(df['timestamp'])
+        descriptions = df['weather_description'] if 'weather_description' in df.columns else None
+        encoded = self.one_hot(descriptions, len(df))
+        for i, name in enumerate(self.weather_columns):
+            columns[name] = encoded[:, i]
+
+        existing = df.drop(columns=[c for c in columns if c in df.columns])
+        return pd.concat([existing, pd.DataFrame(columns, index=df.index)], axis=1)
+
+    # Build the model's feature matrix straight from arrays (no DataFrame on the hot path)
+    def transform_arrays(self, timestamps, temperature, cloud_cover, wind_speed, weather_description=None,
+                         clear_sky_ghi=None):
+        columns = time_features(timestamps)
+        n_rows = len(columns['hour'])
+        columns.update(temperature=temperature, cloud_cover=cloud_cover, wind_speed=wind_speed,
+                       clear_sky_ghi=clear_sky_ghi)
+        X = np.empty((n_rows, len(self.feature_names)))
+        for i, name in enumerate(self.base_features):
+            if columns[name] is None:
+                raise ValueError(f"{name} is required by this model's features")
+            X[:, i] = columns[name]
+        X[:, len(self.base_features):] = self.one_hot(weather_description, n_rows)
+        return X
+
+    def to_dict(self):
+        return {"features": self.feature_names, "weather_vocabulary": self.weather_vocabulary}
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            saved = json.load(f)
+        pipeline = cls(saved.get("weather_vocabulary"))
+        weather_columns = set(pipeline.weather_columns)
+        base_features = [name for name in saved.get("features", []) if name not in weather_columns]
+        if base_features:
+            pipeline.base_features = base_features
+        return pipeline
+
+    # Pipeline saved with a model, or the legacy base features for artifacts that predate it
+    @classmethod
+    def for_model(cls, model_path):
+        sidecar = feature_sidecar_path(model_path)
+        return cls.load(sidecar) if os.path.exists(sidecar) else cls(base_features=LEGACY_BASE_FEATURES)
+
+# Hash of each input row, stored with its features so changed rows are recomputed
+SOURCE_HASH = '_source_hash'
+
+# Feature table for exactly the rows of df. Rows whose location, timestamp and
+# input values (by row hash) are already in the snapshot are reused; the rest are
+# transformed. Rows no longer in df are dropped, and the result replaces the snapshot.
+def materialize_features(df, pipeline, snapshot_path):
+    snapshot = None
+    if snapshot_path and os.path.exists(snapshot_path):
+        snapshot = pd.read_parquet(snapshot_path)
+        snapshot_weather = {c for c in snapshot.columns if c.startswith(WEATHER_PREFIX)} - {'weather_description'}
+        # A vocabulary change alters the one-hot columns, and a snapshot from before a
+        # new base feature, input column or row hashes lacks its column, so rebuild from scratch
+        missing = (set(pipeline.base_features) | set(df.columns) | {SOURCE_HASH}) - set(snapshot.columns)
+        if snapshot_weather != set(pipeline.weather_columns) or missing:
+            snapshot = None
+
+    source_hash = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    keys = pd.MultiIndex.from_arrays([df['location'].astype(str), df['timestamp'], source_hash])
+    reused = new_rows = None
+    if snapshot is not None:
+        known = pd.MultiIndex.from_arrays([snapshot['location'].astype(str), snapshot['timestamp'],
+                                           snapshot[SOURCE_HASH].to_numpy()])
+        unique = ~known.duplicated()
+        snapshot, known = snapshot[unique], known[unique]
+        hit = keys.isin(known)
+        reused = snapshot.iloc[known.get_indexer(keys[hit])]
+        new_rows = ~hit
+        # Same rows as last time: nothing to compute or write
+        if not new_rows.any() and len(reused) == len(snapshot):
+            return snapshot.drop(columns=[SOURCE_HASH]).reset_index(drop=True)
+
+    if new_rows is None:
+        features_df = pipeline.transform(df).assign(**{SOURCE_HASH: source_hash})
+    else:
+        new_features = pipeline.transform(df[new_rows]).assign(**{SOURCE_HASH: source_hash[new_rows]})
+        features_df = pd.concat([reused[new_features.columns], new_features], ignore_index=True)
+    features_df = features_df.sort_values('timestamp', kind='stable').reset_index(drop=True)
+
+    if snapshot_path:
+        os.makedirs(os.path.dirname(snapshot_path) or '.', exist_ok=True)
+        features_df.to_parquet(snapshot_path, index=False)
+    return features_df.drop(columns=[SOURCE_HASH])
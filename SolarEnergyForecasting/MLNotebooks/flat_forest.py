@@ -0,0 +1,254 @@
+# Flattened RandomForest artifact
+# The fitted forest is stored as a handful of contiguous NumPy arrays (all trees'
+# nodes concatenated) in a plain joblib file. joblib.load(mmap_mode='r') maps the
+# arrays straight from the file, so loading is near-instant and every worker
+# process on a host shares the same page-cache pages. (An sklearn forest can't do
+# this: each Tree copies its arrays into its own buffers when unpickled.)
+#
+# Nodes are numbered breadth-first per tree so a node's children are adjacent:
+# the next node is left[node] + (x > threshold). Leaves point back at themselves
+# with an +inf threshold, so the NumPy backend advances every row in every tree
+# one level per step without branching. The optional numba backend walks each
+# tree to its leaf directly, which is what makes single-row calls microseconds.
+#
+# predict_trees returns every tree's prediction (rows x trees) from the same
+# traversal, so the mean and quantiles of the trees' spread (P10/P50/P90 bands)
+# come from one pass; see predict_quantiles and score.py.
+
+import os
+import joblib
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+FLAT_FOREST_VERSION = 2
+
+# One 16-byte record per node, so each traversal step touches a single cache line
+NODE_DTYPE = np.dtype([('threshold', np.float64), ('feature', np.int32), ('left', np.int32)])
+
+BACKENDS = ('numpy', 'numba')
+# numba when installed; FLAT_FOREST_BACKEND=numpy forces the pure NumPy path
+DEFAULT_BACKEND = os.environ.get("FLAT_FOREST_BACKEND", 'numba' if numba is not None else 'numpy')
+
+def flat_model_path(model_path):
+    return model_path.rsplit('.', 1)[0] + ".flat.joblib"
+
+# Renumber one tree breadth-first so every internal node's two children sit next
+# to each other (right = left + 1). Returns old node ids in their new order.
+def breadth_first_order(children_left, children_right):
+    order = []
+    level = np.array([0])
+    while len(level):
+        order.append(level)
+        internal = level[children_left[level] != -1]
+        level = np.stack([children_left[internal], children_right[internal]], axis=1).ravel()
+    return np.concatenate(order)
+
+# Concatenate every tree of a fitted RandomForestRegressor into flat node arrays
+def flatten_forest(model):
+    nodes, values, roots, depths = [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        order = breadth_first_order(tree.children_left, tree.children_right)
+        new_id = np.empty(len(order), dtype=np.int64)
+        new_id[order] = np.arange(len(order))
+
+        children_left = tree.children_left[order]
+        is_leaf = children_left == -1
+        # Leaves point at themselves and never move (x > +inf is false)
+        first_child = np.where(is_leaf, np.arange(len(order)), new_id[np.where(is_leaf, 0, children_left)])
+
+        tree_nodes = np.empty(len(order), dtype=NODE_DTYPE)
+        tree_nodes['threshold'] = np.where(is_leaf, np.inf, tree.threshold[order])
+        tree_nodes['feature'] = np.where(is_leaf, 0, tree.feature[order])
+        tree_nodes['left'] = first_child + offset
+        nodes.append(tree_nodes)
+        values.append(tree.value[order, 0, 0])
+        roots.append(offset)
+        depths.append(tree.max_depth)
+
+        offset += len(order)
+        max_depth = max(max_depth, tree.max_depth)
+
+    return {
+        'version': FLAT_FOREST_VERSION,
+        'n_features_in': int(model.n_features_in_),
+        'max_depth': int(max_depth),
+        'nodes': np.concatenate(nodes),
+        'value': np.concatenate(values),
+        'roots': np.array(roots, dtype=np.int32),
+        'depths': np.array(depths, dtype=np.int32)
+    }
+
+# Rows walked through one tree in lockstep by the numba kernel
+NUMBA_BLOCK_ROWS = 32
+
+# Numba kernel: tree by tree, so a tree's upper levels stay cached across rows.
+# Blocks of rows descend together for exactly the tree's depth (leaves loop on
+# themselves); the rows' node loads are independent, so their cache misses overlap.
+if numba is not None:
+    @numba.njit(cache=True, nogil=True)
+    def _predict_numba(X, nodes, value, roots, depths, out):
+        n_rows = X.shape[0]
+        n_trees = len(roots)
+        block = np.empty(NUMBA_BLOCK_ROWS, dtype=np.int64)
+        out[:] = 0.0
+        for t in range(n_trees):
+            for start in range(0, n_rows, NUMBA_BLOCK_ROWS):
+                size = min(NUMBA_BLOCK_ROWS, n_rows - start)
+                block[:size] = roots[t]
+                for _ in range(depths[t]):
+                    for k in range(size):
+                        node = nodes[block[k]]
+                        block[k] = node.left + (X[start + k, node.feature] > node.threshold)
+                for k in range(size):
+                    out[start + k] += value[block[k]]
+        out /= n_trees
+        return out
+
+    # Same traversal, keeping each tree's leaf value: out is (trees x rows)
+    @numba.njit(cache=True, nogil=True)
+    def _predict_trees_numba(X, nodes, value, roots, depths, out):
+        n_rows = X.shape[0]
+        block = np.empty(NUMBA_BLOCK_ROWS, dtype=np.int64)
+        for t in range(len(roots)):
+            for start in range(0, n_rows, NUMBA_BLOCK_ROWS):
+                size = min(NUMBA_BLOCK_ROWS, n_rows - start)
+                block[:size] = roots[t]
+                for _ in range(depths[t]):
+                    for k in range(size):
+                        node = nodes[block[k]]
+                        block[k] = node.left + (X[start + k, node.feature] > node.threshold)
+                for k in range(size):
+                    out[t, start + k] = value[block[k]]
+        return out
+
+class FlatForest:
+    def __init__(self, arrays, backend=None):
+        self.n_features_in_ = arrays['n_features_in']
+        self.max_depth = arrays['max_depth']
+        # np.asarray drops the memmap subclass without copying the mapped data
+        self.nodes = np.asarray(arrays['nodes'])
+        self.value = np.asarray(arrays['value'])
+        self.roots = np.asarray(arrays['roots'])
+        self.depths = np.asarray(arrays['depths'])
+        self.backend = backend or DEFAULT_BACKEND
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {self.backend!r}, expected one of {BACKENDS}")
+        if self.backend == 'numba' and numba is None:
+            raise ImportError("The numba backend needs the numba package")
+
+    @classmethod
+    def from_model(cls, model, backend=None):
+        return cls(flatten_forest(model), backend)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.nodes)
+
+    def _check_X(self, X):
+        # sklearn trees compare float32 features against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has shape {X.shape}, expected (n_rows, {self.n_features_in_})")
+        return X
+
+    # Mean of the trees' leaf values, like RandomForestRegressor.predict.
+    # Features must be finite (NaN is not routed the way sklearn routes it).
+    def predict(self, X):
+        X = self._check_X(X)
+        if self.backend == 'numba':
+            return _predict_numba(X, self.nodes, self.value, self.roots, self.depths, np.empty(len(X)))
+        return self._predict_numpy(X)
+
+    # Every tree's leaf value, (rows x trees); the mean over axis 1 is predict(X)
+    def predict_trees(self, X):
+        X = self._check_X(X)
+        if self.backend == 'numba':
+            out = np.empty((self.n_trees, len(X)))
+            # Written tree-major (contiguous per tree), returned as a rows x trees view
+            return _predict_trees_numba(X, self.nodes, self.value, self.roots, self.depths, out).T
+        values = np.empty((len(X), self.n_trees))
+        for start, node in self._leaves_numpy(X):
+            values[start:start + len(node)] = self.value[node]
+        return values
+
+    # (rows x quantiles) of the trees' predictions, e.g. quantiles=(0.1, 0.5, 0.9)
+    def predict_quantiles(self, X, quantiles):
+        return tree_quantiles(self.predict_trees(X), quantiles)
+
+    def _predict_numpy(self, X):
+        predictions = np.empty(len(X))
+        for start, node in self._leaves_numpy(X):
+            predictions[start:start + len(node)] = self.value[node].mean(axis=1)
+        return predictions
+
+    # All rows x all trees advance one level per step; rows are processed in
+    # chunks to bound the (rows x trees) working arrays. Yields (first row, leaf ids).
+    def _leaves_numpy(self, X, chunk_rows=2048):
+        n_features = X.shape[1]
+        flat_X = X.ravel()
+        for start in range(0, len(X), chunk_rows):
+            n_rows = min(chunk_rows, len(X) - start)
+            row_offset = (np.arange(start, start + n_rows, dtype=np.int32) * n_features)[:, None]
+            node = np.repeat(self.roots[None, :], n_rows, axis=0)
+            for _ in range(self.max_depth):
+                record = self.nodes[node]
+                go_right = flat_X[row_offset + record['feature']] > record['threshold']
+                node = record['left'] + go_right
+            yield start, node
+
+# Per-tree predictions (rows x trees) of a FlatForest or a fitted sklearn forest
+def tree_predictions(model, X):
+    if isinstance(model, FlatForest):
+        return model.predict_trees(X)
+    if hasattr(model, 'estimators_'):
+        X = np.asarray(X, dtype=np.float32)
+        return np.stack([estimator.predict(X) for estimator in model.estimators_], axis=1)
+    raise ValueError(f"{type(model).__name__} is not a tree ensemble, so it has no per-tree predictions")
+
+# (rows x quantiles) of per-tree predictions, matching np.quantile's default
+# linear interpolation. One sort per row and a gather is several times faster
+# than np.quantile on many rows of a hundred or so trees.
+def tree_quantiles(per_tree, quantiles):
+    ordered = np.sort(per_tree, axis=1)
+    position = np.asarray(quantiles, dtype=np.float64) * (ordered.shape[1] - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, ordered.shape[1] - 1)
+    fraction = position - lower
+    return ordered[:, lower] * (1 - fraction) + ordered[:, upper] * fraction
+
+def export_forest(model, path):
+    # Uncompressed on purpose: compressed joblib files can't be memory-mapped
+    joblib.dump(flatten_forest(model), path)
+    return path
+
+# Keeps the flat copy next to a saved model in step with it: score.py loads the
+# flat copy first, so a forest is re-exported and any other model drops it
+def update_flat_export(model, model_path):
+    path = flat_model_path(model_path)
+    if hasattr(model, 'estimators_'):
+        return export_forest(model, path)
+    if os.path.exists(path):
+        os.remove(path)
+    return None
+
+# An export in an older layout; re-export it from the joblib model (export_forest)
+class FlatForestVersionError(ValueError):
+    pass
+
+def load_forest(path, mmap_mode='r', backend=None):
+    arrays = joblib.load(path, mmap_mode=mmap_mode)
+    if arrays.get('version') != FLAT_FOREST_VERSION:
+        raise FlatForestVersionError(f"{path} has flat forest version {arrays.get('version')}, "
+                         f"expected {FLAT_FOREST_VERSION}")
+    return FlatForest(arrays, backend)
@@ -0,0 +1 @@
+../shared/forecast_store.py
\ No newline at end of file
@@ -0,0 +1,125 @@
+# Cross-request micro-batching for the scoring service
+# Concurrent callers submit their forecast requests to a queue; one worker thread
+# takes everything that arrives within max_wait_ms of the first queued request
+# (or until max_batch_size requests are waiting), scores it with a single
+# batched call and hands each caller back its own slice of the results.
+# Under bursty traffic many small model calls become a few large ones, so the
+# per-call overhead (feature setup, tree traversal start-up) is paid once per
+# batch; a lone request waits at most max_wait_ms extra.
+#
+# Requests with different options (e.g. columnar output, quantile levels) are
+# queued together but scored in separate calls. If a batched call fails, its
+# requests are retried one submission at a time, so one bad request only fails
+# its own caller.
+#
+# Metrics (instrumentation): score_queue_depth (requests waiting), score_batch_requests
+# (requests per batched call) and score_queue_wait_seconds (submit to batch start).
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from instrumentation import gauge, histogram
+
+# Requests per batched call, from a lone request up to a burst of fleet calls
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+class MicroBatcher:
+    # score_fn(requests, options) -> one result per request, in order
+    def __init__(self, score_fn, max_wait_ms=5.0, max_batch_size=64):
+        self.score_fn = score_fn
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._pending = []
+        self._pending_requests = 0
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stop = False
+        self._queue_depth = gauge("score_queue_depth", "Forecast requests waiting to be batched")
+        self._batch_requests = histogram("score_batch_requests", "Forecast requests per batched model call",
+                                         buckets=BATCH_SIZE_BUCKETS)
+        self._queue_wait = histogram("score_queue_wait_seconds", "Time from submit to the start of its batch")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="score-batcher", daemon=True)
+            self._thread.start()
+        return self
+
+    # Requests still queued fail with RuntimeError, as does any later submit; a
+    # batch already being scored finishes normally
+    def stop(self):
+        with self._condition:
+            self._stop = True
+            pending, self._pending = self._pending, []
+            self._pending_requests = 0
+            self._queue_depth.set(0)
+            self._condition.notify_all()
+        for submission in pending:
+            submission[2].set_exception(RuntimeError("Micro-batcher stopped"))
+
+    # Blocks until the requests are scored; options must be hashable
+    def submit(self, requests, options=()):
+        future = Future()
+        with self._condition:
+            if self._stop:
+                raise RuntimeError("Micro-batcher stopped")
+            self._pending.append((list(requests), options, future, time.perf_counter()))
+            self._pending_requests += len(requests)
+            self._queue_depth.set(self._pending_requests)
+            self._condition.notify()
+        return future.result()
+
+    # Waits for the first submission, then for the window to close or the batch to fill
+    def _next_batch(self):
+        with self._condition:
+            while not self._pending and not self._stop:
+                self._condition.wait()
+            if self._stop:
+                return []
+            deadline = time.perf_counter() + self.max_wait
+            while self._pending_requests < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            # Whole submissions only; one larger than max_batch_size goes on its own
+            batch, n_requests = [], 0
+            while self._pending and (not batch or n_requests + len(self._pending[0][0]) <= self.max_batch_size):
+                submission = self._pending.pop(0)
+                batch.append(submission)
+                n_requests += len(submission[0])
+            self._pending_requests -= n_requests
+            self._queue_depth.set(self._pending_requests)
+            return batch
+
+    def _loop(self):
+        while not self._stop:
+            batch = self._next_batch()
+            started = time.perf_counter()
+            groups = OrderedDict()
+            for submission in batch:
+                self._queue_wait.observe(started - submission[3])
+                groups.setdefault(submission[1], []).append(submission)
+            for options, submissions in groups.items():
+                self._score(options, submissions)
+
+    def _score(self, options, submissions):
+        requests = [request for submission in submissions for request in submission[0]]
+        self._batch_requests.observe(len(requests))
+        try:
+            results = self.score_fn(requests, options)
+        except Exception as e:
+            if len(submissions) == 1:
+                submissions[0][2].set_exception(e)
+                return
+            for submission in submissions:
+                self._score(options, [submission])
+            return
+
+        offset = 0
+        for submission_requests, _, future, _ in submissions:
+            future.set_result(results[offset:offset + len(submission_requests)])
+            offset += len(submission_requests)
@@ -0,0 +1,171 @@
+# Post-collection precompute: forecasts for every registered site, scored in batch
+# Runs after each collection (--watch waits for the collector's marker blob) and
+# writes every site's hourly forecast plus its daily aggregates to one compact
+# blob (see forecast_store.py), which the dashboard serves with a single read.
+#
+# Only sites whose inputs changed are rescored:
+#   1. the site's newest snapshot blob (name + etag) is compared with the one it
+#      was last scored from, without downloading anything. This only saves work
+#      when no collection ran since (the collector appends every run);
+#   2. for sites whose blob changed, the hourly weather inputs the model would see
+#      from this hour on are loaded and hashed hour by hour. The stored forecast
+#      is kept if every hour it shares with the new window [issue hour, stored
+#      start + MAX_HORIZON_HOURS) hashes the same as when it was scored, e.g. when
+#      a collection brought the same OpenWeatherMap forecast run again.
+# Everything is rescored when the model changes, and a stored forecast is always
+# rescored once it is more than forecast_store.REUSE_HOURS old.
+# Usage:
+#   python precompute.py [--model solar_forecast_rf_model.joblib] [--sites a b]
+#                        [--force] [--watch] [--poll-seconds 60]
+# Set LOCAL_BLOB_ROOT to read from a local folder instead of Azure Storage.
+
+import argparse
+import os
+import time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+from azure.core.exceptions import ResourceNotFoundError
+
+import score
+from blob_loader import get_container_client
+from feature_store import ForecastFeatureStore
+import instrumentation
+from instrumentation import counter, timed
+from forecast_store import (HOUR_SECONDS, MAX_HORIZON_HOURS, REUSE_HOURS, PrecomputedForecasts,
+                            read_input_hashes, read_precomputed, write_input_hashes, write_precomputed)
+from site_registry import load_site_registry
+from snapshot_store import collection_marker_etag, snapshot_blob_name
+
+# Sites per predict_batch call (MAX_HORIZON_HOURS rows each)
+SCORE_BATCH_SITES = 500
+
+def model_version(model_path):
+    if os.environ.get("MODEL_VERSION"):
+        return os.environ["MODEL_VERSION"]
+    return str(int(os.path.getmtime(model_path)))
+
+# Name + etag of the site's newest daily snapshot blob (today's, else yesterday's)
+def input_version(container_client, site_name, now):
+    for day in (now, now - timedelta(days=1)):
+        blob_name = snapshot_blob_name(site_name, day.strftime('%Y-%m-%d'))
+        try:
+            return f"{blob_name}@{container_client.get_blob_client(blob_name).get_blob_properties().etag}"
+        except ResourceNotFoundError:
+            continue
+    return "none"
+
+# Hourly forecasts (sites x MAX_HORIZON_HOURS) from issue_time for `sites`, in
+# batches, with weather from the feature store `store`
+def score_sites(sites, issue_time, store):
+    rows = []
+    for i in range(0, len(sites), SCORE_BATCH_SITES):
+        requests = [{"location": name, "forecast_days": MAX_HORIZON_HOURS // 24}
+                    for name in sites[i:i + SCORE_BATCH_SITES]]
+        for result in score.predict_batch(requests, start_time=issue_time, store=store):
+            rows.append(np.asarray(result["forecast_values"], dtype=np.float32))
+    return np.array(rows, dtype=np.float32).reshape(len(sites), MAX_HORIZON_HOURS)
+
+@timed("precompute_run_seconds")
+def precompute(container_client, sites, model_path, force=False, now=None):
+    now = now or datetime.now(timezone.utc)
+    issue_time = now.replace(minute=0, second=0, microsecond=0)
+    issue_epoch = int(issue_time.timestamp())
+    version = model_version(model_path)
+    score.load_model(model_path)
+
+    previous, _ = read_precomputed(container_client)
+    if previous is not None and previous.meta.get("model_version") != version:
+        previous = None
+    previous_hashes = read_input_hashes(container_client) if previous is not None else {}
+    names = [site["name"] for site in sites]
+
+    # Stored forecasts young enough to reuse, with the input hashes they were scored from
+    stored = {}
+    for name in names:
+        entry = previous.site(name) if previous is not None and name in previous else None
+        hashes = previous_hashes.get(name)
+        if (entry is not None and hashes is not None and hashes[0] == entry["start"]
+                and issue_epoch - entry["start"] <= REUSE_HOURS * HOUR_SECONDS):
+            stored[name] = {**entry, "hashes": hashes[1]}
+
+    # 1. Blob-level check: sites whose newest snapshot blob is the one they were scored from
+    versions = {name: input_version(container_client, name, now) for name in names}
+    kept, candidates = {}, []
+    for name in names:
+        if not force and name in stored and stored[name]["input_version"] == versions[name]:
+            kept[name] = stored[name]
+        else:
+            candidates.append(name)
+
+    # 2. Content check: load the candidates' weather and compare per-hour input
+    # hashes over the hours the stored forecast shares with this run's window
+    store = ForecastFeatureStore(container_client, candidates).refresh()
+    issue_hour = issue_epoch // HOUR_SECONDS
+    hashes = {name: store.hour_hashes(name, issue_hour, MAX_HORIZON_HOURS) for name in candidates}
+    changed = []
+    for name in candidates:
+        entry = stored.get(name)
+        offset = issue_hour - entry["start"] // HOUR_SECONDS if entry is not None else 0
+        if (not force and entry is not None
+                and np.array_equal(hashes[name][:MAX_HORIZON_HOURS - offset], entry["hashes"][offset:])):
+            kept[name] = {**entry, "input_version": versions[name]}
+        else:
+            changed.append(name)
+
+    # Score the changed sites in batch with the weather just loaded
+    values = score_sites(changed, issue_time.replace(tzinfo=None), store) if changed else None
+    computed = {name: {"start": issue_epoch, "values": values[i], "input_version": versions[name],
+                       "hashes": hashes[name], "computed_at": int(now.timestamp())}
+                for i, name in enumerate(changed)}
+
+    entries = [computed.get(name) or kept[name] for name in names]
+    forecasts = PrecomputedForecasts.build(
+        names,
+        [entry["start"] for entry in entries],
+        np.stack([entry["values"] for entry in entries]) if entries else np.zeros((0, MAX_HORIZON_HOURS)),
+        [entry["input_version"] for entry in entries],
+        [entry["computed_at"] for entry in entries],
+        meta={"model_version": version, "issued_at": issue_epoch, "updated_at": int(now.timestamp())}
+    )
+    # Hashes first: a forecast is never published without the hashes it was scored from
+    write_input_hashes(container_client, names, [entry["start"] for entry in entries],
+                       np.stack([entry["hashes"] for entry in entries]) if entries
+                       else np.zeros((0, MAX_HORIZON_HOURS)))
+    size = write_precomputed(container_client, forecasts)
+
+    counter("precompute_sites_total").inc(len(changed), result="scored")
+    counter("precompute_sites_total").inc(len(kept), result="reused")
+    return {"sites": len(names), "scored": len(changed), "reused": len(kept),
+            "unchanged_blob": len(names) - len(candidates), "bytes": size}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='solar_forecast_rf_model.joblib')
+    parser.add_argument('--sites', nargs='*', help="Site names (default: every site in the registry)")
+    parser.add_argument('--force', action='store_true', help="Rescore every site")
+    parser.add_argument('--watch', action='store_true', help="Run after every collection")
+    parser.add_argument('--poll-seconds', type=float, default=60)
+    args = parser.parse_args()
+
+    registry = load_site_registry()
+    sites = [registry.get(name) for name in args.sites] if args.sites else list(registry)
+    container_client = get_container_client()
+
+    last_marker = None
+    while True:
+        marker = collection_marker_etag(container_client)
+        if not args.watch or marker != last_marker:
+            start = time.perf_counter()
+            result = precompute(container_client, sites, args.model, force=args.force)
+            print(f"{pd.Timestamp.now(tz='UTC'):%Y-%m-%d %H:%M}: {result['scored']} of {result['sites']} sites scored, "
+                  f"{result['reused']} reused ({result['unchanged_blob']} with unchanged blobs), "
+                  f"{result['bytes']:,} bytes in {time.perf_counter() - start:.2f}s")
+            instrumentation.flush()
+            last_marker = marker
+        if not args.watch:
+            break
+        time.sleep(args.poll_seconds)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+../shared/quantiles.py
\ No newline at end of file
@@ -0,0 +1,94 @@
+# Compare retraining strategies on a site's history
+# Reports fit time, peak memory and holdout MAE/RMSE for each strategy in training.py.
+# The holdout is the most recent 20% of rows, so every strategy is scored on the future.
+# Usage:
+#   python retrain.py --site solar_farm_1 [--strategy all] [--window-days 14]
+#                     [--trees-per-update 20] [--max-trees 200] [--half-life-days 30]
+#                     [--save warm_start]
+# Set LOCAL_BLOB_ROOT to read from a local folder instead of Azure Storage.
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import joblib
+
+from blob_loader import get_container_client, iter_blob_records
+from features import FeaturePipeline, feature_sidecar_path, materialize_features
+from flat_forest import update_flat_export
+from site_registry import load_site_registry
+from training import STRATEGIES, generate_synthetic_solar_data, run_strategy, time_holdout_split, warm_start_base
+from weather_processing import clean_weather_data, process_weather_data
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+def _run_isolated(strategy, train_df, holdout_df, features, options, base_model_file, queue):
+    keep_model = options.pop('keep_model', False)
+    base_model = None
+    if strategy == 'warm_start' and base_model_file and os.path.exists(base_model_file):
+        base_model = warm_start_base(joblib.load(base_model_file), features)
+
+    rss_before = _peak_rss_mb()
+    model, report = run_strategy(strategy, train_df, holdout_df, features,
+                                 base_model=base_model, **options)
+    report['peak_rss_mb'] = _peak_rss_mb() - rss_before
+    queue.put((report, model if keep_model else None))
+
+def load_site_features(site_name, model_file):
+    site = load_site_registry().get(site_name)
+    raw_data = iter_blob_records(get_container_client(), site_name,
+                                 keep_fields=['timestamp', 'location', 'current', 'forecast'])
+    solar_df = generate_synthetic_solar_data(clean_weather_data(process_weather_data(raw_data)), site['capacity_kw'],
+                                             site['lat'], site['lon'])
+    pipeline = FeaturePipeline.for_model(model_file).fit(solar_df)
+    return materialize_features(solar_df, pipeline, f"features/{site_name}.parquet"), pipeline
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--site', default=None, help="Site name (default: first in the registry)")
+    parser.add_argument('--strategy', default='all', choices=('all',) + STRATEGIES)
+    parser.add_argument('--model', default='solar_forecast_rf_model.joblib',
+                        help="Previous model used as the warm-start base")
+    parser.add_argument('--window-days', type=int, default=14)
+    parser.add_argument('--trees-per-update', type=int, default=20)
+    parser.add_argument('--max-trees', type=int, default=200)
+    parser.add_argument('--half-life-days', type=float, default=30)
+    parser.add_argument('--save', choices=STRATEGIES, help="Save this strategy's model to --model")
+    args = parser.parse_args()
+
+    site_name = args.site or load_site_registry().names()[0]
+    features_df, pipeline = load_site_features(site_name, args.model)
+    train_df, holdout_df = time_holdout_split(features_df)
+    features = pipeline.feature_names
+    print(f"{site_name}: {len(train_df)} training rows, {len(holdout_df)} holdout rows")
+
+    strategies = STRATEGIES if args.strategy == 'all' else (args.strategy,)
+    options = {'window_days': args.window_days, 'trees_per_update': args.trees_per_update,
+               'max_trees': args.max_trees, 'half_life_days': args.half_life_days}
+
+    # Each strategy runs in a fresh process so peak memory is measured in isolation
+    ctx = multiprocessing.get_context('spawn')
+    print(f"{'strategy':>11} {'fit (s)':>8} {'peak RSS +MB':>13} {'MAE':>8} {'RMSE':>8}")
+    for strategy in strategies:
+        queue = ctx.Queue()
+        run_options = {**options, 'keep_model': strategy == args.save}
+        proc = ctx.Process(target=_run_isolated,
+                           args=(strategy, train_df, holdout_df, features, run_options, args.model, queue))
+        proc.start()
+        report, model = queue.get()
+        proc.join()
+        print(f"{strategy:>11} {report['fit_seconds']:>8.2f} {report['peak_rss_mb']:>13.1f} "
+              f"{report['mae']:>8.2f} {report['rmse']:>8.2f}")
+
+        if model is not None:
+            joblib.dump(model, args.model)
+            pipeline.save(feature_sidecar_path(args.model))
+            update_flat_export(model, args.model)
+            print(f"Saved {strategy} model to {args.model}")
+
+if __name__ == '__main__':
+    main()
@@ -1,67 +1,234 @@
 import json
+import logging
+import os
 import joblib
 import numpy as np
 import pandas as pd
 
-def init():
-    global model
-    model_path = 'solar_forecast_rf_model.joblib'
-    model = joblib.load(model_path)
+from features import FeaturePipeline
+from flat_forest import FlatForestVersionError, flat_model_path, load_forest, tree_predictions, tree_quantiles
+from feature_store import ForecastFeatureStore
+from instrumentation import counter, histogram, timed
+from micro_batching import MicroBatcher
+from quantiles import parse_quantiles, quantile_name
+from site_registry import load_site_registry
+from solar_geometry import DEFAULT_LATITUDE, DEFAULT_LONGITUDE, ClearSkyCache
+
+feature_store = None
+# Set by init when SCORE_BATCH_WAIT_MS > 0: concurrent run() calls are queued and
+# scored together (see micro_batching.py)
+batcher = None
+# Registered sites' coordinates; clear-sky irradiance per site and day is cached
+site_coordinates = {}
+clear_sky_cache = ClearSkyCache()
+
+# Rows per model.predict call, one week per site up to a few thousand sites
+BATCH_ROW_BUCKETS = (168, 672, 1680, 16800, 168000, 840000)
+
+# Timings go to instrumentation; with OTEL_EXPORTER_OTLP_ENDPOINT set they are
+# exported (the managed endpoint has no metrics route; score_server.py serves /metrics)
+@timed("score_init_seconds")
+def init(model_path=None):
+    global feature_store, batcher
+    # Registered models are mounted under AZUREML_MODEL_DIR (see deploy_model.py)
+    model_path = model_path or os.path.join(os.environ.get("AZUREML_MODEL_DIR", ""), "model_artifacts" if
+                                            os.environ.get("AZUREML_MODEL_DIR") else "",
+                                            'solar_forecast_rf_model.joblib')
+    registry = load_model(model_path)
+
+    # Weather forecasts for every registered site, loaded FEATURE_STORE_LOAD_WORKERS
+    # sites at a time before the first request and refreshed in the background
+    if os.environ.get("STORAGE_CONNECTION_STRING") or os.environ.get("LOCAL_BLOB_ROOT"):
+        from blob_loader import get_container_client
+        feature_store = ForecastFeatureStore(
+            get_container_client(),
+            registry.names(),
+            refresh_seconds=int(os.environ.get("FEATURE_STORE_REFRESH_SECONDS", 900)),
+            max_workers=int(os.environ.get("FEATURE_STORE_LOAD_WORKERS", 8))
+        ).refresh().start()
+
+    # Cross-request batching: wait up to SCORE_BATCH_WAIT_MS for more requests,
+    # scoring at most SCORE_MAX_BATCH_SIZE per call. Off by default.
+    wait_ms = float(os.environ.get("SCORE_BATCH_WAIT_MS", 0))
+    if wait_ms > 0:
+        batcher = MicroBatcher(score_options, max_wait_ms=wait_ms,
+                               max_batch_size=int(os.environ.get("SCORE_MAX_BATCH_SIZE", 64))).start()
+
+# Model, feature pipeline and site coordinates; also used by precompute.py,
+# which scores in batch without the endpoint's background feature store
+def load_model(model_path):
+    global model, feature_pipeline, site_coordinates
+    # Prefer the flat export: memory-mapped, so it loads in milliseconds and its
+    # pages are shared by every worker process on the instance
+    model = None
+    if os.path.exists(flat_model_path(model_path)):
+        try:
+            model = load_forest(flat_model_path(model_path))
+        except FlatForestVersionError as e:
+            # e.g. a deployment still holding an older export: serve the joblib model
+            logging.warning(f"{e}; loading {model_path} instead")
+    if model is None:
+        model = joblib.load(model_path)
+    # Same feature columns and one-hot vocabulary the model was trained with
+    feature_pipeline = FeaturePipeline.for_model(model_path)
+
+    registry = load_site_registry()
+    site_coordinates = {site["name"]: (site["lat"], site["lon"]) for site in registry}
+    return registry
+
+# Coordinates from the request, else the registry, else the default site
+def request_coordinates(req):
+    if req.get('latitude') is not None and req.get('longitude') is not None:
+        return float(req['latitude']), float(req['longitude'])
+    return site_coordinates.get(req.get('location'), (DEFAULT_LATITUDE, DEFAULT_LONGITUDE))
+
+# Build the feature matrix for a whole forecast horizon in one NumPy pass.
+# store: feature store to read weather from, instead of the endpoint's (init)
+def build_feature_matrix(start_time, hours, location=None, coordinates=None, store=None):
+    store = store if store is not None else feature_store
+    timestamps = pd.date_range(start_time, periods=hours, freq='h')
+    latitude, longitude = coordinates or site_coordinates.get(location, (DEFAULT_LATITUDE, DEFAULT_LONGITUDE))
+    # Naive start times are UTC, like the collector's timestamps
+    ghi = clear_sky_cache.hourly(latitude, longitude, timestamps[0], hours)
+
+    # Weather for these hours from the feature store; without one (or for an
+    # unknown location) the store's defaults, i.e. the old placeholder values
+    if store is not None:
+        weather = store.lookup(location, timestamps)
+    else:
+        weather = {'temperature': 25, 'cloud_cover': 30, 'wind_speed': 5, 'weather_description': None}
+    X = feature_pipeline.transform_arrays(
+        timestamps,
+        temperature=weather['temperature'],
+        cloud_cover=weather['cloud_cover'],
+        wind_speed=weather['wind_speed'],
+        weather_description=weather['weather_description'],
+        clear_sky_ghi=ghi
+    )
+
+    # No production while the sun is below the horizon for the whole hour
+    night_mask = ghi == 0
+
+    return timestamps, X, night_mask
+
+# Score several forecast requests with a single model.predict call
+# columnar=True returns epoch start + step + values instead of per-point ISO timestamps.
+# With quantiles, every tree's prediction for the whole batch comes from one
+# traversal; the forecast is their mean (the same as model.predict) and the
+# bands are their quantiles. The bands show how much the trees disagree, which
+# widens where training data was sparse or conflicting; they are not calibrated
+# prediction intervals. store: weather source, as in build_feature_matrix (the
+# precompute job passes its own).
+def predict_batch(requests, start_time=None, columnar=False, quantiles=None, store=None):
+    if start_time is None:
+        start_time = pd.Timestamp.now().floor('h')
+
+    with timed("score_features_seconds"):
+        horizons = []
+        for req in requests:
+            hours = int(req.get('forecast_days', 7)) * 24
+            horizons.append(build_feature_matrix(start_time, hours, req.get('location'), request_coordinates(req),
+                                                 store))
+
+        X = np.concatenate([h[1] for h in horizons])
+        night_mask = np.concatenate([h[2] for h in horizons])
+
+    bands = None
+    with timed("score_predict_seconds", quantiles=bool(quantiles)):
+        if quantiles:
+            per_tree = tree_predictions(model, X)
+            predictions = per_tree.mean(axis=1)
+            bands = tree_quantiles(per_tree, quantiles).T
+            bands[:, night_mask] = 0
+        else:
+            predictions = model.predict(X)
+    predictions[night_mask] = 0
+    histogram("score_batch_rows", buckets=BATCH_ROW_BUCKETS).observe(len(X))
+
+    # Split the stacked predictions back out per request
+    results = []
+    offset = 0
+    for req, (timestamps, _, _) in zip(requests, horizons):
+        rows = slice(offset, offset + len(timestamps))
+        values = predictions[rows]
+        offset += len(timestamps)
+        if columnar:
+            result = {
+                "location": req.get('location'),
+                "start": int(timestamps[0].timestamp()),
+                "step": 3600,
+                "values": values.round(3).tolist()
+            }
+        else:
+            result = {
+                "location": req.get('location'),
+                "timestamps": [ts.isoformat() for ts in timestamps],
+                "forecast_values": values.tolist()
+            }
+        if bands is not None:
+            result["quantiles"] = {
+                quantile_name(q): (band[rows].round(3) if columnar else band[rows]).tolist()
+                for q, band in zip(quantiles, bands)
+            }
+        results.append(result)
+
+    return results
+
+# predict_batch with the request options as one hashable tuple, for the batcher
+def score_options(requests, options):
+    columnar, quantiles = options
+    return predict_batch(requests, columnar=columnar, quantiles=quantiles)
+
+# Through the batcher when it is running, else scored directly
+def score_requests(requests, columnar=False, quantiles=None):
+    if batcher is not None:
+        return batcher.submit(requests, (columnar, quantiles))
+    return predict_batch(requests, columnar=columnar, quantiles=quantiles)
+
+# Malformed or invalid requests (bad JSON, unknown fields, out-of-range values);
+# anything else raised while scoring is a server-side failure
+CLIENT_ERRORS = (ValueError, TypeError, KeyError)
 
 def run(raw_data):
+    return score_response(raw_data)[1]
+
+# (HTTP status, JSON body): 400 for client errors, 500 for scoring failures
+def score_response(raw_data):
+    timer = timed("score_run_seconds", kind="invalid")
     try:
-        # Parse input data
-        data = json.loads(raw_data)
-        location = data.get('location')
-        forecast_days = data.get('forecast_days', 7)
-        
-        # Generate timestamps for the forecast period
-        timestamps = []
-        forecast_values = []
-        
-        # Current time as starting point
-        start_time = pd.Timestamp.now().floor('H')
-        
-        for i in range(forecast_days * 24):
-            current_time = start_time + pd.Timedelta(hours=i)
-            
-            # Extract features
-            hour = current_time.hour
-            month = current_time.month
-            
-            # Create cyclical time features
-            hour_sin = np.sin(2 * np.pi * hour / 24)
-            hour_cos = np.cos(2 * np.pi * hour / 24)
-            month_sin = np.sin(2 * np.pi * month / 12)
-            month_cos = np.cos(2 * np.pi * month / 12)
-            
-            # Get weather data for this timestamp
-            # In a production system, this would come from a weather API or database
-            # For now, we'll use placeholder values
-            temperature = 25  # Placeholder
-            cloud_cover = 30  # Placeholder
-            wind_speed = 5    # Placeholder
-            
-            # Create feature vector
-            features = [temperature, cloud_cover, wind_speed, 
-                        hour_sin, hour_cos, month_sin, month_cos]
-            
-            # Make prediction
-            prediction = model.predict([features])[0]
-            
-            # No production at night (simplification)
-            if hour < 6 or hour > 18:
-                prediction = 0
-                
-            # Add to results
-            timestamps.append(current_time.isoformat())
-            forecast_values.append(float(prediction))
-        
-        # Return the forecast
-        return json.dumps({
-            "timestamps": timestamps,
-            "forecast_values": forecast_values
-        })
-        
+        with timer:
+            # Parse input data
+            data = json.loads(raw_data)
+            if not isinstance(data, (dict, list)):
+                raise ValueError("Expected a forecast request object or a list of requests")
+
+            # A fleet payload is either a list of requests or {"requests": [...]};
+            # {"requests": [...], "format": "columnar"} skips the per-point timestamps.
+            # A request may pass latitude/longitude for sites not in the registry.
+            # "quantiles": true (P10/P50/P90) or a list of levels adds forecast bands.
+            quantiles = parse_quantiles(data.get('quantiles')) if isinstance(data, dict) else None
+            if isinstance(data, list) or 'requests' in data:
+                requests = data if isinstance(data, list) else data['requests']
+                columnar = isinstance(data, dict) and data.get('format') == 'columnar'
+                timer.labels["kind"] = "columnar" if columnar else "fleet"
+                counter("score_sites_total").inc(len(requests))
+                return 200, json.dumps({"forecasts": score_requests(requests, columnar=columnar, quantiles=quantiles)})
+
+            timer.labels["kind"] = "single"
+            counter("score_sites_total").inc()
+            forecast = score_requests([data], quantiles=quantiles)[0]
+
+            # Return the forecast
+            response = {
+                "timestamps": forecast["timestamps"],
+                "forecast_values": forecast["forecast_values"]
+            }
+            if quantiles:
+                response["quantiles"] = forecast["quantiles"]
+            return 200, json.dumps(response)
+
     except Exception as e:
-        return json.dumps({"error": str(e)})
\ No newline at end of file
+        # Callers still get a JSON error, but the failure is counted and logged
+        counter("score_errors_total").inc(error=type(e).__name__)
+        logging.exception("Scoring request failed")
+        return (400 if isinstance(e, CLIENT_ERRORS) else 500), json.dumps({"error": str(e)})
@@ -0,0 +1,79 @@
+# Self-hosted scoring server: score.py behind a threaded HTTP server
+# For running the scoring service outside Azure ML (or locally for load tests).
+# Every connection gets its own thread, so concurrent requests reach score.run at
+# the same time and, with --batch-wait-ms, are scored together by the micro-batcher.
+#   POST /score    - same payloads and responses as the Azure ML endpoint
+#   GET  /metrics  - Prometheus text format (queue depth, batch sizes, timings)
+#   GET  /health
+# Usage:
+#   python score_server.py [--model solar_forecast_rf_model.joblib] [--port 8890]
+#                          [--batch-wait-ms 5] [--max-batch-size 64]
+# --batch-wait-ms 0 scores every request on its own. Set LOCAL_BLOB_ROOT or
+# STORAGE_CONNECTION_STRING to score with collected weather, as score.init does.
+
+import argparse
+import json
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import score
+from instrumentation import render_prometheus
+
+class ScoreHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so load generators don't pay a TCP handshake per request; headers
+    # and body go out as separate writes, so Nagle would hold the body for an ACK
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        if self.path != "/score":
+            self._send(404, json.dumps({"error": "Not found"}).encode("utf-8"))
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        status, response = score.score_response(body)
+        self._send(status, response.encode("utf-8"))
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send(200, render_prometheus().encode("utf-8"), "text/plain; version=0.0.4")
+        elif self.path == "/health":
+            self._send(200, b'{"status": "ok"}')
+        else:
+            self._send(404, json.dumps({"error": "Not found"}).encode("utf-8"))
+
+    def _send(self, status, body, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class ScoreServer(ThreadingHTTPServer):
+    # Room for a burst of clients connecting at once (the default backlog is 5)
+    request_queue_size = 128
+    daemon_threads = True
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='solar_forecast_rf_model.joblib')
+    parser.add_argument('--port', type=int, default=8890)
+    parser.add_argument('--batch-wait-ms', type=float, default=float(os.environ.get("SCORE_BATCH_WAIT_MS", 5)),
+                        help="Longest a request waits for others to batch with (0 disables batching)")
+    parser.add_argument('--max-batch-size', type=int, default=int(os.environ.get("SCORE_MAX_BATCH_SIZE", 64)),
+                        help="Most forecast requests per batched model call")
+    args = parser.parse_args()
+
+    os.environ["SCORE_BATCH_WAIT_MS"] = str(args.batch_wait_ms)
+    os.environ["SCORE_MAX_BATCH_SIZE"] = str(args.max_batch_size)
+    score.init(args.model)
+
+    server = ScoreServer(("localhost", args.port), ScoreHandler)
+    batching = f"batching up to {args.max_batch_size} within {args.batch_wait_ms:g} ms" if score.batcher else "no batching"
+    print(f"Scoring server on http://localhost:{args.port} ({batching})", flush=True)
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
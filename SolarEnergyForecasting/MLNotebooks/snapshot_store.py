@@ -0,0 +1 @@
+../shared/snapshot_store.py
\ No newline at end of file
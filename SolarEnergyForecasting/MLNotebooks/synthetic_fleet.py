@@ -0,0 +1,80 @@
+# Synthetic collector data for benchmarks at fleet scale
+# Snapshots use the exact JSON schema WeatherDataFunction writes (current weather
+# plus the OpenWeatherMap 3-hourly forecast list) and are stored in the daily
+# NDJSON layout of snapshot_store, so every reader runs its real code path.
+
+from datetime import datetime, timedelta, timezone
+import numpy as np
+
+from snapshot_store import encode_snapshot, snapshot_blob_name
+
+DESCRIPTIONS = ['clear sky', 'few clouds', 'scattered clouds', 'broken clouds',
+                'overcast clouds', 'light rain', 'moderate rain']
+
+DEFAULT_START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+# Hourly snapshots shaped like the collector's blobs
+def synthetic_snapshots(n_snapshots, n_periods, seed=42, location="solar_farm_1",
+                        latitude=40.7128, longitude=-74.0060, start=DEFAULT_START):
+    rng = np.random.default_rng(seed)
+    snapshots = []
+    for i in range(n_snapshots):
+        issued = start + timedelta(hours=i)
+        base_dt = int(issued.timestamp()) // 10800 * 10800 + 10800
+        snapshots.append({
+            "timestamp": issued.isoformat(),
+            "location": location,
+            "latitude": latitude,
+            "longitude": longitude,
+            "current": {
+                "temperature": float(rng.normal(15, 8)),
+                "clouds": int(rng.integers(0, 101)),
+                "weather_description": DESCRIPTIONS[rng.integers(len(DESCRIPTIONS))],
+                "wind_speed": float(rng.gamma(2, 2))
+            },
+            "forecast": [
+                {
+                    "dt": base_dt + 10800 * p,
+                    "main": {"temp": float(rng.normal(15, 8))},
+                    "clouds": {"all": int(rng.integers(0, 101))},
+                    "wind": {"speed": float(rng.gamma(2, 2))},
+                    "weather": [{"description": DESCRIPTIONS[rng.integers(len(DESCRIPTIONS))]}]
+                }
+                for p in range(n_periods)
+            ]
+        })
+    return snapshots
+
+# Site registry entries scattered over the continental US
+def synthetic_sites(n_sites, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "name": f"synthetic_site_{i}",
+            "lat": round(float(rng.uniform(25, 49)), 4),
+            "lon": round(float(rng.uniform(-124, -67)), 4),
+            "capacity_kw": float(rng.choice([50, 100, 250, 500])),
+            "tilt": 30,
+            "azimuth": 180,
+            "timezone": "UTC"
+        }
+        for i in range(n_sites)
+    ]
+
+# Write `days` of hourly snapshots per site as daily NDJSON blobs; returns
+# (snapshot count, bytes written)
+def write_fleet(container_client, sites, days, n_periods=40, seed=0, start=DEFAULT_START):
+    n_snapshots = 0
+    n_bytes = 0
+    for i, site in enumerate(sites):
+        snapshots = synthetic_snapshots(days * 24, n_periods, seed=seed + i, location=site["name"],
+                                        latitude=site["lat"], longitude=site["lon"], start=start)
+        for day in range(days):
+            day_snapshots = snapshots[day * 24:(day + 1) * 24]
+            date_str = (start + timedelta(days=day)).strftime('%Y-%m-%d')
+            payload = "".join(encode_snapshot(snapshot) for snapshot in day_snapshots).encode('utf-8')
+            container_client.get_blob_client(snapshot_blob_name(site["name"], date_str)).upload_blob(
+                payload, overwrite=True)
+            n_snapshots += len(day_snapshots)
+            n_bytes += len(payload)
+    return n_snapshots, n_bytes
@@ -0,0 +1,196 @@
+# Per-site training orchestrator
+# Fans load -> process -> features -> fit -> evaluate -> save out across a process
+# pool, one site per task. Sites whose input blobs (names + etags) are unchanged
+# since the last run are skipped. Results go to {output_dir}/manifest.json, with
+# each site's per-stage timings (also recorded as training_stage_seconds).
+# Usage:
+#   python train_sites.py [--sites solar_farm_1 solar_farm_2] [--workers 4]
+#                         [--max-memory-mb 4096] [--strategy full] [--prophet] [--force]
+#                         [--rf-params '{"max_depth": 10}']  (e.g. the best from backtest.py)
+# Set LOCAL_BLOB_ROOT to read from a local folder instead of Azure Storage.
+
+import argparse
+import hashlib
+import json
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+import joblib
+
+from blob_loader import get_container_client, iter_blob_records
+from features import FeaturePipeline, feature_sidecar_path, materialize_features
+from flat_forest import update_flat_export
+import instrumentation
+from instrumentation import timed
+from prophet_model import fit_site as fit_prophet_site
+from site_registry import load_site_registry
+from training import STRATEGIES, generate_synthetic_solar_data, run_strategy, time_holdout_split, warm_start_base
+from weather_processing import clean_weather_data, process_weather_data
+
+MODEL_FILENAME = "solar_forecast_rf_model.joblib"
+MANIFEST_FILENAME = "manifest.json"
+
+# Fingerprint of a site's inputs from the blob listing alone (no downloads)
+def input_hash(container_client, site_name):
+    digest = hashlib.sha256()
+    for blob in container_client.list_blobs(name_starts_with=f"{site_name}/"):
+        digest.update(f"{blob.name}\0{blob.etag}\n".encode())
+    return digest.hexdigest()
+
+def read_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return {"sites": {}}
+    with open(path) as f:
+        return json.load(f)
+
+def write_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_FILENAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+# Worker initializer: cap each worker's address space so one large site can't
+# take the whole machine down; the site fails with MemoryError instead
+def _limit_memory(max_memory_mb):
+    if max_memory_mb:
+        limit = max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def train_site(site, output_dir, data_hash, strategy='full', rf_params=None, prophet=False):
+    start = time.perf_counter()
+    site_name = site["name"]
+    site_dir = os.path.join(output_dir, site_name)
+    os.makedirs(site_dir, exist_ok=True)
+    model_file = os.path.join(site_dir, MODEL_FILENAME)
+
+    stage_seconds = {}
+
+    def stage(name):
+        timer = timed("training_stage_seconds", stage=name)
+        stage_seconds[name] = timer
+        return timer
+
+    # Load and process (blobs are read lazily while processing)
+    with stage("load_process"):
+        raw_data = iter_blob_records(get_container_client(), site_name, max_workers=4,
+                                     keep_fields=['timestamp', 'location', 'current', 'forecast'])
+        weather_df = clean_weather_data(process_weather_data(raw_data))
+        solar_df = generate_synthetic_solar_data(weather_df, site['capacity_kw'], site['lat'], site['lon'])
+    if solar_df.empty:
+        raise ValueError(f"No data for {site_name}")
+
+    # Features
+    with stage("features"):
+        pipeline = FeaturePipeline.for_model(model_file).fit(solar_df)
+        features_df = materialize_features(solar_df, pipeline, os.path.join(site_dir, "features.parquet"))
+        train_df, holdout_df = time_holdout_split(features_df)
+
+    # Fit and evaluate
+    with stage("fit"):
+        base_model = None
+        if strategy == 'warm_start' and os.path.exists(model_file):
+            base_model = warm_start_base(joblib.load(model_file), pipeline.feature_names)
+            if base_model is not None:
+                base_model.set_params(**(rf_params or {}))
+        model, report = run_strategy(strategy, train_df, holdout_df, pipeline.feature_names,
+                                     base_model=base_model, rf_params=rf_params)
+
+    # Save
+    with stage("save"):
+        joblib.dump(model, model_file)
+        pipeline.save(feature_sidecar_path(model_file))
+        # Memory-mappable copy for scoring; only forests have one
+        update_flat_export(model, model_file)
+
+    entry = {
+        "model_file": model_file,
+        "feature_file": feature_sidecar_path(model_file),
+        "input_hash": data_hash,
+        "strategy": strategy,
+        "train_rows": len(train_df),
+        "holdout_rows": len(holdout_df),
+        "metrics": {"mae": report["mae"], "rmse": report["rmse"]},
+        "fit_seconds": round(report["fit_seconds"], 3),
+        "trained_at": datetime.now(timezone.utc).isoformat()
+    }
+
+    # Optional Prophet model alongside the forest, warm-started from the last run
+    if prophet:
+        with stage("prophet"):
+            result = fit_prophet_site(site_name, solar_df, weather_df, site_dir)
+        entry["prophet_file"] = result["model_file"]
+        entry["prophet_fit_seconds"] = round(result["fit_seconds"], 3)
+
+    entry["stage_seconds"] = {name: round(timer.seconds, 3) for name, timer in stage_seconds.items()}
+    entry["total_seconds"] = round(time.perf_counter() - start, 3)
+    # Pool workers exit without atexit hooks, so push any OTLP export now
+    instrumentation.flush()
+    return entry
+
+def train_all(sites, output_dir="models", workers=None, max_memory_mb=None,
+              strategy='full', force=False, prophet=False, rf_params=None):
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = read_manifest(output_dir)
+    container_client = get_container_client()
+
+    # Skip sites whose inputs haven't changed since their last successful run
+    pending = []
+    for site in sites:
+        data_hash = input_hash(container_client, site["name"])
+        previous = manifest["sites"].get(site["name"], {})
+        if not force and previous.get("input_hash") == data_hash and "error" not in previous:
+            print(f"{site['name']}: inputs unchanged, skipping")
+            continue
+        pending.append((site, data_hash))
+
+    # Parallelism is across sites, so each forest fits single-threaded
+    rf_params = {**(rf_params or {}), 'n_jobs': 1}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_limit_memory,
+                             initargs=(max_memory_mb,)) as executor:
+        futures = {
+            executor.submit(train_site, site, output_dir, data_hash, strategy, rf_params, prophet): site["name"]
+            for site, data_hash in pending
+        }
+        for future in as_completed(futures):
+            site_name = futures[future]
+            try:
+                entry = future.result()
+                print(f"{site_name}: MAE {entry['metrics']['mae']:.2f} kWh, "
+                      f"RMSE {entry['metrics']['rmse']:.2f} kWh in {entry['total_seconds']:.1f}s")
+            except Exception as e:
+                entry = {"error": f"{type(e).__name__}: {e}"}
+                print(f"{site_name}: failed ({entry['error']})")
+            manifest["sites"][site_name] = entry
+
+    manifest["updated_at"] = datetime.now(timezone.utc).isoformat()
+    write_manifest(output_dir, manifest)
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sites', nargs='*', help="Site names (default: every site in the registry)")
+    parser.add_argument('--output-dir', default='models')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--max-memory-mb', type=int, default=None, help="Address-space cap per worker")
+    parser.add_argument('--strategy', default='full', choices=STRATEGIES)
+    parser.add_argument('--prophet', action='store_true', help="Also fit a Prophet model per site")
+    parser.add_argument('--force', action='store_true', help="Retrain even if inputs are unchanged")
+    parser.add_argument('--rf-params', type=json.loads, default=None,
+                        help="JSON RandomForest parameters overriding training.RF_PARAMS")
+    args = parser.parse_args()
+
+    registry = load_site_registry()
+    sites = [registry.get(name) for name in args.sites] if args.sites else list(registry)
+
+    start = time.perf_counter()
+    train_all(sites, args.output_dir, args.workers, args.max_memory_mb, args.strategy, args.force,
+              args.prophet, args.rf_params)
+    print(f"Processed {len(sites)} sites in {time.perf_counter() - start:.1f}s; "
+          f"manifest at {os.path.join(args.output_dir, MANIFEST_FILENAME)}")
+
+if __name__ == '__main__':
+    main()
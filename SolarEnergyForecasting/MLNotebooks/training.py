@@ -0,0 +1,136 @@
+# Model fitting strategies for the solar forecast
+#   full        - RandomForest refit from scratch on all history (the original approach)
+#   warm_start  - keep the previous forest and add trees fitted on a recent window;
+#                 the oldest trees are retired so the forest slides forward in time
+#   hist_gb     - HistGradientBoosting on all history with exponential time-decay weights
+
+import time
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+from solar_geometry import DEFAULT_LATITUDE, DEFAULT_LONGITUDE, STC_IRRADIANCE, clear_sky_ghi
+
+STRATEGIES = ('full', 'warm_start', 'hist_gb')
+
+RF_PARAMS = {'n_estimators': 100, 'max_depth': 15, 'random_state': 42, 'n_jobs': -1}
+
+# Load sample solar production data
+# In a real project, you would load actual solar production data
+# For this example, we'll create synthetic data based on weather conditions
+def generate_synthetic_solar_data(weather_df, capacity_kw=100, latitude=DEFAULT_LATITUDE,
+                                  longitude=DEFAULT_LONGITUDE):
+    # Filter out forecast data
+    actual_weather = weather_df[weather_df.get('is_forecast', False) == False].copy()
+
+    # Clear-sky irradiance for the hour of each observation at the site's coordinates;
+    # kept as a model feature (see features.BASE_FEATURES)
+    actual_weather['clear_sky_ghi'] = clear_sky_ghi(latitude, longitude, actual_weather['timestamp'].dt.floor('h'))
+
+    # Simple model: more sun (less cloud) = more energy
+    # Temperature also affects panel efficiency
+    actual_weather['solar_energy_kwh'] = (
+        actual_weather['clear_sky_ghi'] / STC_IRRADIANCE *
+        (100 - actual_weather['cloud_cover']) / 100 *
+        (1 + (actual_weather['temperature'] - 25) * 0.005) *  # Temperature coefficient
+        capacity_kw  # Base energy for the site's installed capacity
+    )
+
+    # Add noise to make it more realistic
+    actual_weather['solar_energy_kwh'] += np.random.normal(0, 5, size=len(actual_weather))
+
+    # No production while the sun is below the horizon for the whole hour
+    actual_weather['hour'] = actual_weather['timestamp'].dt.hour
+    actual_weather.loc[actual_weather['clear_sky_ghi'] == 0, 'solar_energy_kwh'] = 0
+
+    return actual_weather
+
+# Last holdout_fraction of rows in time order, so evaluation never sees the future
+def time_holdout_split(df, holdout_fraction=0.2):
+    df = df.sort_values('timestamp', kind='stable')
+    cutoff = int(len(df) * (1 - holdout_fraction))
+    return df.iloc[:cutoff], df.iloc[cutoff:]
+
+def recent_window(df, window_days):
+    cutoff = df['timestamp'].max() - pd.Timedelta(days=window_days)
+    return df[df['timestamp'] > cutoff]
+
+def time_decay_weights(timestamps, half_life_days):
+    timestamps = pd.Series(timestamps)
+    age_days = (timestamps.max() - timestamps).dt.total_seconds().to_numpy() / 86400
+    return 0.5 ** (age_days / half_life_days)
+
+def fit_full_forest(X, y, **params):
+    model = RandomForestRegressor(**{**RF_PARAMS, **params})
+    return model.fit(X, y)
+
+# The previous model if it can be warm-started on `features`, else None (and a full
+# fit follows): only a random forest fitted on the same feature set qualifies, not
+# e.g. a saved hist_gb model
+def warm_start_base(model, features):
+    if not isinstance(model, RandomForestRegressor):
+        print(f"Previous model is a {type(model).__name__}, not a random forest; fitting from scratch")
+        return None
+    if model.n_features_in_ != len(features):
+        print(f"Previous model has {model.n_features_in_} features, now {len(features)}; fitting from scratch")
+        return None
+    return model
+
+# Add trees_per_update trees fitted on (X_recent, y_recent) to an already fitted forest
+def warm_start_forest(model, X_recent, y_recent, trees_per_update=20, max_trees=200):
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + trees_per_update)
+    model.fit(X_recent, y_recent)
+
+    # Sliding window over trees: drop the oldest once the forest is full
+    if len(model.estimators_) > max_trees:
+        model.estimators_ = model.estimators_[-max_trees:]
+        model.n_estimators = max_trees
+    return model
+
+def fit_hist_gradient_boosting(X, y, timestamps=None, half_life_days=None, **params):
+    model = HistGradientBoostingRegressor(**{'max_iter': 200, 'random_state': 42, **params})
+    sample_weight = None
+    if timestamps is not None and half_life_days:
+        sample_weight = time_decay_weights(timestamps, half_life_days)
+    return model.fit(X, y, sample_weight=sample_weight)
+
+def evaluate(model, X, y):
+    y_pred = model.predict(X)
+    return {
+        'mae': float(mean_absolute_error(y, y_pred)),
+        'rmse': float(np.sqrt(mean_squared_error(y, y_pred)))
+    }
+
+# Fit one strategy on train_df and score it on holdout_df; returns (model, report)
+def run_strategy(strategy, train_df, holdout_df, features, target='solar_energy_kwh',
+                 base_model=None, window_days=14, trees_per_update=20, max_trees=200,
+                 half_life_days=30, rf_params=None):
+    rf_params = rf_params or {}
+    if strategy == 'full':
+        start = time.perf_counter()
+        model = fit_full_forest(train_df[features], train_df[target], **rf_params)
+    elif strategy == 'warm_start':
+        recent = recent_window(train_df, window_days)
+        if base_model is None:
+            # No previous model: fit one on everything before the window first, or
+            # on the window itself when all history fits in it (a new site's first run)
+            older = train_df.drop(recent.index)
+            if older.empty:
+                older = recent
+            base_model = fit_full_forest(older[features], older[target], **rf_params)
+        start = time.perf_counter()
+        model = warm_start_forest(base_model, recent[features], recent[target],
+                                  trees_per_update=trees_per_update, max_trees=max_trees)
+    elif strategy == 'hist_gb':
+        start = time.perf_counter()
+        model = fit_hist_gradient_boosting(train_df[features], train_df[target],
+                                           timestamps=train_df['timestamp'],
+                                           half_life_days=half_life_days)
+    else:
+        raise ValueError(f"Unknown strategy {strategy!r}, expected one of {STRATEGIES}")
+
+    fit_seconds = time.perf_counter() - start
+    report = {'strategy': strategy, 'fit_seconds': fit_seconds,
+              **evaluate(model, holdout_df[features], holdout_df[target])}
+    return model, report
@@ -0,0 +1,154 @@
+# Flattening of raw collector snapshots into a typed weather DataFrame
+# Values are gathered into per-column lists in a single pass over the snapshots
+# (no per-row dicts) and converted to typed columns at the end:
+# float32 weather, categorical location/description, UTC datetime64 timestamps.
+# Every row carries its issue_time (when the snapshot was collected), so the
+# overlapping forecasts from successive snapshots can be told apart; see
+# clean_weather_data for the dedup/quality stage.
+
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+ONE_MICROSECOND = timedelta(microseconds=1)
+ONE_SECOND = timedelta(seconds=1)
+
+# Function to process raw data into a clean DataFrame
+def process_weather_data(raw_data):
+    ts_us = []
+    issue_us = []
+    locations = []
+    temperature = []
+    cloud_cover = []
+    wind_speed = []
+    descriptions = []
+    is_forecast = []
+
+    for entry in raw_data:
+        location = entry.get('location')
+
+        # Current weather
+        current = entry.get('current', {})
+        timestamp = datetime.fromisoformat(entry.get('timestamp').replace('Z', '+00:00'))
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+
+        issued = (timestamp - EPOCH) // ONE_MICROSECOND
+        ts_us.append(issued)
+        issue_us.append(issued)
+        locations.append(location)
+        temperature.append(current.get('temperature'))
+        cloud_cover.append(current.get('clouds'))
+        wind_speed.append(current.get('wind_speed'))
+        descriptions.append(current.get('weather_description'))
+        is_forecast.append(False)
+
+        # Forecast entries (OpenWeatherMap 'dt' is epoch seconds)
+        for forecast in entry.get('forecast', []):
+            ts_us.append(forecast.get('dt') * 1_000_000)
+            issue_us.append(issued)
+            locations.append(location)
+            temperature.append(forecast.get('main', {}).get('temp'))
+            cloud_cover.append(forecast.get('clouds', {}).get('all'))
+            wind_speed.append(forecast.get('wind', {}).get('speed'))
+            descriptions.append(forecast.get('weather', [{}])[0].get('description'))
+            is_forecast.append(True)
+
+    df = pd.DataFrame({
+        'timestamp': pd.to_datetime(np.array(ts_us, dtype=np.int64), unit='us', utc=True),
+        'location': pd.Categorical(locations),
+        'temperature': np.array(temperature, dtype=np.float32),
+        'cloud_cover': np.array(cloud_cover, dtype=np.float32),
+        'wind_speed': np.array(wind_speed, dtype=np.float32),
+        'weather_description': pd.Categorical(descriptions),
+        'is_forecast': np.array(is_forecast, dtype=bool),
+        'issue_time': pd.to_datetime(np.array(issue_us, dtype=np.int64), unit='us', utc=True)
+    })
+    return df
+
+# Plausible ranges for metric OpenWeatherMap values; anything outside (or NaN) is dropped
+WEATHER_LIMITS = {
+    'temperature': (-90, 60),
+    'cloud_cover': (0, 100),
+    'wind_speed': (0, 120)
+}
+
+FORECAST_POLICIES = ('freshest', 'lead_time')
+
+# Timestamps as tz-aware UTC; naive values are taken to be UTC already
+def to_utc(timestamps):
+    timestamps = pd.to_datetime(timestamps)
+    if timestamps.dt.tz is None:
+        return timestamps.dt.tz_localize('UTC')
+    return timestamps.dt.tz_convert('UTC')
+
+def quality_filter(weather_df):
+    valid = np.ones(len(weather_df), dtype=bool)
+    for column, (low, high) in WEATHER_LIMITS.items():
+        values = weather_df[column].to_numpy()
+        # NaN fails both comparisons
+        valid &= (values >= low) & (values <= high)
+    return weather_df[valid]
+
+# Forecast rows indexed by (location, target time, issue time), one row per key;
+# the index is sorted, so the last row of each (location, timestamp) group is
+# the freshest forecast for that hour
+def forecast_index(weather_df):
+    forecasts = weather_df[weather_df['is_forecast']]
+    forecasts = forecasts.drop_duplicates(subset=['location', 'timestamp', 'issue_time'], keep='last')
+    return forecasts.set_index(['location', 'timestamp', 'issue_time'], drop=False).sort_index()
+
+# Dedup/quality stage between process_weather_data and training
+#   observations - one row per (location, hour), the last one collected; the
+#                  row keeps its own timestamp, the hour is only the dedup key
+#   forecasts    - 'freshest' keeps only the most recent forecast per target hour;
+#                  'lead_time' keeps every issue and adds lead_time_hours
+#                  (target - issue), optionally capped at max_lead_hours
+def clean_weather_data(weather_df, forecast_policy='freshest', max_lead_hours=None):
+    if forecast_policy not in FORECAST_POLICIES:
+        raise ValueError(f"Unknown forecast policy {forecast_policy!r}, expected one of {FORECAST_POLICIES}")
+    weather_df = weather_df.assign(timestamp=to_utc(weather_df['timestamp']),
+                                   issue_time=to_utc(weather_df['issue_time']))
+    weather_df = quality_filter(weather_df)
+
+    observations = weather_df[~weather_df['is_forecast']]
+    hours = observations['timestamp'].dt.floor('h')
+    observations = observations[~pd.DataFrame({'location': observations['location'], 'hour': hours})
+                                .duplicated(keep='last').to_numpy()]
+
+    forecasts = forecast_index(weather_df).reset_index(drop=True)
+    forecasts['lead_time_hours'] = ((forecasts['timestamp'] - forecasts['issue_time']) /
+                                    pd.Timedelta(hours=1)).astype(np.float32)
+    if max_lead_hours is not None:
+        forecasts = forecasts[forecasts['lead_time_hours'] <= max_lead_hours]
+    if forecast_policy == 'freshest':
+        forecasts = forecasts.drop_duplicates(subset=['location', 'timestamp'], keep='last')
+        forecasts = forecasts.drop(columns=['lead_time_hours'])
+    else:
+        observations = observations.assign(lead_time_hours=np.float32(0))
+
+    cleaned = pd.concat([observations, forecasts], ignore_index=True)
+    return cleaned.sort_values(['timestamp', 'is_forecast'], kind='stable').reset_index(drop=True)
+
+# Freshest forecast per (location, target time), ordered by target time
+def latest_forecasts(weather_df, after=None):
+    forecasts = forecast_index(weather_df).reset_index(drop=True)
+    forecasts = forecasts.drop_duplicates(subset=['location', 'timestamp'], keep='last')
+    forecasts = forecasts.sort_values('timestamp', kind='stable')
+    if after is not None:
+        forecasts = forecasts[forecasts['timestamp'] > after]
+    return forecasts.reset_index(drop=True)
+
+# Linearly interpolate 3-hourly forecast columns onto target_times (held flat past the ends)
+def interpolate_to_hourly(forecast_df, target_times, columns=('temperature', 'cloud_cover', 'wind_speed')):
+    target = pd.DatetimeIndex(target_times)
+    if target.tz is None:
+        target = target.tz_localize('UTC')
+    # Interpolate on epoch seconds, independent of the datetime64 resolution
+    source = ((forecast_df['timestamp'] - EPOCH) / ONE_SECOND).to_numpy(dtype=np.float64)
+    target = ((target - EPOCH) / ONE_SECOND).to_numpy(dtype=np.float64)
+    return {
+        column: np.interp(target, source, forecast_df[column].to_numpy(dtype=np.float64))
+        for column in columns
+    }
@@ -1,28 +1,247 @@
-from flask import Flask, render_template, request
+from flask import Flask, Response, g, jsonify, render_template, request
 import os
 import json
+import time
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-import plotly
+from datetime import datetime, timezone
+from statistics import NormalDist
 import plotly.express as px
+import plotly.graph_objects as go
+
+from forecast_cache import cache_from_env
+from forecast_formats import MIMETYPES, available_formats, check_locations, compress, encode
+from forecast_store import precomputed_etag, read_precomputed
+from instrumentation import PROMETHEUS_CONTENT_TYPE, gauge, histogram, render_prometheus, timed
+from plot_payload import downsample, figure_json
+from quantiles import DEFAULT_QUANTILES, parse_quantiles, quantile_name
+import scoring_client
+from site_registry import load_site_registry
+from solar_geometry import DEFAULT_LATITUDE, DEFAULT_LONGITUDE, STC_IRRADIANCE, ClearSkyCache
 
 app = Flask(__name__)
+forecast_cache = cache_from_env()
+
+MODEL_PATH = os.environ.get("MODEL_PATH", "solar_forecast_rf_model.joblib")
+# How often the latest collector snapshot is looked up per location
+VERSION_CHECK_SECONDS = int(os.environ.get("VERSION_CHECK_SECONDS", 60))
+
+MAX_FORECAST_DAYS = 14
+# Serve forecasts from the precompute job's blob (MLNotebooks/precompute.py) when it covers the request
+USE_PRECOMPUTED = os.environ.get("USE_PRECOMPUTED", "true").lower() == "true"
+MAX_API_SITES = int(os.environ.get("MAX_API_SITES", 5000))
+
+_container_client = None
+_snapshot_versions = {}
+_precomputed = {"checked_at": 0, "etag": None, "forecasts": None}
+
+# Coordinates of registered sites for the mock forecast; other names use the default site
+site_coordinates = {site["name"]: (site["lat"], site["lon"]) for site in load_site_registry()}
+clear_sky_cache = ClearSkyCache()
+
+request_seconds = histogram("dashboard_request_seconds", "Flask request latency by route, method and status")
+
+# Per-route latency; the route label is the URL rule, not the path, so
+# /api/forecast/<location> stays one series however many sites are queried
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    if 'request_start' in g:
+        request_seconds.observe(time.perf_counter() - g.request_start,
+                                route=request.url_rule.rule if request.url_rule else "unmatched",
+                                method=request.method, status=response.status_code)
+    return response
+
+def get_container_client():
+    global _container_client
+    if _container_client is None:
+        if os.environ.get("LOCAL_BLOB_ROOT"):
+            from local_blob import LocalContainerClient
+            _container_client = LocalContainerClient(os.environ["LOCAL_BLOB_ROOT"])
+        elif os.environ.get("STORAGE_CONNECTION_STRING"):
+            from azure.storage.blob import BlobServiceClient
+            blob_service_client = BlobServiceClient.from_connection_string(os.environ["STORAGE_CONNECTION_STRING"])
+            _container_client = blob_service_client.get_container_client("solar-data")
+    return _container_client
+
+# Changes whenever a new model is deployed (explicit MODEL_VERSION, or the model file's mtime)
+def model_version():
+    if os.environ.get("MODEL_VERSION"):
+        return os.environ["MODEL_VERSION"]
+    if os.path.exists(MODEL_PATH):
+        return str(int(os.path.getmtime(MODEL_PATH)))
+    return "mock"
+
+# Name + etag of today's (UTC) collector blob for a location. Daily blobs are
+# append blobs, so the etag changes with every snapshot appended to them; only
+# today's prefix is listed, and the {location}/{date}.ndjson blob wins over any
+# legacy {location}/{date}/HH-MM-SS.json snapshots (which would sort after it).
+def snapshot_version(location):
+    container_client = get_container_client()
+    if container_client is None:
+        return "none"
+
+    checked_at, version = _snapshot_versions.get(location, (0, None))
+    if time.monotonic() - checked_at < VERSION_CHECK_SECONDS:
+        return version
+
+    today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    daily_blob = f"{location}/{today}.ndjson"
+    latest = None
+    for blob in container_client.list_blobs(name_starts_with=f"{location}/{today}"):
+        if blob.name == daily_blob:
+            latest = blob
+            break
+        if latest is None or blob.name > latest.name:
+            latest = blob
+    version = f"{latest.name}@{latest.etag}" if latest is not None else "none"
+    _snapshot_versions[location] = (time.monotonic(), version)
+    return version
 
-def get_mock_forecast_data():
-    start_time = datetime.now().replace(minute=0, second=0, microsecond=0)
-    timestamps = [(start_time + timedelta(hours=i)).isoformat() for i in range(24 * 7)]
+# Latest precomputed forecasts, or None; the blob is downloaded again only when
+# its etag changes, which is checked at most every VERSION_CHECK_SECONDS
+def precomputed_forecasts():
+    container_client = get_container_client()
+    if not USE_PRECOMPUTED or container_client is None:
+        return None
+    if time.monotonic() - _precomputed["checked_at"] >= VERSION_CHECK_SECONDS:
+        etag = precomputed_etag(container_client)
+        if etag != _precomputed["etag"]:
+            forecasts, etag = read_precomputed(container_client) if etag else (None, None)
+            _precomputed.update(etag=etag, forecasts=forecasts)
+        _precomputed["checked_at"] = time.monotonic()
+    return _precomputed["forecasts"]
+
+# Cache-key component for everything a forecast is computed from besides the
+# weather: the deployed model and the precomputed forecasts it was served from.
+# Refreshes the precomputed blob first, so page-cache hits notice a new one too.
+def forecast_version():
+    precomputed_forecasts()
+    if _precomputed["etag"]:
+        return f"{model_version()}+{_precomputed['etag']}"
+    return model_version()
+
+# Current UTC hour (forecast epochs and the clear-sky geometry are UTC)
+def forecast_start_time():
+    return datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+# Mock hourly production: clear-sky irradiance at the site scaled to an 80 kWh
+# peak, so it is exactly zero while the sun is down. latitude/longitude may be
+# arrays (one row per site).
+def mock_forecast_values(start_time, hours, latitude=DEFAULT_LATITUDE, longitude=DEFAULT_LONGITUDE):
+    i = np.arange(hours)
+    ghi = clear_sky_cache.hourly(latitude, longitude, start_time, hours)
+    return np.round(ghi / STC_IRRADIANCE * 80 * (0.8 + 0.4 * (i % 7) / 6), 2)
+
+# Mock quantile bands: a normal spread around the mock values whose relative
+# width grows from 10% to 30% over the horizon, so night hours stay at zero.
+# Levels 0 and 1 are clamped to 0.1% / 99.9%.
+def mock_forecast_bands(values, quantiles):
+    spread = values * np.linspace(0.1, 0.3, values.shape[-1])
+    bands = {}
+    for q in quantiles:
+        z = NormalDist().inv_cdf(min(max(q, 0.001), 0.999))
+        bands[quantile_name(q)] = np.round(np.maximum(values + z * spread, 0), 2)
+    return bands
+
+def coordinates(sites):
+    points = [site_coordinates.get(site, (DEFAULT_LATITUDE, DEFAULT_LONGITUDE)) for site in sites]
+    return np.array([p[0] for p in points]), np.array([p[1] for p in points])
+
+# Forecasts for many sites at once: (start epoch, step seconds, sites x hours values,
+# bands), where bands maps quantile names to arrays shaped like values (empty
+# without quantiles). Point forecasts come from the precomputed blob when it
+# covers every site; otherwise from the scoring endpoint when ML_ENDPOINT_URL is
+# set, else the mock.
+def get_forecasts(sites, days, quantiles=None):
+    start_time = forecast_start_time()
+    if not quantiles:
+        precomputed = precomputed_forecasts()
+        values = precomputed.forecasts(sites, start_time.timestamp(), 24 * days) if precomputed is not None else None
+        if values is not None:
+            return int(start_time.timestamp()), 3600, values, {}
+    if scoring_client.is_configured():
+        return scoring_client.fetch_forecasts(sites, days, quantiles)
+    latitudes, longitudes = coordinates(sites)
+    values = mock_forecast_values(start_time, 24 * days, latitudes, longitudes)
+    bands = mock_forecast_bands(values, quantiles) if quantiles else {}
+    return int(start_time.timestamp()), 3600, values, bands
+
+# Raw forecast, pre-rendered plot JSON and summary stats for the forecast page.
+# With bands=True the hourly plot shades the P10-P90 range around the forecast.
+def build_forecast_page(location, forecast_days, bands=False):
+    start, step, values, quantiles = get_forecasts([location], forecast_days,
+                                                   DEFAULT_QUANTILES if bands else None)
+    
+    # Create DataFrame
+    df = pd.DataFrame({
+        'timestamp': pd.to_datetime(start + step * np.arange(values.shape[1]), unit='s'),
+        'forecast_kwh': values[0].astype(float)
+    })
+    for name, band in quantiles.items():
+        df[name] = band[0].astype(float)
+    
+    # Calculate daily totals
+    df['date'] = df['timestamp'].dt.date
+    daily_totals = df.groupby('date')['forecast_kwh'].sum().reset_index()
     
-    forecast_values = []
-    for i in range(24 * 7):
-        hour = (start_time + timedelta(hours=i)).hour
-        if hour < 6 or hour > 18:
-            forecast_values.append(0)
-        else:
-            hour_factor = 1 - abs(hour - 12) / 6
-            base_value = hour_factor * 80
-            forecast_values.append(round(base_value * (0.8 + 0.4 * (i % 7) / 6), 2))
+    # Create plots; long horizons are downsampled, the daily bars never need it
+    hourly_df = downsample(df, 'timestamp', 'forecast_kwh')
+    hourly_fig = px.line(hourly_df, x='timestamp', y='forecast_kwh', 
+                        title=f'Hourly Solar Energy Forecast for {location}')
+    if quantiles:
+        add_band(hourly_fig, hourly_df, quantile_name(DEFAULT_QUANTILES[0]), quantile_name(DEFAULT_QUANTILES[-1]))
+    daily_fig = px.bar(daily_totals, x='date', y='forecast_kwh',
+                      title=f'Daily Solar Energy Forecast for {location}')
     
-    return {"timestamps": timestamps, "forecast_values": forecast_values}
+    # Calculate stats
+    total_energy = daily_totals['forecast_kwh'].sum()
+    avg_daily = daily_totals['forecast_kwh'].mean()
+    peak_hour_idx = df['forecast_kwh'].idxmax()
+    peak_hour = df.loc[peak_hour_idx, 'timestamp']
+    peak_production = df['forecast_kwh'].max()
+    
+    forecast = {'start': int(start), 'step': int(step), 'values': np.round(values[0], 3).tolist()}
+    if quantiles:
+        forecast['quantiles'] = {name: np.round(band[0], 3).tolist() for name, band in quantiles.items()}
+
+    return {
+        'forecast': forecast,
+        'hourly_plot': figure_json(hourly_fig),
+        'daily_plot': figure_json(daily_fig),
+        'stats': {
+            'total_energy': round(float(total_energy), 2),
+            'avg_daily': round(float(avg_daily), 2),
+            'peak_hour': peak_hour.strftime('%Y-%m-%d %H:%M'),
+            'peak_production': round(float(peak_production), 2)
+        }
+    }
+
+# Shaded band between two columns of df, drawn under the forecast line
+def add_band(fig, df, lower, upper):
+    fig.add_trace(go.Scatter(x=df['timestamp'], y=df[upper], mode='lines', line={'width': 0},
+                             showlegend=False, hoverinfo='skip'))
+    fig.add_trace(go.Scatter(x=df['timestamp'], y=df[lower], mode='lines', line={'width': 0},
+                             fill='tonexty', fillcolor='rgba(79, 172, 254, 0.25)',
+                             name=f'{lower.upper()}-{upper.upper()}'))
+    # Band traces first, so the forecast line is drawn on top
+    fig.data = fig.data[1:] + fig.data[:1]
+
+def cached_forecast_page(location, forecast_days, bands=False):
+    # Forecasts only change with a new model, a new snapshot or a new hour
+    key = forecast_cache.make_key(
+        location, forecast_days, forecast_version(), snapshot_version(location),
+        forecast_start_time().strftime('%Y-%m-%dT%H'), variant="bands" if bands else ""
+    )
+    return forecast_cache.get_or_compute(key, lambda: timed_forecast_page(location, forecast_days, bands))
+
+# Cache misses only: time spent scoring and rendering plots for one page
+@timed("dashboard_forecast_build_seconds")
+def timed_forecast_page(location, forecast_days, bands=False):
+    return build_forecast_page(location, forecast_days, bands)
 
 # Change forecast route to handle both GET and POST
 @app.route('/forecast', methods=['GET', 'POST'])
@@ -31,55 +250,151 @@ def forecast():
         # Get form data
         location = request.form.get('location')
         forecast_days = int(request.form.get('forecast_days', 7))
+        bands = bool(request.form.get('bands'))
         
-        # Get mock forecast data
-        forecast_data = get_mock_forecast_data()
-        
-        # Create DataFrame
-        df = pd.DataFrame({
-            'timestamp': [datetime.fromisoformat(ts) for ts in forecast_data['timestamps']],
-            'forecast_kwh': forecast_data['forecast_values']
-        })
-        
-        # Calculate daily totals
-        df['date'] = df['timestamp'].dt.date
-        daily_totals = df.groupby('date')['forecast_kwh'].sum().reset_index()
-        
-        # Create plots
-        hourly_fig = px.line(df, x='timestamp', y='forecast_kwh', 
-                            title=f'Hourly Solar Energy Forecast for {location}')
-        daily_fig = px.bar(daily_totals, x='date', y='forecast_kwh',
-                          title=f'Daily Solar Energy Forecast for {location}')
-        
-        # Convert plots to JSON
-        hourly_plot_json = json.dumps(hourly_fig, cls=plotly.utils.PlotlyJSONEncoder)
-        daily_plot_json = json.dumps(daily_fig, cls=plotly.utils.PlotlyJSONEncoder)
-        
-        # Calculate stats
-        total_energy = daily_totals['forecast_kwh'].sum()
-        avg_daily = daily_totals['forecast_kwh'].mean()
-        peak_hour_idx = df['forecast_kwh'].idxmax()
-        peak_hour = df.loc[peak_hour_idx, 'timestamp']
-        peak_production = df['forecast_kwh'].max()
-        
-        return render_template(
-            'forecast.html',
-            location=location,
-            hourly_plot=hourly_plot_json,
-            daily_plot=daily_plot_json,
-            total_energy=round(total_energy, 2),
-            avg_daily=round(avg_daily, 2),
-            peak_hour=peak_hour.strftime('%Y-%m-%d %H:%M'),
-            peak_production=round(peak_production, 2)
-        )
+        # The page renders straight away; charts and stats load from /forecast/data
+        return render_template('forecast.html', location=location, forecast_days=forecast_days, bands=bands)
     
     # If GET request, show the form
     return render_template('forecast_form.html')
 
+@app.route('/forecast/data')
+def forecast_data():
+    location = request.args.get('location')
+    try:
+        forecast_days = int(request.args.get('days', 7))
+    except ValueError:
+        return jsonify({"error": "days must be an integer"}), 400
+    if not location or not 1 <= forecast_days <= MAX_FORECAST_DAYS:
+        return jsonify({"error": f"location and days (1-{MAX_FORECAST_DAYS}) are required"}), 400
+
+    # bands=1 adds the P10-P90 band to the hourly plot and the quantiles to the response
+    bands = request.args.get('bands') in ('1', 'true')
+
+    try:
+        page = cached_forecast_page(location, forecast_days, bands)
+    except scoring_client.ScoringError as e:
+        return jsonify({"error": str(e)}), 502
+
+    # Plot JSON is cached pre-serialized, so it is spliced in rather than re-encoded
+    # An endpoint that can't produce bands returns none; the page then has no quantiles
+    quantiles = f',"quantiles":{json.dumps(page["forecast"].get("quantiles", {}))}' if bands else ''
+    body = (f'{{"hourly_plot":{page["hourly_plot"]},"daily_plot":{page["daily_plot"]},'
+            f'"stats":{json.dumps(page["stats"])}{quantiles}}}').encode()
+    body, content_encoding = compress(body, request.headers.get('Accept-Encoding'))
+    response = Response(body, mimetype='application/json')
+    response.headers['Vary'] = 'Accept-Encoding'
+    if content_encoding:
+        response.headers['Content-Encoding'] = content_encoding
+    return response
+
 @app.route('/')
 def home():
     return render_template('index.html')
 
+@app.route('/cache/stats')
+def cache_stats():
+    precomputed = precomputed_forecasts()
+    return jsonify({**forecast_cache.stats(),
+                    "precomputed": precomputed.stats() if precomputed is not None else None})
+
+# Prometheus scrape target: request latency per route, forecast builds, scoring
+# calls and the forecast cache counters, for this worker process
+@app.route('/metrics')
+def metrics():
+    stats = forecast_cache.stats()
+    for name in ('entries', 'hits', 'misses', 'evictions'):
+        gauge(f"dashboard_forecast_cache_{name}").set(stats[name])
+    return Response(render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+# Bulk machine-readable forecasts
+#   GET  /api/forecast/<location>?days=7&format=json
+#   GET  /api/forecast?sites=a,b,c&days=7&format=arrow
+#   POST /api/forecast  {"sites": [...], "days": 7, "format": "msgpack"}
+# format may also be negotiated with the Accept header; see forecast_formats.
+# quantiles=true (P10/P50/P90) or quantiles=0.05,0.95 adds forecast bands.
+@app.route('/api/forecast/<location>')
+def api_forecast_site(location):
+    return forecast_response([location], request.args.get('days', 7), request.args.get('format'),
+                             request.args.get('quantiles'))
+
+@app.route('/api/forecast', methods=['GET', 'POST'])
+def api_forecast():
+    if request.method == 'POST':
+        body = request.get_json(silent=True) or {}
+        sites, days, fmt = body.get('sites', []), body.get('days', 7), body.get('format')
+        quantiles = body.get('quantiles')
+    else:
+        sites = [site for site in request.args.get('sites', '').split(',') if site]
+        days, fmt = request.args.get('days', 7), request.args.get('format')
+        quantiles = request.args.get('quantiles')
+    return forecast_response(sites, days, fmt, quantiles)
+
+# Daily totals, peak output and peak hour per site, straight from the precomputed blob
+#   GET /api/forecast/daily?sites=a,b,c
+@app.route('/api/forecast/daily')
+def api_forecast_daily():
+    sites = [site for site in request.args.get('sites', '').split(',') if site]
+    if not sites or len(sites) > MAX_API_SITES:
+        return jsonify({"error": f"between 1 and {MAX_API_SITES} sites are required"}), 400
+    precomputed = precomputed_forecasts()
+    if precomputed is None:
+        return jsonify({"error": "No precomputed forecasts available"}), 503
+    missing = [site for site in sites if site not in precomputed]
+    if missing:
+        return jsonify({"error": f"No precomputed forecast for {', '.join(missing)}"}), 404
+    return jsonify({
+        "issued_at": precomputed.meta.get("issued_at"),
+        "unit": "kWh",
+        "sites": {site: precomputed.daily(site) for site in sites}
+    })
+
+def negotiate_format(fmt):
+    if fmt:
+        return fmt
+    accept = request.headers.get('Accept', '')
+    for name, mimetype in MIMETYPES.items():
+        if mimetype in accept and name in available_formats():
+            return name
+    return 'json'
+
+def forecast_response(sites, days, fmt, quantiles=None):
+    try:
+        days = int(days)
+    except (TypeError, ValueError):
+        return jsonify({"error": f"days must be an integer, got {days!r}"}), 400
+    if not 1 <= days <= MAX_FORECAST_DAYS:
+        return jsonify({"error": f"days must be between 1 and {MAX_FORECAST_DAYS}"}), 400
+    if not isinstance(sites, list) or not sites or len(sites) > MAX_API_SITES:
+        return jsonify({"error": f"sites must be a list of 1 to {MAX_API_SITES} site names"}), 400
+    try:
+        check_locations(sites)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    fmt = negotiate_format(fmt)
+    if fmt not in available_formats():
+        return jsonify({"error": f"format must be one of {available_formats()}"}), 400
+
+    try:
+        quantiles = parse_quantiles(quantiles)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # One forecast row per site (sites x hours)
+    try:
+        start, step, values, bands = get_forecasts(sites, days, quantiles)
+    except scoring_client.ScoringError as e:
+        return jsonify({"error": str(e)}), 502
+
+    body, mimetype = encode(sites, start, step, values, fmt, bands)
+    body, content_encoding = compress(body, request.headers.get('Accept-Encoding'))
+    response = Response(body, mimetype=mimetype)
+    response.headers['Vary'] = 'Accept, Accept-Encoding'
+    if content_encoding:
+        response.headers['Content-Encoding'] = content_encoding
+    return response
+
 @app.route('/forecast', methods=['GET'])
 def forecast_form():
     return render_template('forecast_form.html')
@@ -0,0 +1,68 @@
+# Benchmark: /api/forecast payload size and serialization time for a fleet request
+# Compares the per-point ISO timestamp JSON (the shape score.run returns) with the
+# columnar encodings in forecast_formats, with and without P10/P50/P90 bands.
+# Usage: python benchmark_api.py [--sites 1000] [--days 7] [--repeat 3]
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from app import DEFAULT_QUANTILES, mock_forecast_bands, mock_forecast_values
+from forecast_formats import available_formats, compress, encode
+import numpy as np
+
+def per_point_json(sites, start_time, values):
+    timestamps = [(start_time + timedelta(hours=i)).isoformat() for i in range(values.shape[1])]
+    forecasts = [
+        {"location": site, "timestamps": timestamps, "forecast_values": row.tolist()}
+        for site, row in zip(sites, values)
+    ]
+    return json.dumps({"forecasts": forecasts}).encode()
+
+def best_of(repeat, fn, *args):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sites', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    sites = [f"site_{i}" for i in range(args.sites)]
+    start_time = datetime(2025, 6, 1)
+    values = np.tile(mock_forecast_values(start_time, 24 * args.days), (args.sites, 1))
+    # Per-site jitter so compression doesn't see identical rows
+    values = values * np.random.default_rng(0).uniform(0.8, 1.2, size=(args.sites, 1))
+    bands = mock_forecast_bands(values, DEFAULT_QUANTILES)
+
+    rows = []
+    seconds, body = best_of(args.repeat, per_point_json, sites, start_time, values)
+    rows.append(("iso per-point json", seconds, len(body)))
+    seconds, (gz, _) = best_of(args.repeat, compress, body, 'gzip')
+    rows.append(("iso per-point json+gzip", rows[0][1] + seconds, len(gz)))
+
+    for fmt in available_formats():
+        seconds, (body, _) = best_of(args.repeat, encode, sites, start_time.timestamp(), 3600, values, fmt)
+        rows.append((f"columnar {fmt}", seconds, len(body)))
+        gz_seconds, (gz, _) = best_of(args.repeat, compress, body, 'gzip')
+        rows.append((f"columnar {fmt}+gzip", seconds + gz_seconds, len(gz)))
+        seconds, (body, _) = best_of(args.repeat, encode, sites, start_time.timestamp(), 3600, values, fmt, bands)
+        rows.append((f"columnar {fmt}+quantiles", seconds, len(body)))
+
+    baseline_seconds, baseline_bytes = rows[0][1], rows[0][2]
+    print(f"{args.sites} sites x {args.days} days ({values.size} values)")
+    print(f"{'encoding':>26} {'ms':>9} {'bytes':>12} {'size':>7} {'time':>7}")
+    for name, seconds, size in rows:
+        print(f"{name:>26} {seconds * 1000:>9.1f} {size:>12,} "
+              f"{baseline_bytes / size:>6.1f}x {baseline_seconds / seconds:>6.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+# Forecast result cache for the dashboard
+# Entries hold everything the forecast page needs (raw forecast, plot JSON, stats)
+# under a key of (location, forecast_days, model version, weather snapshot version),
+# so a new model or a new collector snapshot produces a new key and the stale entry
+# simply ages out. Two backends:
+#   MemoryBackend - in-process, TTL + LRU eviction (default)
+#   RedisBackend  - any Redis-compatible server, shared between workers; set
+#                   FORECAST_CACHE_URL=redis://host:6379/0. TTL via SETEX, LRU via
+#                   the server's maxmemory-policy (allkeys-lru). Any client with
+#                   get/setex/scan_iter/delete works, e.g. fakeredis for local runs.
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+DEFAULT_TTL_SECONDS = int(os.environ.get("FORECAST_CACHE_TTL", 3600))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("FORECAST_CACHE_MAX_ENTRIES", 256))
+
+class MemoryBackend:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+# Values are stored as JSON, so cached entries must be JSON-serializable
+class RedisBackend:
+    def __init__(self, client, prefix="forecast:"):
+        self.client = client
+        self.prefix = prefix
+        self.evictions = 0
+
+    @classmethod
+    def from_url(cls, url, prefix="forecast:"):
+        if redis is None:
+            raise ImportError("FORECAST_CACHE_URL is set but the redis package is not installed")
+        return cls(redis.Redis.from_url(url), prefix)
+
+    def get(self, key):
+        payload = self.client.get(self.prefix + key)
+        return None if payload is None else json.loads(payload)
+
+    def set(self, key, value, ttl):
+        self.client.setex(self.prefix + key, ttl, json.dumps(value))
+
+    def clear(self):
+        for name in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(name)
+
+    def __len__(self):
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + "*"))
+
+class ForecastCache:
+    def __init__(self, backend=None, ttl=DEFAULT_TTL_SECONDS):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    # variant distinguishes renderings of the same forecast (e.g. with quantile bands)
+    @staticmethod
+    def make_key(location, forecast_days, model_version, snapshot_version, issued_at="", variant=""):
+        key = f"{location}|{forecast_days}|{model_version}|{snapshot_version}|{issued_at}"
+        return f"{key}|{variant}" if variant else key
+
+    # Return the cached value for key, computing and storing it on a miss
+    def get_or_compute(self, key, compute):
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = compute()
+        self.backend.set(key, value, self.ttl)
+        return value
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.backend.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "ttl_seconds": self.ttl
+        }
+
+def cache_from_env():
+    url = os.environ.get("FORECAST_CACHE_URL")
+    backend = RedisBackend.from_url(url) if url else MemoryBackend()
+    return ForecastCache(backend)
@@ -0,0 +1,115 @@
+# Response encodings for the /api/forecast endpoints
+# A forecast is columnar: one epoch start, a fixed step and a float32 array per
+# site, instead of an ISO timestamp string next to every value.
+#   json    - {"start", "step", "unit", "locations": [...], "values": [[...], ...]}
+#   msgpack - same structure, single-precision floats (needs the msgpack package)
+#   arrow   - Arrow IPC stream, one float32 column per site plus a timestamp column
+#             (needs pyarrow)
+# Quantile bands, when requested, follow the values: "quantiles": {"p10": [[...], ...], ...}
+# in json/msgpack, and a "<site>:p10" column per site and level in arrow.
+# Bodies are compressed with br (if the brotli package is installed) or gzip,
+# whichever the client accepts first in that order.
+
+import gzip
+import io
+import json
+import numpy as np
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+MIMETYPES = {
+    'json': 'application/json',
+    'msgpack': 'application/msgpack',
+    'arrow': 'application/vnd.apache.arrow.stream'
+}
+
+# Bodies smaller than this aren't worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+def available_formats():
+    formats = ['json']
+    if msgpack is not None:
+        formats.append('msgpack')
+    if pa is not None:
+        formats.append('arrow')
+    return formats
+
+# Site names have to be usable as Arrow column names: unique, not 'timestamp' and
+# without the ':' that separates a site from its quantile level. Raises ValueError.
+def check_locations(locations):
+    if not all(isinstance(location, str) and location for location in locations):
+        raise ValueError("sites must be a list of non-empty strings")
+    reserved = [location for location in locations if location == 'timestamp' or ':' in location]
+    if reserved:
+        raise ValueError(f"reserved site names: {', '.join(reserved)}")
+    if len(set(locations)) != len(locations):
+        duplicates = sorted({location for location in locations if locations.count(location) > 1})
+        raise ValueError(f"duplicate site names: {', '.join(duplicates)}")
+
+# locations: list of names; values: 2-D array (sites x steps); quantiles: optional
+# {name: 2-D array shaped like values}
+def columnar_payload(locations, start, step, values, quantiles=None, decimals=3):
+    payload = {
+        "start": int(start),
+        "step": int(step),
+        "unit": "kWh",
+        "locations": list(locations),
+        "values": np.round(np.asarray(values, dtype=np.float64), decimals).tolist()
+    }
+    if quantiles:
+        payload["quantiles"] = {name: np.round(np.asarray(band, dtype=np.float64), decimals).tolist()
+                                for name, band in quantiles.items()}
+    return payload
+
+def encode(locations, start, step, values, fmt='json', quantiles=None):
+    if fmt not in available_formats():
+        raise ValueError(f"Unsupported format {fmt!r}, expected one of {available_formats()}")
+    values = np.asarray(values, dtype=np.float32)
+    quantiles = quantiles or {}
+
+    if fmt == 'json':
+        body = json.dumps(columnar_payload(locations, start, step, values, quantiles), separators=(',', ':'))
+        return body.encode(), MIMETYPES[fmt]
+
+    if fmt == 'msgpack':
+        payload = columnar_payload(locations, start, step, values, quantiles)
+        return msgpack.packb(payload, use_single_float=True), MIMETYPES[fmt]
+
+    # Arrow: wide table, timestamps shared by every site column
+    check_locations(locations)
+    n_steps = values.shape[1] if values.ndim == 2 else 0
+    timestamps = np.arange(n_steps, dtype=np.int64) * int(step) + int(start)
+    columns = {'timestamp': pa.array(timestamps.astype('datetime64[s]'), type=pa.timestamp('s', tz='UTC'))}
+    for i, (location, row) in enumerate(zip(locations, values)):
+        columns[location] = pa.array(row, type=pa.float32())
+        for name, band in quantiles.items():
+            columns[f"{location}:{name}"] = pa.array(np.asarray(band[i], dtype=np.float32), type=pa.float32())
+    table = pa.table(columns)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue(), MIMETYPES[fmt]
+
+# Returns (body, content_encoding or None) for the client's Accept-Encoding header
+def compress(body, accept_encoding):
+    accepted = {token.split(';')[0].strip() for token in (accept_encoding or '').split(',')}
+    if len(body) < MIN_COMPRESS_BYTES:
+        return body, None
+    if 'br' in accepted and brotli is not None:
+        return brotli.compress(body, quality=5), 'br'
+    if 'gzip' in accepted:
+        return gzip.compress(body, compresslevel=6), 'gzip'
+    return body, None
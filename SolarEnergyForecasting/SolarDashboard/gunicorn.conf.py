@@ -0,0 +1,18 @@
+# Production serving: gunicorn app:app --config gunicorn.conf.py
+# Threaded workers, so a handler waiting on the scoring endpoint (network I/O)
+# doesn't hold up the other requests on its worker. The forecast cache is per
+# process unless FORECAST_CACHE_URL points at a shared Redis.
+
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', 8000)}")
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+# Longer than the scoring client's deadline, so slow fetches fail with a 502 instead of a killed worker
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+keepalive = 5
+# Import the app once in the master; workers fork with it already loaded
+preload_app = True
+accesslog = "-"
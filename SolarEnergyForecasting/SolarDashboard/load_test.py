@@ -0,0 +1,88 @@
+# Load test: latency percentiles for the dashboard at a fixed concurrency
+# Each client thread sends requests back to back over its own keep-alive session.
+# Usage:
+#   python load_test.py --url http://localhost:8000/forecast/data?location=solar_farm_1&days=7
+#                       [--concurrency 16] [--requests 2000] [--method GET] [--data key=value ...]
+#   python load_test.py --serve ...   (starts app.py on a threaded dev server first,
+#                                      and prints its server-side timings afterwards)
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import requests
+
+def client(url, method, data, n_requests, latencies, errors):
+    session = requests.Session()
+    for _ in range(n_requests):
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url, data=data, timeout=30)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except requests.RequestException as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+
+def serve_in_background(port):
+    from werkzeug.serving import make_server
+    from app import app
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run(url, concurrency, n_requests, method='GET', data=None):
+    latencies = []
+    errors = []
+    per_client = max(1, n_requests // concurrency)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(client, url, method, data, per_client, latencies, errors)
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 2),
+        "p90_ms": round(float(np.percentile(latencies_ms, 90)), 2),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 2),
+        "max_ms": round(float(latencies_ms.max()), 2)
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://127.0.0.1:8765/forecast/data?location=solar_farm_1&days=7')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--method', default='GET')
+    parser.add_argument('--data', nargs='*', default=[], help="Form fields as key=value")
+    parser.add_argument('--serve', action='store_true', help="Serve app.py on port 8765 for the test")
+    args = parser.parse_args()
+
+    server = serve_in_background(8765) if args.serve else None
+    data = dict(field.split('=', 1) for field in args.data) or None
+
+    # Warm up connections and caches before measuring
+    run(args.url, args.concurrency, args.concurrency, args.method, data)
+    result = run(args.url, args.concurrency, args.requests, args.method, data)
+
+    print(f"{args.method} {args.url} at concurrency {args.concurrency}")
+    for name, value in result.items():
+        print(f"{name:>15}: {value}")
+
+    if server is not None:
+        server.shutdown()
+        # Where the time went on the server: per-route latency, forecast builds, scoring calls
+        from instrumentation import snapshot
+        for name, series in snapshot().items():
+            for labels, summary in series.items():
+                if isinstance(summary, dict):
+                    print(f"{name} {labels}: n={summary['count']} mean={summary['mean'] * 1000:.2f}ms "
+                          f"p90<={summary['p90'] * 1000:g}ms p99<={summary['p99'] * 1000:g}ms")
+
+if __name__ == '__main__':
+    main()
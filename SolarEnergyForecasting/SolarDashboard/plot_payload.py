@@ -0,0 +1,58 @@
+# Server-side minimisation of the Plotly figures sent to the browser
+# - figure_json drops layout.template: plotly.py embeds its full default template
+#   (several KB of colours/axis styles) in every figure; plotly.js renders without it.
+# - lttb downsamples long hourly series (Largest-Triangle-Three-Buckets keeps the
+#   points that preserve the visual shape, i.e. the daily peaks and night zeros).
+
+import json
+import os
+import numpy as np
+import plotly
+
+# Series longer than this are downsampled before plotting
+MAX_CHART_POINTS = int(os.environ.get("MAX_CHART_POINTS", 240))
+
+def figure_json(fig):
+    figure = fig.to_plotly_json()
+    figure['layout'].pop('template', None)
+    return json.dumps(figure, cls=plotly.utils.PlotlyJSONEncoder, separators=(',', ':'))
+
+# Indices of the `threshold` points of (x, y) chosen by LTTB; x must be increasing
+def lttb(x, y, threshold):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # First and last points are always kept; the rest is split into equal buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+            avg_x = x[next_start:next_end].mean()
+            avg_y = y[next_start:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+
+        # Pick the point forming the largest triangle with the previous pick and that average
+        areas = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous]) -
+            (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
+
+def downsample(df, x_column, y_column, max_points=MAX_CHART_POINTS):
+    if len(df) <= max_points:
+        return df
+    x = df[x_column].astype('int64').to_numpy() if df[x_column].dtype.kind == 'M' else df[x_column].to_numpy()
+    return df.iloc[lttb(x, df[y_column].to_numpy(), max_points)]
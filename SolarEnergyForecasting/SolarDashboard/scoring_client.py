@@ -0,0 +1,95 @@
+# Client for the Azure ML scoring endpoint (MLNotebooks/score.py)
+# Sites are sent as fleet requests in chunks of SCORING_BATCH_SIZE; chunks are
+# fetched concurrently over one pooled session, each with its own timeout, and
+# the whole fetch is bounded by an overall deadline. Chunk and fetch latencies
+# are recorded with instrumentation (see the dashboard's /metrics).
+# Set ML_ENDPOINT_URL (and ML_API_KEY) to use it; without them the dashboard
+# serves its mock forecast.
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from instrumentation import counter, timed
+
+ML_ENDPOINT_URL = os.environ.get("ML_ENDPOINT_URL")
+ML_API_KEY = os.environ.get("ML_API_KEY")
+SCORING_BATCH_SIZE = int(os.environ.get("SCORING_BATCH_SIZE", 100))
+SCORING_MAX_WORKERS = int(os.environ.get("SCORING_MAX_WORKERS", 8))
+# Per-request (connect, read) timeout and overall deadline, in seconds
+SCORING_TIMEOUT = (3.05, float(os.environ.get("SCORING_READ_TIMEOUT", 10)))
+SCORING_DEADLINE = float(os.environ.get("SCORING_DEADLINE", 15))
+
+class ScoringError(Exception):
+    pass
+
+_session = None
+_session_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=SCORING_MAX_WORKERS, thread_name_prefix="scoring")
+
+def is_configured():
+    return bool(ML_ENDPOINT_URL)
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=SCORING_MAX_WORKERS)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            if ML_API_KEY:
+                _session.headers["Authorization"] = f"Bearer {ML_API_KEY}"
+        return _session
+
+@timed("scoring_chunk_seconds")
+def fetch_chunk(sites, days, quantiles=None):
+    payload = {
+        "requests": [{"location": site, "forecast_days": days} for site in sites],
+        "format": "columnar"
+    }
+    if quantiles:
+        payload["quantiles"] = list(quantiles)
+    response = get_session().post(ML_ENDPOINT_URL, json=payload, timeout=SCORING_TIMEOUT)
+    response.raise_for_status()
+    result = response.json()
+    # score.run returns its JSON as a string, which the endpoint may wrap again
+    if isinstance(result, str):
+        result = json.loads(result)
+    if "error" in result:
+        raise ScoringError(result["error"])
+    return result["forecasts"]
+
+# Returns (start_epoch, step_seconds, values, bands) with values shaped (sites x hours);
+# bands maps quantile names ("p10", ...) to arrays of the same shape, empty unless
+# quantile levels were requested
+@timed("scoring_fetch_seconds")
+def fetch_forecasts(sites, days, quantiles=None):
+    chunks = [sites[i:i + SCORING_BATCH_SIZE] for i in range(0, len(sites), SCORING_BATCH_SIZE)]
+    futures = [_executor.submit(fetch_chunk, chunk, days, quantiles) for chunk in chunks]
+
+    done, not_done = wait(futures, timeout=SCORING_DEADLINE)
+    for future in not_done:
+        future.cancel()
+    if not_done:
+        counter("scoring_errors_total").inc(error="deadline")
+        raise ScoringError(f"{len(not_done)} of {len(chunks)} scoring requests missed the "
+                           f"{SCORING_DEADLINE}s deadline")
+
+    forecasts = []
+    for future in futures:
+        try:
+            forecasts.extend(future.result())
+        except (requests.RequestException, KeyError, ValueError) as e:
+            counter("scoring_errors_total").inc(error=type(e).__name__)
+            raise ScoringError(f"Scoring request failed: {e}") from e
+
+    start, step = forecasts[0]["start"], forecasts[0]["step"]
+    values = np.array([forecast["values"] for forecast in forecasts], dtype=np.float32)
+    bands = {name: np.array([forecast["quantiles"][name] for forecast in forecasts], dtype=np.float32)
+             for name in forecasts[0].get("quantiles", {})}
+    return start, step, values, bands
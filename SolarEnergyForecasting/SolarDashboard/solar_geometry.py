@@ -0,0 +1 @@
+../shared/solar_geometry.py
\ No newline at end of file
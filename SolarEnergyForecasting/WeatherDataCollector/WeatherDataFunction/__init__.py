@@ -1,82 +1,87 @@
 import datetime
+import json
 import logging
 import os
-import json
 import requests
 import azure.functions as func
-from azure.storage.blob import BlobServiceClient, BlobClient, ContentSettings
+from azure.storage.blob import BlobServiceClient
+import instrumentation
+from local_blob import LocalContainerClient
+from site_registry import load_site_registry, load_site_registry_from_blob
+from snapshot_store import write_collection_marker
+from .collector import OPENWEATHERMAP_BASE_URL, collect_all
+
+_container_client = None
+
+# Reuse the blob client (and its connection pool) across warm invocations
+def get_container_client(container_name="solar-data"):
+    global _container_client
+    if _container_client is None:
+        if os.environ.get("LOCAL_BLOB_ROOT"):
+            # Filesystem stand-in for offline runs
+            _container_client = LocalContainerClient(os.environ["LOCAL_BLOB_ROOT"])
+        else:
+            connection_string = os.environ["AzureWebJobsStorage"]
+            blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+            _container_client = blob_service_client.get_container_client(container_name)
+    return _container_client
 
 def main(mytimer: func.TimerRequest) -> None:
-    
+
+    # Get OpenWeatherMap API key from environment variable
+    api_key = os.environ["OPENWEATHERMAP_API_KEY"]
+
     if os.environ.get("LOCAL_TESTING") == "true":
         logging.info("Running in local testing mode - skipping Azure Storage operations")
         # Get current weather data
-        weather_url = f"https://api.openweathermap.org/data/2.5/weather?lat=40.7128&lon=-74.0060&appid={api_key}&units=metric"
+        weather_url = f"{OPENWEATHERMAP_BASE_URL}/data/2.5/weather?lat=40.7128&lon=-74.0060&appid={api_key}&units=metric"
         weather_response = requests.get(weather_url)
         logging.info(f"Weather API response: {weather_response.status_code}")
         logging.info(f"Weather data: {weather_response.json()}")
         return
 
-    utc_timestamp = datetime.datetime.utcnow().replace(
-        tzinfo=datetime.timezone.utc).isoformat()
-    
+    utc_now = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc)
+    utc_timestamp = utc_now.isoformat()
+
     if mytimer.past_due:
         logging.info('The timer is past due!')
 
     logging.info('Python timer trigger function ran at %s', utc_timestamp)
-    
-    # Get OpenWeatherMap API key from environment variable
-    api_key = os.environ["OPENWEATHERMAP_API_KEY"]
-    
-    # Define locations for data collection (latitude, longitude)
-    locations = [
-        {"name": "solar_farm_1", "lat": 40.7128, "lon": -74.0060},  # Example: New York
-        {"name": "solar_farm_2", "lat": 34.0522, "lon": -118.2437}  # Example: Los Angeles
-    ]
-    
-    # Connect to blob storage
-    connection_string = os.environ["AzureWebJobsStorage"]
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-    container_name = "solar-data"
-    
-    # Collect data for each location
-    for location in locations:
-        # Get current weather data
-        weather_url = f"https://api.openweathermap.org/data/2.5/weather?lat={location['lat']}&lon={location['lon']}&appid={api_key}&units=metric"
-        weather_response = requests.get(weather_url)
-        current_weather = weather_response.json()
-        
-        # Get weather forecast data
-        forecast_url = f"https://api.openweathermap.org/data/2.5/forecast?lat={location['lat']}&lon={location['lon']}&appid={api_key}&units=metric"
-        forecast_response = requests.get(forecast_url)
-        forecast_data = forecast_response.json()
-        
-        # Extract relevant features for solar forecasting
-        data = {
-            "timestamp": utc_timestamp,
-            "location": location["name"],
-            "latitude": location["lat"],
-            "longitude": location["lon"],
-            "current": {
-                "temperature": current_weather.get("main", {}).get("temp"),
-                "clouds": current_weather.get("clouds", {}).get("all"),  # Cloud coverage in %
-                "weather_description": current_weather.get("weather", [{}])[0].get("description"),
-                "wind_speed": current_weather.get("wind", {}).get("speed")
-            },
-            "forecast": forecast_data.get("list", [])
-        }
-        
-        # Save to blob storage
-        date_str = datetime.datetime.utcnow().strftime("%Y-%m-%d")
-        time_str = datetime.datetime.utcnow().strftime("%H-%M-%S")
-        blob_name = f"{location['name']}/{date_str}/{time_str}.json"
-        
-        blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_name)
-        
-        blob_client.upload_blob(
-            json.dumps(data, indent=2),
-            overwrite=True,
-            content_settings=ContentSettings(content_type="application/json")
-        )
-        
-        logging.info(f"Data for {location['name']} saved to {blob_name}")
\ No newline at end of file
+
+    # Sites to collect for, from the bundled registry or a registry blob in the container
+    container_client = get_container_client()
+    if os.environ.get("SITE_REGISTRY_BLOB"):
+        registry = load_site_registry_from_blob(container_client, os.environ["SITE_REGISTRY_BLOB"])
+    else:
+        registry = load_site_registry()
+    locations = list(registry)
+
+    # Collect and store data for all locations concurrently, one API call per weather cell
+    saved, failed = collect_all(
+        locations,
+        api_key,
+        container_client,
+        utc_timestamp,
+        utc_now.strftime("%Y-%m-%d"),
+        max_workers=int(os.environ.get("COLLECTOR_MAX_WORKERS", 16)),
+        per_host_limit=int(os.environ.get("COLLECTOR_PER_HOST_LIMIT", 8)),
+        grid_size_deg=registry.grid_size_deg,
+        # Forecast stored as per-period deltas; "false" writes the full list every run
+        delta_snapshots=os.environ.get("COLLECTOR_DELTA_SNAPSHOTS", "true").lower() != "false"
+    )
+
+    logging.info(f"Collected {len(saved)} of {len(locations)} locations")
+    if failed:
+        logging.error(f"Failed locations: {sorted(failed)}")
+
+    # Signals the precompute job (MLNotebooks/precompute.py) that new snapshots are in
+    write_collection_marker(container_client, {
+        "collected_at": utc_timestamp,
+        "saved": len(saved),
+        "failed": sorted(failed)
+    })
+
+    # Timings so far in this worker (request latency by endpoint/status, uploads,
+    # host-slot waits); also pushed over OTLP when an endpoint is configured
+    logging.info(f"Collector metrics: {json.dumps(instrumentation.snapshot())}")
+    instrumentation.flush()
@@ -0,0 +1,251 @@
+# Concurrent weather collection for many locations
+# Locations are grouped into weather grid cells and each cell is fetched once,
+# then stored for every site in it, on a worker thread. Workers share one
+# pooled requests.Session, a per-host concurrency limit, and retry with
+# exponential backoff that honours 429 Retry-After headers.
+# Request, upload and per-run timings are recorded with instrumentation.
+#
+# The 5-day forecast only changes every few hours, so it is fetched
+# conditionally: not at all while the last response's Cache-Control max-age
+# holds, else with If-None-Match / If-Modified-Since, and a body identical to the
+# last one (by hash) counts as unchanged too. Snapshots then carry only the
+# forecast periods that changed (see snapshot_store); the validators, hashes and
+# per-period state live in the fetch state blob between runs.
+
+import hashlib
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+from instrumentation import counter, histogram, timed
+from site_registry import DEFAULT_GRID_SIZE_DEG, group_by_weather_cell
+from snapshot_store import (append_snapshot, forecast_delta, period_hashes, read_fetch_state,
+                            write_fetch_state)
+
+OPENWEATHERMAP_BASE_URL = os.environ.get("OPENWEATHERMAP_BASE_URL", "https://api.openweathermap.org")
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+
+# One session per worker process so warm invocations reuse open connections
+def get_session(pool_size=32):
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+class HostLimiter:
+    def __init__(self, per_host_limit=8):
+        self.per_host_limit = per_host_limit
+        self._wait_seconds = histogram("collector_host_slot_wait_seconds")
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.per_host_limit)
+                self._semaphores[host] = semaphore
+        # Time spent queued behind the per-host limit
+        start = time.perf_counter()
+        with semaphore:
+            self._wait_seconds.observe(time.perf_counter() - start, host=host)
+            yield
+
+def _retry_delay(response, attempt, backoff):
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    # Exponential backoff with jitter so retries from many workers don't line up
+    return backoff * (2 ** attempt) * (1 + random.random())
+
+def fetch_response(session, limiter, url, params, headers=None, max_retries=4, backoff=0.5, timeout=10):
+    endpoint = urlsplit(url).path.rsplit('/', 1)[-1]
+    for attempt in range(max_retries + 1):
+        response = None
+        try:
+            with limiter.slot(url):
+                with timed("collector_http_request_seconds", endpoint=endpoint) as timer:
+                    try:
+                        response = session.get(url, params=params, headers=headers, timeout=timeout)
+                        timer.labels["status"] = response.status_code
+                    except (requests.ConnectionError, requests.Timeout) as e:
+                        timer.labels["status"] = type(e).__name__
+                        raise
+            if response.status_code not in RETRY_STATUSES:
+                response.raise_for_status()
+                return response
+            if attempt == max_retries:
+                response.raise_for_status()
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == max_retries:
+                raise
+
+        delay = _retry_delay(response, attempt, backoff)
+        counter("collector_http_retries_total").inc(endpoint=endpoint)
+        logging.warning(f"Retrying {url} in {delay:.1f}s (attempt {attempt + 1}/{max_retries})")
+        time.sleep(delay)
+
+def fetch_json(session, limiter, url, params, **kwargs):
+    return fetch_response(session, limiter, url, params, **kwargs).json()
+
+def _max_age(cache_control):
+    for directive in (cache_control or "").lower().split(','):
+        directive = directive.strip()
+        if directive in ("no-cache", "no-store"):
+            return 0
+        if directive.startswith("max-age=") and directive[8:].isdigit():
+            return int(directive[8:])
+    return 0
+
+# (payload, entry): payload is None when the response is unchanged since `cached`
+# (the entry from the previous fetch), which then isn't downloaded if it can be helped
+def fetch_conditional(session, limiter, url, params, cached=None, now=None):
+    now = time.time() if now is None else now
+    endpoint = urlsplit(url).path.rsplit('/', 1)[-1]
+    fetches = counter("collector_conditional_fetch_total")
+    if cached and cached.get("expires_at", 0) > now:
+        fetches.inc(endpoint=endpoint, result="fresh")
+        return None, cached
+
+    headers = {}
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached and cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+    response = fetch_response(session, limiter, url, params, headers=headers)
+    entry = {
+        "etag": response.headers.get("ETag") or (cached or {}).get("etag"),
+        "last_modified": response.headers.get("Last-Modified") or (cached or {}).get("last_modified"),
+        "expires_at": now + _max_age(response.headers.get("Cache-Control"))
+    }
+    if response.status_code == 304:
+        fetches.inc(endpoint=endpoint, result="not_modified")
+        return None, {**entry, "hash": cached["hash"]}
+
+    entry["hash"] = hashlib.blake2b(response.content, digest_size=16).hexdigest()
+    if cached and cached.get("hash") == entry["hash"]:
+        fetches.inc(endpoint=endpoint, result="same_content")
+        return None, entry
+    fetches.inc(endpoint=endpoint, result="downloaded")
+    return response.json(), entry
+
+# Extract relevant features for solar forecasting
+def build_snapshot(location, current_weather, forecast_data, utc_timestamp):
+    return {
+        "timestamp": utc_timestamp,
+        "location": location["name"],
+        "latitude": location["lat"],
+        "longitude": location["lon"],
+        "current": {
+            "temperature": current_weather.get("main", {}).get("temp"),
+            "clouds": current_weather.get("clouds", {}).get("all"),  # Cloud coverage in %
+            "weather_description": current_weather.get("weather", [{}])[0].get("description"),
+            "wind_speed": current_weather.get("wind", {}).get("speed")
+        },
+        "forecast": forecast_data.get("list", [])
+    }
+
+# Fetch every weather cell concurrently and store a snapshot per site;
+# one failing cell doesn't stop the run. With delta_snapshots, the forecast is
+# fetched conditionally and stored as a delta (see the top of this file).
+def collect_all(locations, api_key, container_client, utc_timestamp, date_str,
+                max_workers=16, per_host_limit=8, grid_size_deg=DEFAULT_GRID_SIZE_DEG,
+                base_url=OPENWEATHERMAP_BASE_URL, delta_snapshots=True):
+    session = get_session(pool_size=max_workers)
+    limiter = HostLimiter(per_host_limit)
+    cells = group_by_weather_cell(locations, grid_size_deg)
+    logging.info(f"{len(locations)} locations share {len(cells)} weather cells")
+    previous_cells = read_fetch_state(container_client).get("cells", {}) if delta_snapshots else {}
+    now = datetime.fromisoformat(utc_timestamp.replace('Z', '+00:00')).timestamp()
+
+    def store(snapshot):
+        with timed("collector_upload_seconds"):
+            return append_snapshot(container_client, snapshot, date_str)
+
+    # Stores the cell's snapshots; returns ({site: blob}, the cell's new fetch state)
+    def collect_and_store(lat, lon, sites):
+        with timed("collector_cell_seconds"):
+            params = {"lat": lat, "lon": lon, "appid": api_key, "units": "metric"}
+            current_weather = fetch_json(session, limiter, f"{base_url}/data/2.5/weather", params)
+            if not delta_snapshots:
+                forecast_data = fetch_json(session, limiter, f"{base_url}/data/2.5/forecast", params)
+                return {site["name"]: store(build_snapshot(site, current_weather, forecast_data, utc_timestamp))
+                        for site in sites}, None
+
+            # Sites without a line today (or new to the cell) need a full forecast
+            previous = previous_cells.get(f"{lat},{lon}")
+            if previous is not None and previous["date"] != date_str:
+                previous = None
+            full_sites = {site["name"] for site in sites if previous is None or site["name"] not in previous["sites"]}
+            forecast_data, fetch_entry = fetch_conditional(
+                session, limiter, f"{base_url}/data/2.5/forecast", params,
+                cached=None if full_sites else previous["fetch"], now=now)
+
+            if forecast_data is None:
+                hashes, first, last = previous["periods"], previous["first"], previous["last"]
+                delta = {"base": previous["timestamp"], "first": first, "last": last, "changed": []}
+            else:
+                periods = forecast_data.get("list", [])
+                hashes = period_hashes(periods)
+                first, last = (periods[0]["dt"], periods[-1]["dt"]) if periods else (None, None)
+                delta = forecast_delta(periods, hashes, previous["timestamp"], previous["periods"]) if previous else None
+
+            saved = {}
+            for site in sites:
+                snapshot = build_snapshot(site, current_weather, forecast_data or {}, utc_timestamp)
+                if site["name"] not in full_sites:
+                    del snapshot["forecast"]
+                    snapshot["forecast_delta"] = delta
+                saved[site["name"]] = store(snapshot)
+            counter("collector_forecast_periods_total").inc(len(delta["changed"]) if delta else len(hashes),
+                                                           stored="changed" if delta else "full")
+            return saved, {"date": date_str, "timestamp": utc_timestamp, "sites": sorted(saved),
+                           "periods": hashes, "first": first, "last": last, "fetch": fetch_entry}
+
+    saved = {}
+    failed = {}
+    next_cells = {}
+    run_timer = timed("collector_run_seconds")
+    with run_timer, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(collect_and_store, lat, lon, sites): (lat, lon, sites)
+                   for lat, lon, sites in cells}
+        for future in as_completed(futures):
+            lat, lon, sites = futures[future]
+            names = [site["name"] for site in sites]
+            try:
+                cell_saved, cell_state = future.result()
+                saved.update(cell_saved)
+                if cell_state is not None:
+                    next_cells[f"{lat},{lon}"] = cell_state
+                logging.info(f"Data for {', '.join(names)} saved")
+            except Exception as e:
+                # No state for the cell, so its next snapshots are complete again
+                for name in names:
+                    failed[name] = str(e)
+                logging.error(f"Collection failed for {', '.join(names)}: {e}")
+    if delta_snapshots:
+        write_fetch_state(container_client, {"cells": next_cells})
+
+    counter("collector_sites_total").inc(len(saved), status="saved")
+    counter("collector_sites_total").inc(len(failed), status="failed")
+    logging.info(f"Collection run took {run_timer.seconds:.2f}s")
+    return saved, failed
@@ -0,0 +1,96 @@
+# Benchmark: API traffic and stored bytes of hourly collection, full vs delta snapshots
+# Replays --hours hourly collection runs against mock_weather_server (its clock
+# stepped one hour per run, forecasts reissued every 3 hours) into two local blob
+# folders: one storing the full forecast every run, one with conditional fetches
+# and forecast deltas. Then checks that every snapshot read back from the delta
+# folder matches the full one.
+# Usage: python benchmark_collector.py [--sites 50] [--hours 48] [--port 8766]
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "WeatherDataFunction"))
+
+from collector import collect_all
+from local_blob import LocalContainerClient
+from mock_weather_server import MockWeatherHandler
+from snapshot_store import parse_snapshots
+
+START = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+def random_sites(n_sites, seed=0):
+    rng = random.Random(seed)
+    return [{"name": f"site_{i}", "lat": round(rng.uniform(25, 49), 4), "lon": round(rng.uniform(-124, -67), 4)}
+            for i in range(n_sites)]
+
+# Runs every hour into `root`; returns (API requests, bytes downloaded, seconds)
+def replay(root, sites, hours, base_url, delta_snapshots):
+    container_client = LocalContainerClient(root)
+    MockWeatherHandler.request_count = 0
+    MockWeatherHandler.bytes_sent = 0
+    start = time.perf_counter()
+    for hour in range(hours):
+        now = START + timedelta(hours=hour)
+        MockWeatherHandler.clock = staticmethod(now.timestamp)
+        collect_all(sites, "benchmark", container_client, now.isoformat(), now.strftime("%Y-%m-%d"),
+                    base_url=base_url, delta_snapshots=delta_snapshots)
+    return MockWeatherHandler.request_count, MockWeatherHandler.bytes_sent, time.perf_counter() - start
+
+def snapshot_bytes(root):
+    return sum(os.path.getsize(os.path.join(folder, name))
+               for folder, _, names in os.walk(root) if "collection" not in folder for name in names)
+
+# Every site's snapshots, parsed the way the trainer's loader reads them
+def read_all(root, sites):
+    container_client = LocalContainerClient(root)
+    snapshots = {}
+    for site in sites:
+        for blob in container_client.list_blobs(name_starts_with=f"{site['name']}/"):
+            payload = container_client.get_blob_client(blob.name).download_blob().readall().decode('utf-8')
+            snapshots[blob.name] = parse_snapshots(blob.name, payload)
+    return snapshots
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sites', type=int, default=50)
+    parser.add_argument('--hours', type=int, default=48)
+    parser.add_argument('--port', type=int, default=8766)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("localhost", args.port), MockWeatherHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://localhost:{args.port}"
+    sites = random_sites(args.sites)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, delta_snapshots in (("full", False), ("delta", True)):
+            root = os.path.join(tmp, name)
+            requests_made, downloaded, seconds = replay(root, sites, args.hours, base_url, delta_snapshots)
+            start = time.perf_counter()
+            snapshots = read_all(root, sites)
+            rows.append((name, requests_made, downloaded, snapshot_bytes(root), seconds,
+                         time.perf_counter() - start, snapshots))
+        server.shutdown()
+
+    full, delta = rows[0][-1], rows[1][-1]
+    mismatched = [name for name in full if [(s["timestamp"], s["forecast"]) for s in full[name]] !=
+                  [(s["timestamp"], s["forecast"]) for s in delta.get(name, [])]]
+
+    print(f"{args.sites} sites, {args.hours} hourly runs")
+    print(f"{'mode':>6} {'requests':>9} {'downloaded':>12} {'stored':>12} {'collect s':>10} {'read s':>7}")
+    for name, requests_made, downloaded, stored, seconds, read_seconds, _ in rows:
+        print(f"{name:>6} {requests_made:>9,} {downloaded:>12,} {stored:>12,} {seconds:>10.2f} {read_seconds:>7.2f}")
+    print(f"requests {rows[0][1] / rows[1][1]:.1f}x, downloaded {rows[0][2] / rows[1][2]:.1f}x, "
+          f"stored {rows[0][3] / rows[1][3]:.1f}x fewer; "
+          f"{'all snapshots match' if not mismatched else f'{len(mismatched)} blobs differ: {mismatched[:3]}'}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+../shared/local_blob.py
\ No newline at end of file
@@ -0,0 +1,122 @@
+# Local stand-in for the OpenWeatherMap API, for running the collector offline
+# Like the real API, the forecast only changes when a new run is issued (every
+# 3 hours here): it is the same for a cell until then, carries an ETag and a
+# Cache-Control max-age up to the next issue, and answers If-None-Match with 304.
+# Usage:
+#   python mock_weather_server.py --port 8765 [--rate-limit-every 10] [--latency 0.05]
+#   export OPENWEATHERMAP_BASE_URL=http://localhost:8765
+#   export LOCAL_BLOB_ROOT=./local-solar-data
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+DESCRIPTIONS = ['clear sky', 'few clouds', 'scattered clouds', 'broken clouds', 'overcast clouds', 'light rain']
+
+FORECAST_ISSUE_SECONDS = 10800
+
+def current_payload(lat, lon, now):
+    return {
+        "coord": {"lat": lat, "lon": lon},
+        "main": {"temp": round(random.uniform(-5, 35), 2)},
+        "clouds": {"all": random.randint(0, 100)},
+        "wind": {"speed": round(random.uniform(0, 12), 2)},
+        "weather": [{"description": random.choice(DESCRIPTIONS)}],
+        "dt": int(now)
+    }
+
+# Same values for a cell until the next issue time
+def forecast_payload(lat, lon, issued, periods=40):
+    rng = random.Random(f"{lat},{lon},{issued}")
+    start = issued + FORECAST_ISSUE_SECONDS
+    return {
+        "cnt": periods,
+        "list": [
+            {
+                "dt": start + 10800 * i,
+                "main": {"temp": round(rng.uniform(-5, 35), 2)},
+                "clouds": {"all": rng.randint(0, 100)},
+                "wind": {"speed": round(rng.uniform(0, 12), 2)},
+                "weather": [{"description": rng.choice(DESCRIPTIONS)}],
+                "dt_txt": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(start + 10800 * i))
+            }
+            for i in range(periods)
+        ]
+    }
+
+class MockWeatherHandler(BaseHTTPRequestHandler):
+    rate_limit_every = 0
+    latency = 0.0
+    request_count = 0
+    bytes_sent = 0
+    count_lock = threading.Lock()
+    # Replaceable, so a benchmark can replay a day of collection runs in seconds
+    clock = staticmethod(time.time)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        lat = float(query.get("lat", [0])[0])
+        lon = float(query.get("lon", [0])[0])
+
+        with self.count_lock:
+            MockWeatherHandler.request_count += 1
+            count = MockWeatherHandler.request_count
+
+        time.sleep(self.latency)
+
+        # Simulate the API's rate limiting
+        if self.rate_limit_every and count % self.rate_limit_every == 0:
+            self._send(429, {"cod": 429, "message": "Too many requests"}, {"Retry-After": "1"})
+        elif url.path == "/data/2.5/weather":
+            self._send(200, current_payload(lat, lon, self.clock()))
+        elif url.path == "/data/2.5/forecast":
+            now = self.clock()
+            issued = int(now) // FORECAST_ISSUE_SECONDS * FORECAST_ISSUE_SECONDS
+            etag = '"' + hashlib.md5(f"{lat},{lon},{issued}".encode()).hexdigest() + '"'
+            headers = {"ETag": etag, "Cache-Control": f"max-age={int(issued + FORECAST_ISSUE_SECONDS - now)}"}
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, None, headers)
+            else:
+                self._send(200, forecast_payload(lat, lon, issued), headers)
+        else:
+            self._send(404, {"cod": 404, "message": "Not found"})
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        with self.count_lock:
+            MockWeatherHandler.bytes_sent += len(body)
+        self.send_response(status)
+        if payload is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--rate-limit-every', type=int, default=0,
+                        help="Answer every Nth request with 429 (0 disables)")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds of delay per request")
+    args = parser.parse_args()
+
+    MockWeatherHandler.rate_limit_every = args.rate_limit_every
+    MockWeatherHandler.latency = args.latency
+
+    server = ThreadingHTTPServer(("localhost", args.port), MockWeatherHandler)
+    print(f"Mock OpenWeatherMap API on http://localhost:{args.port}")
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+../shared/site_registry.py
\ No newline at end of file
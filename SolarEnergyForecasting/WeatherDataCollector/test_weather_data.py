@@ -1,15 +1,13 @@
 import requests
 import json
 import datetime
+from site_registry import load_site_registry
 
 # OpenWeatherMap API key
 api_key = "db5789f6264a997c47c8f42349cd8ae8"
 
-# Define locations for data collection
-locations = [
-    {"name": "solar_farm_1", "lat": 40.7128, "lon": -74.0060},  # New York
-    {"name": "solar_farm_2", "lat": 34.0522, "lon": -118.2437}  # Los Angeles
-]
+# Locations for data collection come from the site registry (sites.json)
+locations = list(load_site_registry())
 
 # Current timestamp
 utc_timestamp = datetime.datetime.utcnow().replace(
@@ -31,7 +31,7 @@ echo "Configuring Web App settings..."
 az webapp config set \
     --name $APP_NAME \
     --resource-group $RESOURCE_GROUP \
-    --startup-file "gunicorn app:app"
+    --startup-file "gunicorn app:app --config gunicorn.conf.py"
 
 # Set environment variables
 echo "Setting environment variables..."
@@ -45,7 +45,8 @@ az webapp config appsettings set \
 # Create deployment package
 echo "Creating deployment package..."
 mkdir -p deployment
-cp app.py deployment/
+cp *.py deployment/  # app.py plus its helper modules (symlinks are copied as files)
+cp sites.json deployment/  # site coordinates for the mock forecast
 cp -r templates deployment/
 pip freeze > deployment/requirements.txt
 
@@ -0,0 +1,170 @@
+# Precomputed forecasts for every registered site in one compact blob
+#   precomputed/forecasts.npz
+# Written by MLNotebooks/precompute.py after each collection run and read by the
+# dashboard with a single download. It holds, per site, the hourly forecast from
+# the hour it was scored (float32, MAX_HORIZON_HOURS long, so a forecast whose
+# inputs haven't changed can keep being served for REUSE_HOURS) and the daily
+# aggregates the forecast page shows: total, peak output and peak hour per UTC
+# day. The first and last days are partial (they start / end mid-day).
+# The precompute job also writes precomputed/input_hashes.npz, the per-hour
+# hashes of the weather inputs each stored forecast was scored from; only the
+# job reads it, so it stays out of the blob the dashboard downloads.
+
+import io
+import json
+import numpy as np
+from azure.core.exceptions import ResourceNotFoundError
+
+PRECOMPUTED_BLOB = "precomputed/forecasts.npz"
+INPUT_HASHES_BLOB = "precomputed/input_hashes.npz"
+
+HOUR_SECONDS = 3600
+DAY_SECONDS = 86400
+MAX_FORECAST_DAYS = 14
+# How long a stored forecast may keep being served while its inputs are unchanged
+REUSE_HOURS = 24
+MAX_HORIZON_HOURS = MAX_FORECAST_DAYS * 24 + REUSE_HOURS
+
+# Per-site daily total, peak value and peak hour (epoch seconds) for hourly rows
+# starting at `starts` (whole hours, epoch seconds); days are UTC, (sites x days)
+def daily_aggregates(starts, values):
+    starts = np.asarray(starts, dtype=np.int64)
+    n_sites, n_hours = values.shape
+    first_day = starts // DAY_SECONDS
+    offset = (starts - first_day * DAY_SECONDS) // HOUR_SECONDS
+    n_days = (n_hours + 23) // 24 + 1
+
+    # Every row shifted so column 0 is midnight of its first day, then one reshape
+    padded = np.zeros((n_sites, n_days * 24), dtype=np.float32)
+    padded[np.arange(n_sites)[:, None], offset[:, None] + np.arange(n_hours)] = values
+    days = padded.reshape(n_sites, n_days, 24)
+    peak_hour = days.argmax(axis=2)
+    return {
+        "daily_first_day": first_day,
+        "daily_total": days.sum(axis=2, dtype=np.float64).astype(np.float32),
+        "daily_peak": days.max(axis=2),
+        "daily_peak_hour": (first_day[:, None] + np.arange(n_days)) * DAY_SECONDS + peak_hour * HOUR_SECONDS
+    }
+
+class PrecomputedForecasts:
+    # arrays: locations, starts, values, input_versions, computed_at
+    # (per site), the daily_* aggregates, and meta (model version, issue time)
+    def __init__(self, arrays, meta=None):
+        self.arrays = arrays
+        self.meta = meta or {}
+        self.index = {str(name): i for i, name in enumerate(arrays["locations"])}
+
+    @classmethod
+    def build(cls, locations, starts, values, input_versions, computed_at, meta=None):
+        starts = np.asarray(starts, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float32)
+        arrays = {
+            "locations": np.array(locations, dtype=str),
+            "starts": starts,
+            "values": values,
+            "input_versions": np.array(input_versions, dtype=str),
+            "computed_at": np.asarray(computed_at, dtype=np.int64),
+            **daily_aggregates(starts, values)
+        }
+        return cls(arrays, meta)
+
+    @classmethod
+    def from_bytes(cls, data):
+        with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+            arrays = {name: npz[name] for name in npz.files if name != "meta"}
+            meta = json.loads(str(npz["meta"])) if "meta" in npz.files else {}
+        return cls(arrays, meta)
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, meta=np.array(json.dumps(self.meta)), **self.arrays)
+        return buffer.getvalue()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, location):
+        return location in self.index
+
+    # Per-site fields as a dict, for the precompute job's change detection
+    def site(self, location):
+        i = self.index[location]
+        return {
+            "start": int(self.arrays["starts"][i]),
+            "values": self.arrays["values"][i],
+            "input_version": str(self.arrays["input_versions"][i]),
+            "computed_at": int(self.arrays["computed_at"][i])
+        }
+
+    # (sites x hours) forecast from `start` (epoch seconds, a whole hour), or None
+    # if any site is missing or its stored forecast doesn't cover the window
+    def forecasts(self, sites, start, hours):
+        rows = [self.index.get(site) for site in sites]
+        if any(row is None for row in rows):
+            return None
+        rows = np.array(rows)
+        offsets = (int(start) - self.arrays["starts"][rows]) // HOUR_SECONDS
+        if (offsets < 0).any() or (offsets + hours > self.arrays["values"].shape[1]).any():
+            return None
+        return self.arrays["values"][rows[:, None], offsets[:, None] + np.arange(hours)]
+
+    # Daily aggregates for one site: [{"date", "total_kwh", "peak_kwh", "peak_hour"}]
+    def daily(self, location):
+        i = self.index[location]
+        first_day = int(self.arrays["daily_first_day"][i])
+        return [
+            {
+                "date": str(np.datetime_as_string(np.datetime64((first_day + d) * DAY_SECONDS, 's'), unit='D')),
+                "total_kwh": round(float(total), 3),
+                "peak_kwh": round(float(peak), 3),
+                "peak_hour": int(peak_hour)
+            }
+            for d, (total, peak, peak_hour) in enumerate(zip(self.arrays["daily_total"][i],
+                                                             self.arrays["daily_peak"][i],
+                                                             self.arrays["daily_peak_hour"][i]))
+        ]
+
+    def stats(self):
+        return {
+            "sites": len(self),
+            "hours": int(self.arrays["values"].shape[1]) if len(self) else 0,
+            **self.meta
+        }
+
+# (PrecomputedForecasts, etag), or (None, None) if nothing has been precomputed yet
+def read_precomputed(container_client, blob_name=PRECOMPUTED_BLOB):
+    blob_client = container_client.get_blob_client(blob_name)
+    try:
+        etag = blob_client.get_blob_properties().etag
+        return PrecomputedForecasts.from_bytes(blob_client.download_blob().readall()), etag
+    except ResourceNotFoundError:
+        return None, None
+
+# Etag of the precomputed blob (cheap freshness check for readers), or None
+def precomputed_etag(container_client, blob_name=PRECOMPUTED_BLOB):
+    try:
+        return container_client.get_blob_client(blob_name).get_blob_properties().etag
+    except ResourceNotFoundError:
+        return None
+
+def write_precomputed(container_client, forecasts, blob_name=PRECOMPUTED_BLOB):
+    data = forecasts.to_bytes()
+    container_client.get_blob_client(blob_name).upload_blob(data, overwrite=True)
+    return len(data)
+
+# {location: (start, per-hour input hashes)} from the precompute job's last run, or {}
+def read_input_hashes(container_client, blob_name=INPUT_HASHES_BLOB):
+    try:
+        data = container_client.get_blob_client(blob_name).download_blob().readall()
+    except ResourceNotFoundError:
+        return {}
+    with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+        return {str(location): (int(start), hashes)
+                for location, start, hashes in zip(npz["locations"], npz["starts"], npz["hashes"])}
+
+def write_input_hashes(container_client, locations, starts, hashes, blob_name=INPUT_HASHES_BLOB):
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, locations=np.array(locations, dtype=str),
+                        starts=np.asarray(starts, dtype=np.int64),
+                        hashes=np.asarray(hashes, dtype=np.uint64).reshape(len(locations), MAX_HORIZON_HOURS))
+    container_client.get_blob_client(blob_name).upload_blob(buffer.getvalue(), overwrite=True)
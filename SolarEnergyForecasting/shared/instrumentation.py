@@ -0,0 +1,281 @@
+# Lightweight in-process metrics: counters, gauges and latency histograms
+# Shared by the collector, the trainer, the scoring script and the dashboard.
+# Recording a value is a dict lookup, a bisect and a lock (~2 us; ~5 us for a
+# timed block), so it is safe on hot paths. The dashboard serves everything
+# recorded in its process at /metrics in the Prometheus text format.
+#
+#   with timed("score_run_seconds", kind="fleet"):
+#       ...
+#   @timed("collector_upload_seconds")
+#   def upload(...): ...
+#   counter("score_errors_total").inc(error="KeyError")
+#
+# Optional OpenTelemetry export: when OTEL_EXPORTER_OTLP_ENDPOINT is set (e.g.
+# http://localhost:4318 for a local collector) and opentelemetry-sdk plus
+# opentelemetry-exporter-otlp-proto-http are installed, every counter and
+# histogram value is also sent over OTLP/HTTP. OTEL_SERVICE_NAME names the process.
+# Metrics are per process: with several gunicorn workers a /metrics scrape sees
+# the worker that served it, so aggregate across workers with the OTLP export.
+
+import bisect
+import os
+import threading
+import time
+from functools import wraps
+
+try:
+    from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+except ImportError:
+    MeterProvider = None
+
+# Latency buckets in seconds, from sub-millisecond lookups to multi-minute fits
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+OTEL_ENDPOINT = os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT")
+OTEL_EXPORT_MILLIS = int(os.environ.get("OTEL_METRIC_EXPORT_INTERVAL", 15000))
+
+_metrics = {}
+_registry_lock = threading.Lock()
+
+# The meter provider is created lazily in the process that records, so a parent
+# that forks workers (gunicorn preload, ProcessPoolExecutor) doesn't hand them
+# a dead export thread
+_otel = {"pid": None, "provider": None, "meter": None}
+_otel_lock = threading.Lock()
+
+def otel_enabled():
+    return bool(OTEL_ENDPOINT) and MeterProvider is not None
+
+def _otel_meter():
+    if not otel_enabled():
+        return None
+    with _otel_lock:
+        if _otel["pid"] != os.getpid():
+            # The exporter reads OTEL_EXPORTER_OTLP_ENDPOINT (and headers) itself
+            reader = PeriodicExportingMetricReader(OTLPMetricExporter(),
+                                                   export_interval_millis=OTEL_EXPORT_MILLIS)
+            _otel["provider"] = MeterProvider(metric_readers=[reader])
+            _otel["meter"] = _otel["provider"].get_meter("solar_forecast")
+            _otel["pid"] = os.getpid()
+        return _otel["meter"]
+
+# Push pending OTLP values now; for processes that exit without running atexit
+# hooks (pool workers) or short-lived function invocations
+def flush():
+    if _otel["provider"] is not None and _otel["pid"] == os.getpid():
+        _otel["provider"].force_flush()
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, description=""):
+        self.name = name
+        self.description = description
+        self._values = {}
+        self._lock = threading.Lock()
+        self._instrument = None
+        self._instrument_pid = None
+
+    # OpenTelemetry instrument for this metric, or None when export is off
+    def _otel_instrument(self):
+        if self._instrument_pid != os.getpid():
+            meter = _otel_meter()
+            self._instrument = self._create_instrument(meter) if meter is not None else None
+            self._instrument_pid = os.getpid()
+        return self._instrument
+
+    def _create_instrument(self, meter):
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        if OTEL_ENDPOINT and self._otel_instrument() is not None:
+            self._instrument.add(amount, attributes=dict(key))
+
+    def _create_instrument(self, meter):
+        return meter.create_counter(self.name, description=self.description)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+    def summary(self):
+        with self._lock:
+            return {_format_labels(key) or "total": value for key, value in self._values.items()}
+
+# Point-in-time values (cache size, queue depth); set when read, not exported over OTLP
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def _create_instrument(self, meter):
+        return None
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, description="", buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        # Bucket i counts values <= buckets[i]; the last slot is +Inf
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+        if OTEL_ENDPOINT and self._otel_instrument() is not None:
+            self._instrument.record(value, attributes=dict(key))
+
+    def _create_instrument(self, meter):
+        return meter.create_histogram(self.name, unit="s" if self.name.endswith("_seconds") else "",
+                                      description=self.description)
+
+    def samples(self):
+        with self._lock:
+            values = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        samples = []
+        for key, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", key + (('le', _format_bound(bound)),), cumulative))
+            samples.append((f"{self.name}_sum", key, total))
+            samples.append((f"{self.name}_count", key, count))
+        return samples
+
+    # Count, total and mean per label set, plus p50/p90/p99 estimated from the buckets
+    def summary(self):
+        with self._lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+        result = {}
+        for key, (counts, total, count) in values.items():
+            result[_format_labels(key) or "total"] = {
+                "count": count,
+                "sum": round(total, 6),
+                "mean": round(total / count, 6) if count else 0.0,
+                **{f"p{int(q * 100)}": self.quantile(counts, count, q) for q in (0.5, 0.9, 0.99)}
+            }
+        return result
+
+    # Upper bound of the bucket holding the q-th value (what Prometheus' histogram_quantile
+    # would interpolate within)
+    def quantile(self, counts, count, q):
+        if not count:
+            return 0.0
+        rank = q * count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return bound if bound != float('inf') else self.buckets[-1]
+        return self.buckets[-1]
+
+def _get_or_create(cls, name, *args):
+    metric = _metrics.get(name)
+    if metric is None:
+        with _registry_lock:
+            metric = _metrics.get(name)
+            if metric is None:
+                metric = _metrics[name] = cls(name, *args)
+    if type(metric) is not cls:
+        raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+    return metric
+
+def counter(name, description=""):
+    return _get_or_create(Counter, name, description)
+
+def gauge(name, description=""):
+    return _get_or_create(Gauge, name, description)
+
+def histogram(name, description="", buckets=DEFAULT_BUCKETS):
+    return _get_or_create(Histogram, name, description, buckets)
+
+# Times a block or a function into a histogram; `seconds` holds the last duration.
+# Labels can be added inside the block (e.g. a response status) via timer.labels.
+class Timer:
+    def __init__(self, name, labels):
+        self.histogram = histogram(name)
+        self.labels = labels
+        self.seconds = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self._start
+        self.histogram.observe(self.seconds, **self.labels)
+        return False
+
+    def __call__(self, fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            # A fresh timer per call, so the decorator is thread-safe
+            with Timer(self.histogram.name, dict(self.labels)):
+                return fn(*args, **kwargs)
+        return wrapper
+
+def timed(name, **labels):
+    return Timer(name, labels)
+
+def _format_bound(bound):
+    return "+Inf" if bound == float('inf') else repr(float(bound))
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(key):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in key)
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value) if value == value and abs(value) != float('inf') else str(value)
+    return str(value)
+
+# Every metric in the Prometheus text exposition format
+def render_prometheus():
+    lines = []
+    for name in sorted(_metrics):
+        metric = _metrics[name]
+        if metric.description:
+            lines.append(f"# HELP {name} {metric.description}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for sample_name, key, value in metric.samples():
+            labels = _format_labels(key)
+            lines.append(f"{sample_name}{{{labels}}} {_format_value(value)}" if labels
+                         else f"{sample_name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+# JSON-friendly summary of every metric, for logs and reports
+def snapshot():
+    return {name: _metrics[name].summary() for name in sorted(_metrics)}
+
+def reset():
+    for metric in list(_metrics.values()):
+        metric.clear()
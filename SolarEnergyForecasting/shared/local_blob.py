@@ -0,0 +1,98 @@
+# Filesystem-backed stand-in for azure.storage.blob's ContainerClient
+# Lets the collector and the trainer run offline against a local folder:
+#   container_client = LocalContainerClient("./local-solar-data")
+
+import hashlib
+import os
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+
+class LocalDownloader:
+    def __init__(self, data):
+        self._data = data
+
+    def readall(self):
+        return self._data
+
+class LocalBlobClient:
+    def __init__(self, root, blob_name):
+        self.blob_name = blob_name
+        self.path = os.path.join(root, *blob_name.split('/'))
+
+    def exists(self):
+        return os.path.isfile(self.path)
+
+    def get_blob_properties(self):
+        if not self.exists():
+            raise ResourceNotFoundError(f"Blob {self.blob_name} not found")
+        return _properties(self.blob_name, self.path)
+
+    def download_blob(self):
+        if not self.exists():
+            raise ResourceNotFoundError(f"Blob {self.blob_name} not found")
+        with open(self.path, 'rb') as f:
+            return LocalDownloader(f.read())
+
+    def upload_blob(self, data, overwrite=False, **kwargs):
+        if self.exists() and not overwrite:
+            raise ResourceExistsError(f"Blob {self.blob_name} already exists")
+        self._write(data, 'wb')
+
+    def create_append_blob(self, etag=None, match_condition=None, **kwargs):
+        # The conditions compact_blobs.py uses: unchanged since `etag`, or not there yet
+        if match_condition == MatchConditions.IfNotModified and (
+                not self.exists() or self.get_blob_properties().etag != etag):
+            raise ResourceModifiedError(f"Blob {self.blob_name} was modified")
+        if match_condition == MatchConditions.IfMissing and self.exists():
+            raise ResourceExistsError(f"Blob {self.blob_name} already exists")
+        self._write(b'', 'wb')
+
+    def append_block(self, data, **kwargs):
+        if not self.exists():
+            raise ResourceNotFoundError(f"Blob {self.blob_name} not found")
+        self._write(data, 'ab')
+
+    def delete_blob(self, **kwargs):
+        if not self.exists():
+            raise ResourceNotFoundError(f"Blob {self.blob_name} not found")
+        os.remove(self.path)
+
+    def _write(self, data, mode):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, mode) as f:
+            f.write(data)
+
+class LocalContainerClient:
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def list_blobs(self, name_starts_with=None):
+        names = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                rel = os.path.relpath(os.path.join(dirpath, filename), self.root)
+                names.append(rel.replace(os.sep, '/'))
+
+        # Azure lists blobs in lexicographic order
+        for name in sorted(names):
+            if name_starts_with and not name.startswith(name_starts_with):
+                continue
+            yield _properties(name, os.path.join(self.root, *name.split('/')))
+
+    def get_blob_client(self, blob):
+        return LocalBlobClient(self.root, blob)
+
+def _properties(name, path):
+    stat = os.stat(path)
+    etag = hashlib.md5(f"{stat.st_size}-{stat.st_mtime_ns}".encode()).hexdigest()
+    return SimpleNamespace(
+        name=name,
+        etag=f'"{etag}"',
+        size=stat.st_size,
+        last_modified=datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+    )
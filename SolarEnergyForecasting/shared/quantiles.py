@@ -0,0 +1,25 @@
+# Forecast quantile levels, as requested from the scoring endpoint and the dashboard API
+# Both parse the same request values, so a level means the same thing on either side
+# and the band names (p10, p90, ...) match.
+
+# P10/P50/P90 when a request just asks for quantiles
+DEFAULT_QUANTILES = (0.1, 0.5, 0.9)
+
+def quantile_name(q):
+    return f"p{q * 100:g}"
+
+# None, or the quantile levels asked for: true/"true"/"1" for DEFAULT_QUANTILES, or
+# a comma-separated string / list of levels in [0, 1]. Raises ValueError otherwise.
+def parse_quantiles(value):
+    if value in (None, '', False, 'false', '0'):
+        return None
+    if value in (True, 'true', '1'):
+        return DEFAULT_QUANTILES
+    levels = value.split(',') if isinstance(value, str) else value
+    try:
+        quantiles = tuple(float(q) for q in levels)
+    except (TypeError, ValueError):
+        quantiles = ()
+    if not quantiles or not all(0 <= q <= 1 for q in quantiles):
+        raise ValueError(f"quantiles must be true or a list of levels between 0 and 1, got {value!r}")
+    return quantiles
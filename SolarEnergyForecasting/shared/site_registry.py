@@ -0,0 +1,97 @@
+# Site registry: the solar sites we collect weather for, train on and forecast
+# Sites are loaded from sites.json (or SITE_REGISTRY_PATH), or from a JSON blob
+# in the data container. Each site is a dict with name, lat, lon, capacity_kw,
+# tilt, azimuth and timezone, so existing code indexing location["name"],
+# location["lat"] and location["lon"] keeps working.
+#
+# Sites are also bucketed into lat/lon grid cells. Nearby sites that fall in the
+# same cell share one weather API call.
+
+import json
+import math
+import os
+from collections import defaultdict
+
+DEFAULT_REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sites.json")
+DEFAULT_GRID_SIZE_DEG = 0.1  # roughly 11 km north-south
+
+REQUIRED_FIELDS = ("name", "lat", "lon")
+SITE_DEFAULTS = {"capacity_kw": 100.0, "tilt": 30.0, "azimuth": 180.0, "timezone": "UTC"}
+
+class SiteRegistry:
+    def __init__(self, sites, grid_size_deg=DEFAULT_GRID_SIZE_DEG):
+        self.grid_size_deg = grid_size_deg
+        self._sites = []
+        self._by_name = {}
+        self._by_cell = defaultdict(list)
+
+        for site in sites:
+            missing = [field for field in REQUIRED_FIELDS if field not in site]
+            if missing:
+                raise ValueError(f"Site {site.get('name')!r} is missing {', '.join(missing)}")
+            if site["name"] in self._by_name:
+                raise ValueError(f"Duplicate site name {site['name']!r}")
+
+            site = {**SITE_DEFAULTS, **site}
+            self._sites.append(site)
+            self._by_name[site["name"]] = site
+            self._by_cell[self.grid_cell(site["lat"], site["lon"])].append(site)
+
+    def __iter__(self):
+        return iter(self._sites)
+
+    def __len__(self):
+        return len(self._sites)
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def get(self, name):
+        try:
+            return self._by_name[name]
+        except KeyError:
+            raise KeyError(f"Unknown site {name!r}") from None
+
+    def names(self):
+        return [site["name"] for site in self._sites]
+
+    def grid_cell(self, lat, lon):
+        return (math.floor(lat / self.grid_size_deg), math.floor(lon / self.grid_size_deg))
+
+    def sites_in_cell(self, lat, lon):
+        return list(self._by_cell.get(self.grid_cell(lat, lon), []))
+
+    # One entry per grid cell: the coordinates to query and the sites sharing the result
+    def weather_cells(self, sites=None):
+        return group_by_weather_cell(self._sites if sites is None else sites, self.grid_size_deg)
+
+def group_by_weather_cell(sites, grid_size_deg=DEFAULT_GRID_SIZE_DEG):
+    cells = defaultdict(list)
+    for site in sites:
+        cell = (math.floor(site["lat"] / grid_size_deg), math.floor(site["lon"] / grid_size_deg))
+        cells[cell].append(site)
+
+    # Query at the centroid of the cell's sites, so a lone site keeps its exact coordinates
+    return [
+        (round(sum(s["lat"] for s in members) / len(members), 4),
+         round(sum(s["lon"] for s in members) / len(members), 4),
+         members)
+        for members in cells.values()
+    ]
+
+def parse_site_registry(payload, grid_size_deg=None):
+    config = json.loads(payload) if isinstance(payload, (str, bytes)) else payload
+    if isinstance(config, list):
+        config = {"sites": config}
+    if grid_size_deg is None:
+        grid_size_deg = float(os.environ.get("SITE_GRID_DEG", config.get("grid_size_deg", DEFAULT_GRID_SIZE_DEG)))
+    return SiteRegistry(config["sites"], grid_size_deg=grid_size_deg)
+
+def load_site_registry(path=None, grid_size_deg=None):
+    path = path or os.environ.get("SITE_REGISTRY_PATH", DEFAULT_REGISTRY_PATH)
+    with open(path) as f:
+        return parse_site_registry(f.read(), grid_size_deg)
+
+def load_site_registry_from_blob(container_client, blob_name="sites.json", grid_size_deg=None):
+    payload = container_client.get_blob_client(blob_name).download_blob().readall()
+    return parse_site_registry(payload, grid_size_deg)
@@ -0,0 +1,151 @@
+# Compact, append-only store for collector snapshots
+# Each collection run appends one compact JSON line to a daily append blob:
+#   {location}/{YYYY-MM-DD}.ndjson
+# The original layout wrote one pretty-printed blob per run:
+#   {location}/{YYYY-MM-DD}/{HH-MM-SS}.json
+# Both layouts carry the date as the second path segment, so readers can prune
+# blobs by date range from the listing alone.
+# After every run the collector also rewrites collection/latest.json, so jobs
+# that depend on fresh snapshots (MLNotebooks/precompute.py) can wait for it.
+#
+# Forecast deltas: the 3-hourly forecast list only changes when OpenWeatherMap
+# issues a new run, so after the first line of each daily blob the collector
+# stores just the periods that changed since the site's previous line:
+#   {..., "forecast_delta": {"base": <previous timestamp>, "first": dt, "last": dt,
+#                            "changed": [periods that are new or differ]}}
+# instead of "forecast". The forecast is the base line's periods (updated with
+# "changed") from first to last dt. The first line of a day is always complete,
+# so every blob rebuilds on its own; parse_snapshots returns full snapshots.
+# collection/fetch_state.json keeps what the next run diffs against (per-period
+# hashes per weather cell) and the forecast endpoint's cache validators.
+
+import hashlib
+import json
+import logging
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import ContentSettings
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+COLLECTION_MARKER_BLOB = "collection/latest.json"
+FETCH_STATE_BLOB = "collection/fetch_state.json"
+
+# Append blocks are capped at 4 MiB by the blob service
+MAX_APPEND_BLOCK = 4 * 1024 * 1024
+
+def snapshot_blob_name(location_name, date_str):
+    return f"{location_name}/{date_str}.ndjson"
+
+def blob_date(blob_name):
+    parts = blob_name.split('/')
+    if len(parts) < 2:
+        return None
+    return parts[1][:10]
+
+def in_date_range(blob_name, start_date=None, end_date=None):
+    date_str = blob_date(blob_name)
+    if date_str is None:
+        return False
+    if start_date and date_str < str(start_date):
+        return False
+    if end_date and date_str > str(end_date):
+        return False
+    return True
+
+def encode_snapshot(data):
+    return json.dumps(data, separators=(',', ':')) + "\n"
+
+def append_lines(blob_client, payload):
+    payload = payload.encode('utf-8') if isinstance(payload, str) else payload
+    for offset in range(0, len(payload), MAX_APPEND_BLOCK):
+        blob_client.append_block(payload[offset:offset + MAX_APPEND_BLOCK])
+
+# Append one snapshot to its location's daily blob, creating the blob on first write
+def append_snapshot(container_client, data, date_str):
+    blob_name = snapshot_blob_name(data["location"], date_str)
+    blob_client = container_client.get_blob_client(blob_name)
+    line = encode_snapshot(data)
+    try:
+        blob_client.append_block(line)
+    except ResourceNotFoundError:
+        blob_client.create_append_blob(
+            content_settings=ContentSettings(content_type=NDJSON_CONTENT_TYPE))
+        blob_client.append_block(line)
+    return blob_name
+
+# Parse a blob payload in either layout into snapshot records. With keep_fields,
+# records keep only those top-level fields: every line is still parsed in full, so
+# this trims what callers hold on to, not parse time.
+def parse_snapshots(blob_name, payload, keep_fields=None):
+    if blob_name.endswith('.ndjson'):
+        records = [json.loads(line) for line in payload.splitlines() if line.strip()]
+    else:
+        records = [json.loads(payload)]
+    if not keep_fields or 'forecast' in keep_fields:
+        expand_forecast_deltas(records)
+
+    if keep_fields:
+        records = [{k: record[k] for k in keep_fields if k in record} for record in records]
+    return records
+
+# Short, stable hash of each forecast period, keyed by its dt (as a string, like JSON keys)
+def period_hashes(periods):
+    return {
+        str(period["dt"]): hashlib.blake2b(json.dumps(period, sort_keys=True, separators=(',', ':')).encode('utf-8'),
+                                           digest_size=8).hexdigest()
+        for period in periods
+    }
+
+# Delta of `periods` against the base line's period hashes
+def forecast_delta(periods, hashes, base_timestamp, base_hashes):
+    return {
+        "base": base_timestamp,
+        "first": periods[0]["dt"] if periods else None,
+        "last": periods[-1]["dt"] if periods else None,
+        "changed": [period for period in periods if base_hashes.get(str(period["dt"])) != hashes[str(period["dt"])]]
+    }
+
+# Rebuild "forecast" for delta lines in place, from earlier lines of the same blob.
+# A delta whose base line is missing (or itself couldn't be rebuilt) gets an
+# empty forecast rather than a wrong one.
+def expand_forecast_deltas(records):
+    periods_at = {}
+    for record in records:
+        delta = record.pop("forecast_delta", None)
+        if delta is None:
+            periods = {period["dt"]: period for period in record.get("forecast", [])}
+        elif periods_at.get(delta["base"]) is None:
+            logging.warning(f"Forecast delta for {record.get('location')} at {record.get('timestamp')}: "
+                            f"base snapshot {delta['base']} not found; forecast left empty")
+            periods = None
+            record["forecast"] = []
+        else:
+            periods = dict(periods_at[delta["base"]])
+            periods.update((period["dt"], period) for period in delta["changed"])
+            first, last = delta["first"], delta["last"]
+            periods = {dt: periods[dt] for dt in sorted(periods)
+                       if first is not None and first <= dt <= last}
+            record["forecast"] = list(periods.values())
+        periods_at[record.get("timestamp")] = periods
+    return records
+
+def write_collection_marker(container_client, payload):
+    container_client.get_blob_client(COLLECTION_MARKER_BLOB).upload_blob(
+        json.dumps(payload).encode('utf-8'), overwrite=True)
+
+# Etag of the collection marker, or None before the first collection run
+def collection_marker_etag(container_client):
+    try:
+        return container_client.get_blob_client(COLLECTION_MARKER_BLOB).get_blob_properties().etag
+    except ResourceNotFoundError:
+        return None
+
+# The collector's per-cell fetch and diff state, {} before the first run
+def read_fetch_state(container_client):
+    try:
+        return json.loads(container_client.get_blob_client(FETCH_STATE_BLOB).download_blob().readall())
+    except ResourceNotFoundError:
+        return {}
+
+def write_fetch_state(container_client, state):
+    container_client.get_blob_client(FETCH_STATE_BLOB).upload_blob(
+        json.dumps(state, separators=(',', ':')).encode('utf-8'), overwrite=True)
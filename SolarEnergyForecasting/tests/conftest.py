@@ -0,0 +1,31 @@
+# The units import each other as flat scripts from their own folders, so the
+# tests put those folders on sys.path the same way
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ("shared", "MLNotebooks", "SolarDashboard", "WeatherDataCollector", os.path.join("WeatherDataCollector", "WeatherDataFunction")):
+    path = os.path.join(ROOT, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# blob_loader's download cache, kept out of the working tree
+os.environ.setdefault("BLOB_CACHE_DIR", os.path.join(tempfile.mkdtemp(), ".blob_cache"))
+
+# mock_weather_server on an ephemeral port; yields its base URL. The handler's
+# clock and rate limiting are class attributes, reset afterwards.
+@pytest.fixture
+def base_url():
+    from mock_weather_server import MockWeatherHandler
+    server = ThreadingHTTPServer(("localhost", 0), MockWeatherHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://localhost:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+    MockWeatherHandler.clock = staticmethod(time.time)
+    MockWeatherHandler.rate_limit_every = 0
@@ -0,0 +1,60 @@
+# Rolling-origin folds and the pruned hyperparameter search (backtest.py)
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import materialize_folds, rolling_origin_folds, run_search
+
+HOUR = 3600 * 10**9
+
+def hourly_timestamps(hours, sites=1):
+    start = pd.Timestamp('2025-06-01').value
+    return np.repeat(start + np.arange(hours, dtype=np.int64) * HOUR, sites)
+
+@pytest.mark.parametrize("sites", [1, 3])
+def test_folds_tile_the_newest_history(sites):
+    timestamps = hourly_timestamps(30 * 24 + 5, sites)
+    folds = rolling_origin_folds(timestamps, n_folds=4, horizon_days=7, min_train_days=14)
+
+    # 30 days of history leave room for two 7-day test windows after 14 days of training
+    assert len(folds) == 2
+    assert folds[-1][1] == len(timestamps)
+    for (train_end, test_end), (next_train_end, _) in zip(folds, folds[1:]):
+        assert test_end == next_train_end
+    for train_end, test_end in folds:
+        # Every site's rows for an hour land on the same side of the origin
+        assert timestamps[train_end - 1] < timestamps[train_end]
+        assert test_end - train_end == 7 * 24 * sites
+        assert (timestamps[train_end] - timestamps[0]) >= 14 * 24 * HOUR
+
+def test_overlapping_windows_are_clipped_to_the_data():
+    timestamps = hourly_timestamps(30 * 24)
+    folds = rolling_origin_folds(timestamps, n_folds=3, horizon_days=7, min_train_days=14, step_days=3)
+    assert [test_end - train_end for train_end, test_end in folds] == [7 * 24, 6 * 24, 3 * 24]
+    assert all(test_end <= len(timestamps) for _, test_end in folds)
+
+def test_too_little_history_is_an_error():
+    with pytest.raises(ValueError):
+        rolling_origin_folds(hourly_timestamps(20 * 24), n_folds=2, horizon_days=7, min_train_days=14)
+
+def test_search_prunes_each_family_after_a_fold(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 30 * 24
+    x = rng.random(n)
+    features_df = pd.DataFrame({
+        'timestamp': pd.date_range('2025-06-01', periods=n, freq='h', tz='UTC'),
+        'x': x,
+        'noise': rng.random(n),
+        'solar_energy_kwh': 80 * x + rng.normal(0, 1, n)
+    })
+    fold_dir = materialize_folds(features_df, ['x', 'noise'], str(tmp_path), n_folds=2, horizon_days=7,
+                                 min_train_days=14)
+    # max_depth=-1 is invalid, so that candidate fails on the first fold
+    grids = {'rf': {'n_estimators': [5], 'max_depth': [1, 2, 8, -1]}}
+    results = run_search(fold_dir, grids, workers=2, keep_fraction=0.5)
+
+    statuses = {result['params']['max_depth']: result['status'] for result in results}
+    assert statuses[-1].startswith("failed: ")
+    assert statuses[1] == "pruned after fold 0"
+    assert statuses[2] == statuses[8] == "complete"
+    assert [len(result['folds']) for result in results] == [1, 2, 2, 0]
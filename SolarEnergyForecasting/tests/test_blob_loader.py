@@ -0,0 +1,63 @@
+# Loading collector snapshots through LocalContainerClient, the local stand-in
+# for the Azure container (LOCAL_BLOB_ROOT)
+import json
+import os
+
+import blob_loader
+from blob_loader import get_container_client, load_data_from_blob
+from local_blob import LocalContainerClient
+from snapshot_store import append_snapshot
+
+def snapshot(timestamp, temperature):
+    return {"timestamp": timestamp, "location": "site_a", "latitude": 40.0, "longitude": -100.0,
+            "current": {"temperature": temperature, "clouds": 20, "weather_description": "clear sky",
+                        "wind_speed": 3.0},
+            "forecast": [{"dt": 1748800800, "main": {"temp": temperature + 1}}]}
+
+def write_blobs(root):
+    container_client = LocalContainerClient(root)
+    append_snapshot(container_client, snapshot("2025-06-01T10:00:00+00:00", 20.0), "2025-06-01")
+    append_snapshot(container_client, snapshot("2025-06-01T11:00:00+00:00", 21.0), "2025-06-01")
+    append_snapshot(container_client, snapshot("2025-06-02T10:00:00+00:00", 22.0), "2025-06-02")
+    # The original one-blob-per-run layout
+    os.makedirs(os.path.join(root, "site_a", "2025-05-31"))
+    with open(os.path.join(root, "site_a", "2025-05-31", "10-00-00.json"), "w") as f:
+        json.dump(snapshot("2025-05-31T10:00:00+00:00", 19.0), f, indent=2)
+    return container_client
+
+def test_snapshots_load_from_a_local_root(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOCAL_BLOB_ROOT", str(tmp_path / "blobs"))
+    write_blobs(str(tmp_path / "blobs"))
+    container_client = get_container_client()
+    assert isinstance(container_client, LocalContainerClient)
+
+    records = load_data_from_blob(container_client, "site_a", cache_dir=str(tmp_path / "cache"))
+    assert [r["timestamp"][:13] for r in records] == ["2025-05-31T10", "2025-06-01T10", "2025-06-01T11",
+                                                      "2025-06-02T10"]
+    assert [r["current"]["temperature"] for r in records] == [19.0, 20.0, 21.0, 22.0]
+    assert records[1]["forecast"] == [{"dt": 1748800800, "main": {"temp": 21.0}}]
+
+    pruned = load_data_from_blob(container_client, "site_a", cache_dir=str(tmp_path / "cache"),
+                                 start_date="2025-06-01", end_date="2025-06-01", keep_fields=["timestamp", "current"])
+    assert [sorted(r) for r in pruned] == [["current", "timestamp"]] * 2
+
+def test_cache_is_reused_until_a_blob_changes(tmp_path, monkeypatch):
+    container_client = write_blobs(str(tmp_path / "blobs"))
+    cache_dir = str(tmp_path / "cache")
+    downloads = []
+    download_text = blob_loader._download_text
+    monkeypatch.setattr(blob_loader, "_download_text",
+                        lambda client, name: downloads.append(name) or download_text(client, name))
+
+    first = load_data_from_blob(container_client, "site_a", cache_dir=cache_dir)
+    assert len(downloads) == 3 and os.path.exists(os.path.join(cache_dir, "site_a.parquet"))
+
+    downloads.clear()
+    assert load_data_from_blob(container_client, "site_a", cache_dir=cache_dir) == first
+    assert downloads == []
+
+    # An append changes the blob's etag, so only that blob is fetched again
+    append_snapshot(container_client, snapshot("2025-06-02T11:00:00+00:00", 23.0), "2025-06-02")
+    records = load_data_from_blob(container_client, "site_a", cache_dir=cache_dir)
+    assert downloads == ["site_a/2025-06-02.ndjson"]
+    assert records[-1]["current"]["temperature"] == 23.0
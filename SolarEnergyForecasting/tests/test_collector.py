@@ -0,0 +1,70 @@
+# Collector against mock_weather_server: retries, conditional fetches and delta
+# snapshots end to end (see test_forecast_deltas.py for the delta edge cases)
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from collector import collect_all, fetch_json, get_session, HostLimiter
+from instrumentation import counter
+from local_blob import LocalContainerClient
+from mock_weather_server import MockWeatherHandler
+from snapshot_store import expand_forecast_deltas, read_fetch_state, write_fetch_state
+
+START = datetime(2025, 6, 1, 19, 0, tzinfo=timezone.utc)
+SITE = {"name": "site_a", "lat": 40.0, "lon": -100.0}
+
+def run_at(container_client, base_url, now, delta_snapshots=True):
+    MockWeatherHandler.clock = staticmethod(now.timestamp)
+    return collect_all([SITE], "test", container_client, now.isoformat(), now.strftime("%Y-%m-%d"),
+                       base_url=base_url, delta_snapshots=delta_snapshots)
+
+def stored_lines(container_client):
+    payload = container_client.get_blob_client("site_a/2025-06-01.ndjson").download_blob().readall()
+    return [json.loads(line) for line in payload.decode('utf-8').splitlines()]
+
+def test_rate_limited_request_is_retried_after_retry_after(base_url):
+    session, limiter = get_session(), HostLimiter()
+    url, params = f"{base_url}/data/2.5/weather", {"lat": 40.0, "lon": -100.0}
+    fetch_json(session, limiter, url, params)
+
+    # The next request is answered 429 with Retry-After: 1, the retry after it succeeds
+    MockWeatherHandler.rate_limit_every = 2
+    MockWeatherHandler.request_count = 1
+    retries = counter("collector_http_retries_total")
+    retries.clear()
+    start = time.perf_counter()
+    payload = fetch_json(session, limiter, url, params)
+    assert payload["coord"] == {"lat": 40.0, "lon": -100.0}
+    assert time.perf_counter() - start >= 1
+    assert MockWeatherHandler.request_count == 3
+    assert sum(retries.summary().values()) == 1
+
+def test_not_modified_forecast_reuses_the_previous_one(tmp_path, base_url):
+    container_client = LocalContainerClient(str(tmp_path))
+    run_at(container_client, base_url, START)
+
+    # Expire the cached response so the next run revalidates it (same issue, so 304)
+    state = read_fetch_state(container_client)
+    for cell in state["cells"].values():
+        cell["fetch"]["expires_at"] = 0
+    write_fetch_state(container_client, state)
+    fetches = counter("collector_conditional_fetch_total")
+    fetches.clear()
+    run_at(container_client, base_url, START + timedelta(hours=1))
+    assert list(fetches.summary()) == ['endpoint="forecast",result="not_modified"']
+
+    first, second = stored_lines(container_client)
+    assert second["forecast_delta"]["changed"] == []
+    assert expand_forecast_deltas([first, second])[1]["forecast"] == first["forecast"]
+
+def test_delta_snapshots_expand_to_the_full_ones(tmp_path, base_url):
+    full_client = LocalContainerClient(str(tmp_path / "full"))
+    delta_client = LocalContainerClient(str(tmp_path / "delta"))
+    for hour in range(4):
+        run_at(full_client, base_url, START + timedelta(hours=hour), delta_snapshots=False)
+        run_at(delta_client, base_url, START + timedelta(hours=hour))
+
+    full, delta = stored_lines(full_client), stored_lines(delta_client)
+    assert any("forecast_delta" in line for line in delta)
+    expanded = expand_forecast_deltas(delta)
+    assert [line["forecast"] for line in expanded] == [line["forecast"] for line in full]
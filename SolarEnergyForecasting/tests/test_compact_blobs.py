@@ -0,0 +1,50 @@
+# compact_blobs.py: legacy per-run blobs merged into the daily NDJSON blob
+import json
+
+import compact_blobs
+from compact_blobs import compact_day, find_legacy_blobs
+from local_blob import LocalContainerClient
+from snapshot_store import append_snapshot, parse_snapshots
+
+def snapshot(hour):
+    return {"timestamp": f"2025-06-01T{hour:02d}:00:00+00:00", "location": "site_a", "current": {}, "forecast": []}
+
+def legacy_blob(container_client, hour):
+    container_client.get_blob_client(f"site_a/2025-06-01/{hour:02d}-00-00.json").upload_blob(
+        json.dumps(snapshot(hour)).encode('utf-8'))
+
+def timestamps(container_client):
+    payload = container_client.get_blob_client("site_a/2025-06-01.ndjson").download_blob().readall().decode('utf-8')
+    return [record["timestamp"] for record in parse_snapshots("site_a/2025-06-01.ndjson", payload)]
+
+def test_legacy_blobs_merge_with_appended_lines(tmp_path):
+    container_client = LocalContainerClient(str(tmp_path))
+    legacy_blob(container_client, 1)
+    legacy_blob(container_client, 2)
+    append_snapshot(container_client, snapshot(3), "2025-06-01")
+    names = find_legacy_blobs(container_client)[("site_a", "2025-06-01")]
+
+    _, lines = compact_day(container_client, "site_a", "2025-06-01", names, delete=True)
+    assert lines == 3
+    assert timestamps(container_client) == [snapshot(hour)["timestamp"] for hour in (1, 2, 3)]
+    assert not find_legacy_blobs(container_client)
+
+def test_line_appended_during_the_merge_is_kept(tmp_path, monkeypatch):
+    container_client = LocalContainerClient(str(tmp_path))
+    legacy_blob(container_client, 1)
+    append_snapshot(container_client, snapshot(2), "2025-06-01")
+    names = find_legacy_blobs(container_client)[("site_a", "2025-06-01")]
+
+    # The collector appends right after the daily blob has been read
+    read_text = compact_blobs.read_text
+    def read_then_append(client, name):
+        text = read_text(client, name)
+        if name.endswith('.ndjson'):
+            append_snapshot(container_client, snapshot(3), "2025-06-01")
+        return text
+    monkeypatch.setattr(compact_blobs, "read_text", read_then_append)
+
+    _, lines = compact_day(container_client, "site_a", "2025-06-01", names, delete=True)
+    assert lines is None
+    assert timestamps(container_client) == [snapshot(hour)["timestamp"] for hour in (2, 3)]
+    assert find_legacy_blobs(container_client)
@@ -0,0 +1,69 @@
+# ForecastFeatureStore refreshes: parallel loading, per-location failures and
+# what a location's hourly forecast is built from
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+import numpy as np
+
+from collector import build_snapshot
+from feature_store import ForecastFeatureStore, LocationForecast
+from local_blob import LocalContainerClient
+from mock_weather_server import FORECAST_ISSUE_SECONDS, current_payload, forecast_payload
+from snapshot_store import append_snapshot
+
+SITE = {"name": "site_a", "lat": 40.0, "lon": -100.0}
+
+class FakeStore(ForecastFeatureStore):
+    def __init__(self, locations, failing=(), **kwargs):
+        super().__init__(None, locations, **kwargs)
+        self.failing = set(failing)
+        self.active = 0
+        self.most_active = 0
+        self.lock = threading.Lock()
+        self.all_started = threading.Barrier(len(locations), timeout=5)
+
+    def load_location(self, location):
+        with self.lock:
+            self.active += 1
+            self.most_active = max(self.most_active, self.active)
+        if self.max_workers >= len(self.locations):
+            self.all_started.wait()
+        with self.lock:
+            self.active -= 1
+        if location in self.failing:
+            raise OSError("blob unavailable")
+        return LocationForecast(0, {"temperature": np.zeros(3, dtype=np.float32)}, np.array(["clear sky"] * 3))
+
+def test_locations_load_in_parallel():
+    store = FakeStore([f"site_{i}" for i in range(4)], max_workers=4).refresh()
+    assert store.most_active == 4
+    assert store.stats()["locations"] == 4
+
+def test_failed_location_keeps_its_previous_forecast(caplog):
+    store = FakeStore(["a", "b"], max_workers=1).refresh()
+    previous = store._forecasts["b"]
+    store.failing = {"b"}
+    with caplog.at_level(logging.ERROR):
+        store.refresh()
+    assert store._forecasts["b"] is previous
+    assert "Feature store refresh failed for b" in caplog.text
+    assert "OSError" in caplog.text
+
+def test_missing_reading_is_not_interpolated(tmp_path):
+    container_client = LocalContainerClient(str(tmp_path / "blobs"))
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    issued = int(now.timestamp()) // FORECAST_ISSUE_SECONDS * FORECAST_ISSUE_SECONDS
+    for hours_ago, temperature in ((2, 18.0), (1, None)):
+        at = now - timedelta(hours=hours_ago)
+        current = {**current_payload(40.0, -100.0, at.timestamp()), "main": {"temp": temperature}}
+        append_snapshot(container_client, build_snapshot(SITE, current, forecast_payload(40.0, -100.0, issued),
+                                                         at.isoformat()), at.strftime("%Y-%m-%d"))
+
+    cache_dir = str(tmp_path / "cache")
+    store = ForecastFeatureStore(container_client, [SITE["name"]], cache_dir=cache_dir).refresh()
+    forecast = store._forecasts[SITE["name"]]
+    assert forecast.first_hour * 3600 == (now - timedelta(hours=2)).timestamp()
+    assert forecast.columns["temperature"][0] == 18.0
+    assert not np.isnan(forecast.columns["temperature"]).any()
+    assert os.listdir(cache_dir) == [f"{SITE['name']}.parquet"]
@@ -0,0 +1,52 @@
+# Materialized feature snapshots (features.materialize_features)
+import numpy as np
+import pandas as pd
+
+import features
+from features import FeaturePipeline, materialize_features
+
+def solar_frame(hours, temperature=20.0):
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2025-06-01', periods=hours, freq='h', tz='UTC'),
+        'location': 'solar_farm_1',
+        'temperature': np.full(hours, temperature),
+        'cloud_cover': np.full(hours, 30.0),
+        'wind_speed': np.full(hours, 4.0),
+        'clear_sky_ghi': np.arange(hours) * 100.0,
+        'weather_description': 'clear sky',
+        'solar_energy_kwh': np.arange(hours, dtype=float)
+    })
+
+def test_result_follows_the_input_rows(tmp_path, monkeypatch):
+    path = str(tmp_path / "features.parquet")
+    pipeline = FeaturePipeline().fit(solar_frame(1))
+    first = materialize_features(solar_frame(6), pipeline, path)
+    assert len(first) == 6 and features.SOURCE_HASH not in first
+
+    # Window moved on by two hours and one reading corrected
+    df = solar_frame(8).iloc[2:].copy()
+    df.loc[df.index[0], 'temperature'] = 25.0
+    transformed = []
+    transform = FeaturePipeline.transform
+    monkeypatch.setattr(FeaturePipeline, "transform", lambda self, rows: transformed.append(len(rows)) or
+                        transform(self, rows))
+    second = materialize_features(df, pipeline, path)
+    assert transformed == [3]
+    assert second['timestamp'].tolist() == df['timestamp'].tolist()
+    assert second['temperature'].tolist() == [25.0] + [20.0] * 5
+    pd.testing.assert_frame_equal(second, pipeline.transform(df).reset_index(drop=True), check_like=True)
+
+    # Nothing changed: read back as is, and the stored snapshot holds only these rows
+    transformed.clear()
+    third = materialize_features(df, pipeline, path)
+    assert transformed == []
+    pd.testing.assert_frame_equal(third, second)
+    assert len(pd.read_parquet(path)) == 6
+
+def test_vocabulary_change_rebuilds(tmp_path):
+    path = str(tmp_path / "features.parquet")
+    materialize_features(solar_frame(3), FeaturePipeline().fit(solar_frame(1)), path)
+    pipeline = FeaturePipeline(['clear sky', 'rain'])
+    rebuilt = materialize_features(solar_frame(3), pipeline, path)
+    assert set(pipeline.feature_names) <= set(rebuilt.columns)
+    assert rebuilt['weather_rain'].tolist() == [0, 0, 0]
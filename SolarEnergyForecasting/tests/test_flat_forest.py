@@ -0,0 +1,75 @@
+# Flat forests: predictions match sklearn on every backend, and exports stay in
+# step with the saved model
+import os
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+
+import flat_forest
+import score
+from flat_forest import (FlatForest, FlatForestVersionError, export_forest, flat_model_path, load_forest,
+                         tree_predictions, tree_quantiles, update_flat_export)
+
+QUANTILES = (0.0, 0.1, 0.5, 0.9, 1.0)
+
+def training_data(n_features=4):
+    rng = np.random.default_rng(0)
+    return rng.random((200, n_features)), rng.random(200) * 100
+
+@pytest.fixture(params=flat_forest.BACKENDS)
+def backend(request):
+    if request.param == 'numba' and flat_forest.numba is None:
+        pytest.skip("numba is not installed")
+    return request.param
+
+@pytest.fixture(scope="module")
+def forest():
+    X, y = training_data()
+    # Unbounded depth, so trees end at different depths
+    return RandomForestRegressor(n_estimators=12, min_samples_leaf=2, random_state=0).fit(X, y)
+
+# More rows than one numpy chunk and not a multiple of the numba block
+def scoring_rows(n_rows=2100):
+    return np.random.default_rng(1).random((n_rows, 4))
+
+def test_exported_forest_matches_sklearn(tmp_path, forest, backend):
+    path = export_forest(forest, str(tmp_path / "model.flat.joblib"))
+    flat = load_forest(path, backend=backend)
+    X = scoring_rows()
+    np.testing.assert_allclose(flat.predict(X), forest.predict(X), rtol=1e-12, atol=1e-12)
+
+    expected = tree_predictions(forest, X)
+    per_tree = tree_predictions(flat, X)
+    np.testing.assert_allclose(per_tree, expected, rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(flat.predict_quantiles(X, QUANTILES),
+                               np.quantile(expected, QUANTILES, axis=1).T, rtol=1e-12, atol=1e-12)
+
+def test_tree_quantiles_match_numpy():
+    per_tree = np.random.default_rng(2).random((50, 7))
+    np.testing.assert_allclose(tree_quantiles(per_tree, QUANTILES), np.quantile(per_tree, QUANTILES, axis=1).T)
+
+def test_older_exports_are_rejected(tmp_path):
+    path = str(tmp_path / "model.flat.joblib")
+    joblib.dump({'version': flat_forest.FLAT_FOREST_VERSION - 1}, path)
+    with pytest.raises(FlatForestVersionError):
+        load_forest(path)
+
+def test_saved_forest_replaces_the_flat_copy(tmp_path):
+    X, y = training_data()
+    model_path = str(tmp_path / "model.joblib")
+    old = RandomForestRegressor(n_estimators=3, random_state=0).fit(X, y)
+    update_flat_export(old, model_path)
+    new = RandomForestRegressor(n_estimators=5, random_state=1).fit(X, y)
+    joblib.dump(new, model_path)
+    update_flat_export(new, model_path)
+    score.load_model(model_path)
+    assert isinstance(score.model, FlatForest)
+    np.testing.assert_allclose(score.model.predict(X), new.predict(X), rtol=1e-12)
+
+def test_other_models_drop_the_flat_copy(tmp_path):
+    X, y = training_data()
+    model_path = str(tmp_path / "model.joblib")
+    update_flat_export(RandomForestRegressor(n_estimators=3, random_state=0).fit(X, y), model_path)
+    assert update_flat_export(HistGradientBoostingRegressor(max_iter=5).fit(X, y), model_path) is None
+    assert not os.path.exists(flat_model_path(model_path))
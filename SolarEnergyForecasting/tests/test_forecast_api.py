@@ -0,0 +1,75 @@
+# Dashboard app: API request validation, forecast page data and cache versions
+import io
+import numpy as np
+import pytest
+
+import app
+from forecast_formats import available_formats
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+def test_posted_sites_must_be_a_list(client):
+    response = client.post('/api/forecast', json={"sites": "abc"})
+    assert response.status_code == 400
+    response = client.post('/api/forecast', json={"sites": ["a", 1]})
+    assert response.status_code == 400
+
+@pytest.mark.parametrize("sites", ["a,a", "timestamp", "a,a:p10"])
+def test_duplicate_and_reserved_site_names_are_rejected(client, sites):
+    response = client.get(f'/api/forecast?sites={sites}&format=json')
+    assert response.status_code == 400
+    assert "site names" in response.get_json()["error"]
+
+def test_arrow_has_one_column_per_site(client):
+    if 'arrow' not in available_formats():
+        pytest.skip("pyarrow is not installed")
+    import pyarrow as pa
+    response = client.post('/api/forecast', json={"sites": ["a", "b"], "days": 1, "format": "arrow",
+                                                  "quantiles": [0.1, 0.9]})
+    assert response.status_code == 200
+    table = pa.ipc.open_stream(io.BytesIO(response.data)).read_all()
+    assert table.column_names == ['timestamp', 'a', 'a:p10', 'a:p90', 'b', 'b:p10', 'b:p90']
+
+def test_bands_without_quantiles_from_the_endpoint(client, monkeypatch):
+    def point_forecast_only(sites, days, quantiles=None):
+        return 0, 3600, np.ones((len(sites), 24 * days), dtype=np.float32), {}
+    monkeypatch.setattr(app, "get_forecasts", point_forecast_only)
+    app.forecast_cache.clear()
+    response = client.get('/forecast/data?location=no_bands_site&days=1&bands=1')
+    assert response.status_code == 200
+    assert response.get_json()["quantiles"] == {}
+
+def test_snapshot_version_follows_todays_daily_blob(tmp_path, monkeypatch):
+    from datetime import datetime, timezone
+    from local_blob import LocalContainerClient
+    monkeypatch.setattr(app, "_container_client", LocalContainerClient(str(tmp_path)))
+    monkeypatch.setattr(app, "_snapshot_versions", {})
+    monkeypatch.setattr(app, "VERSION_CHECK_SECONDS", 0)
+    today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    (tmp_path / "site").mkdir()
+    (tmp_path / "site" / "2000-01-01.ndjson").write_text('{}\n')
+    assert app.snapshot_version("site") == "none"
+
+    # A legacy per-snapshot folder for today sorts after the daily blob
+    (tmp_path / "site" / today).mkdir()
+    (tmp_path / "site" / today / "10-00-00.json").write_text('{}')
+    daily = tmp_path / "site" / f"{today}.ndjson"
+    daily.write_text('{}\n')
+    version = app.snapshot_version("site")
+    assert version.startswith(f"site/{today}.ndjson@")
+
+    daily.write_text('{}\n{}\n')
+    assert app.snapshot_version("site") not in ("none", version)
+
+def test_cached_page_expires_with_the_forecast_start_hour(monkeypatch):
+    from datetime import datetime, timezone
+    builds = []
+    monkeypatch.setattr(app, "timed_forecast_page", lambda *args: builds.append(args) or {"page": len(builds)})
+    app.forecast_cache.clear()
+    for hour in (10, 10, 11):
+        start = datetime(2025, 6, 1, hour, tzinfo=timezone.utc)
+        monkeypatch.setattr(app, "forecast_start_time", lambda: start)
+        app.cached_forecast_page("hour_key_site", 1)
+    assert len(builds) == 2
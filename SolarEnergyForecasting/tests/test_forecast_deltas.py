@@ -0,0 +1,127 @@
+# Conditional forecast fetches and delta snapshots (collector.py, snapshot_store.py):
+# every snapshot read back from delta blobs must equal the one a full run stores
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+
+from collector import collect_all, fetch_conditional, get_session, HostLimiter
+from local_blob import LocalContainerClient
+from mock_weather_server import MockWeatherHandler
+from snapshot_store import encode_snapshot, parse_snapshots
+
+START = datetime(2025, 6, 1, 19, 0, tzinfo=timezone.utc)
+SITE_A = {"name": "site_a", "lat": 40.0, "lon": -100.0}
+SITE_B = {"name": "site_b", "lat": 40.0, "lon": -100.0}
+SITE_C = {"name": "site_c", "lat": 35.0, "lon": -90.0}
+
+# Hourly runs from START; `sites_at(hour)` gives the registry for each run
+def replay(root, base_url, hours, sites_at, delta_snapshots):
+    container_client = LocalContainerClient(root)
+    for hour in range(hours):
+        now = START + timedelta(hours=hour)
+        MockWeatherHandler.clock = staticmethod(now.timestamp)
+        collect_all(sites_at(hour), "test", container_client, now.isoformat(), now.strftime("%Y-%m-%d"),
+                    base_url=base_url, delta_snapshots=delta_snapshots)
+    return container_client
+
+def read_lines(container_client, blob_name):
+    return container_client.get_blob_client(blob_name).download_blob().readall().decode('utf-8').splitlines()
+
+def read_blobs(container_client):
+    return {blob.name: parse_snapshots(blob.name, "\n".join(read_lines(container_client, blob.name)))
+            for blob in container_client.list_blobs() if not blob.name.startswith("collection/")}
+
+def forecasts(blobs):
+    return {name: [(s["timestamp"], s["forecast"]) for s in snapshots] for name, snapshots in blobs.items()}
+
+def assert_same_snapshots(tmp_path, base_url, hours, sites_at):
+    full = replay(str(tmp_path / "full"), base_url, hours, sites_at, delta_snapshots=False)
+    delta = replay(str(tmp_path / "delta"), base_url, hours, sites_at, delta_snapshots=True)
+    assert forecasts(read_blobs(delta)) == forecasts(read_blobs(full))
+    return delta
+
+def test_round_trip_across_forecast_issues(tmp_path, base_url):
+    # 19:00 to 00:00: new forecast issues at 21:00 and 00:00, and a midnight
+    delta = assert_same_snapshots(tmp_path, base_url, 6, lambda hour: [SITE_A, SITE_C])
+    lines = [json.loads(line) for line in read_lines(delta, "site_a/2025-06-01.ndjson")]
+    assert "forecast" in lines[0] and all("forecast_delta" in line for line in lines[1:])
+    # 19:00 and 20:00 share an issue, so 20:00 stores no periods; 21:00 stores the new issue's
+    assert lines[1]["forecast_delta"]["changed"] == []
+    assert lines[2]["forecast_delta"]["changed"]
+
+def test_each_day_starts_with_a_full_snapshot(tmp_path, base_url):
+    delta = assert_same_snapshots(tmp_path, base_url, 7, lambda hour: [SITE_A])
+    lines = [json.loads(line) for line in read_lines(delta, "site_a/2025-06-02.ndjson")]
+    assert "forecast" in lines[0] and "forecast_delta" not in lines[0] and "forecast_delta" in lines[1]
+    # The new day's blob rebuilds on its own
+    assert all(s["forecast"] for s in parse_snapshots("site_a/2025-06-02.ndjson", "\n".join(read_lines(
+        delta, "site_a/2025-06-02.ndjson"))))
+
+def test_site_added_to_a_cell_gets_a_full_snapshot(tmp_path, base_url):
+    delta = assert_same_snapshots(tmp_path, base_url, 3, lambda hour: [SITE_A] if hour == 0 else [SITE_A, SITE_B])
+    lines_a = [json.loads(line) for line in read_lines(delta, "site_a/2025-06-01.ndjson")]
+    lines_b = [json.loads(line) for line in read_lines(delta, "site_b/2025-06-01.ndjson")]
+    assert "forecast_delta" in lines_a[1]
+    assert "forecast" in lines_b[0] and "forecast_delta" in lines_b[1]
+
+def test_failed_cell_starts_over_with_full_snapshots(tmp_path, base_url):
+    container_client = replay(str(tmp_path / "delta"), base_url, 1, lambda hour: [SITE_A], True)
+    now = START + timedelta(hours=1)
+    MockWeatherHandler.clock = staticmethod(now.timestamp)
+    saved, failed = collect_all([SITE_A], "test", container_client, now.isoformat(), now.strftime("%Y-%m-%d"),
+                                base_url=base_url + "/missing")
+    assert failed and not saved
+    replay_run = START + timedelta(hours=2)
+    MockWeatherHandler.clock = staticmethod(replay_run.timestamp)
+    collect_all([SITE_A], "test", container_client, replay_run.isoformat(), replay_run.strftime("%Y-%m-%d"),
+                base_url=base_url)
+    lines = [json.loads(line) for line in read_lines(container_client, "site_a/2025-06-01.ndjson")]
+    assert len(lines) == 2 and "forecast" in lines[1]
+
+def test_fresh_response_is_not_requested_again(base_url):
+    MockWeatherHandler.clock = staticmethod(START.timestamp)
+    session, limiter = get_session(), HostLimiter()
+    url, params = f"{base_url}/data/2.5/forecast", {"lat": 40.0, "lon": -100.0}
+    payload, entry = fetch_conditional(session, limiter, url, params, now=START.timestamp())
+    assert payload is not None and entry["expires_at"] > START.timestamp()
+
+    requests_before = MockWeatherHandler.request_count
+    payload, cached = fetch_conditional(session, limiter, url, params, cached=entry, now=START.timestamp() + 3600)
+    assert payload is None and cached == entry
+    assert MockWeatherHandler.request_count == requests_before
+
+def test_not_modified_and_same_content_count_as_unchanged(base_url):
+    MockWeatherHandler.clock = staticmethod(START.timestamp)
+    session, limiter = get_session(), HostLimiter()
+    url, params = f"{base_url}/data/2.5/forecast", {"lat": 40.0, "lon": -100.0}
+    _, entry = fetch_conditional(session, limiter, url, params, now=START.timestamp())
+
+    # Expired: revalidated with If-None-Match and answered 304
+    expired = {**entry, "expires_at": 0}
+    payload, revalidated = fetch_conditional(session, limiter, url, params, cached=expired, now=START.timestamp())
+    assert payload is None and revalidated["hash"] == entry["hash"]
+
+    # No usable validator: downloaded, but the same body by hash
+    payload, same = fetch_conditional(session, limiter, url, params, cached={**expired, "etag": '"stale"'},
+                                      now=START.timestamp())
+    assert payload is None and same["hash"] == entry["hash"]
+
+    # A new issue is downloaded
+    later = START + timedelta(hours=3)
+    MockWeatherHandler.clock = staticmethod(later.timestamp)
+    payload, _ = fetch_conditional(session, limiter, url, params, cached=expired, now=later.timestamp())
+    assert payload is not None
+
+def test_missing_base_leaves_the_forecast_empty(caplog):
+    full = {"timestamp": "t0", "location": "site_a", "forecast": [{"dt": 1, "v": 1}, {"dt": 2, "v": 2}]}
+    orphan = {"timestamp": "t2", "location": "site_a",
+              "forecast_delta": {"base": "t1", "first": 1, "last": 2, "changed": [{"dt": 2, "v": 3}]}}
+    after = {"timestamp": "t3", "location": "site_a",
+             "forecast_delta": {"base": "t2", "first": 1, "last": 2, "changed": []}}
+    rebuilt = {"timestamp": "t4", "location": "site_a",
+               "forecast_delta": {"base": "t0", "first": 2, "last": 2, "changed": []}}
+    payload = "".join(encode_snapshot(record) for record in (full, orphan, after, rebuilt))
+    with caplog.at_level(logging.WARNING):
+        records = parse_snapshots("site_a/2025-06-01.ndjson", payload)
+    assert [record["forecast"] for record in records] == [full["forecast"], [], [], [{"dt": 2, "v": 2}]]
+    assert "base snapshot t1 not found" in caplog.text
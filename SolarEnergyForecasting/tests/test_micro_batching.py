@@ -0,0 +1,57 @@
+# MicroBatcher: batching concurrent submissions and shutting down cleanly
+import threading
+import time
+import pytest
+
+from micro_batching import MicroBatcher
+
+def test_concurrent_submissions_share_a_call():
+    calls = []
+    def score_fn(requests, options):
+        calls.append(len(requests))
+        return [request * 2 for request in requests]
+
+    batcher = MicroBatcher(score_fn, max_wait_ms=200, max_batch_size=4).start()
+    results = {}
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, batcher.submit([i]))) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    batcher.stop()
+    assert results == {i: [i * 2] for i in range(4)}
+    assert calls == [4]
+
+def test_stop_fails_queued_requests_and_later_submits():
+    started, release = threading.Event(), threading.Event()
+    def score_fn(requests, options):
+        started.set()
+        release.wait(5)
+        return requests
+
+    batcher = MicroBatcher(score_fn, max_wait_ms=0, max_batch_size=1).start()
+    outcomes = []
+    def submit(request):
+        try:
+            outcomes.append(batcher.submit([request]))
+        except RuntimeError as e:
+            outcomes.append(e)
+
+    # The first request is being scored while the second waits in the queue
+    first = threading.Thread(target=submit, args=("first",))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=submit, args=("second",))
+    second.start()
+    while not batcher._pending:
+        time.sleep(0.001)
+
+    batcher.stop()
+    second.join(5)
+    release.set()
+    first.join(5)
+    assert not first.is_alive() and not second.is_alive()
+    assert isinstance(outcomes[0], RuntimeError)
+    assert outcomes[1] == ["first"]
+    with pytest.raises(RuntimeError):
+        batcher.submit(["third"])
@@ -0,0 +1,66 @@
+# precompute.py change detection: a stored forecast is kept while the weather
+# inputs it shares with the new run's window are unchanged
+from datetime import datetime, timedelta, timezone
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+import precompute
+from features import BASE_FEATURES, FeaturePipeline, feature_sidecar_path
+from local_blob import LocalContainerClient
+from snapshot_store import append_snapshot
+
+SITE = {"name": "solar_farm_1"}
+
+def save_model(tmp_path):
+    rng = np.random.default_rng(0)
+    model = RandomForestRegressor(n_estimators=5, max_depth=4, random_state=0)
+    model.fit(rng.random((200, len(BASE_FEATURES))), rng.random(200) * 100)
+    model_path = str(tmp_path / "solar_forecast_rf_model.joblib")
+    joblib.dump(model, model_path)
+    FeaturePipeline().save(feature_sidecar_path(model_path))
+    return model_path
+
+# One collection: constant weather now and over the forecast, as the collector writes it
+def collect(container_client, when, temperature=20.0):
+    first_dt = int(when.timestamp()) // 10800 * 10800 + 10800
+    weather = {"main": {"temp": temperature}, "clouds": {"all": 40}, "wind": {"speed": 4.0},
+               "weather": [{"description": "few clouds"}]}
+    append_snapshot(container_client, {
+        "timestamp": when.isoformat(),
+        "location": SITE["name"],
+        "latitude": 40.7128,
+        "longitude": -74.0060,
+        "current": {"temperature": temperature, "clouds": 40, "weather_description": "few clouds",
+                    "wind_speed": 4.0},
+        "forecast": [{"dt": first_dt + 10800 * i, **weather} for i in range(40)]
+    }, when.strftime("%Y-%m-%d"))
+
+def test_rerun_an_hour_later_with_the_same_inputs_reuses_the_forecast(tmp_path):
+    container_client = LocalContainerClient(str(tmp_path / "blobs"))
+    model_path = save_model(tmp_path)
+    hour = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) - timedelta(hours=3)
+
+    collect(container_client, hour)
+    first = precompute.precompute(container_client, [SITE], model_path, now=hour + timedelta(minutes=10))
+    assert (first["scored"], first["reused"]) == (1, 0)
+
+    # A new collection of the same forecast run, one hour later
+    collect(container_client, hour + timedelta(hours=1))
+    second = precompute.precompute(container_client, [SITE], model_path, now=hour + timedelta(hours=1, minutes=10))
+    assert (second["scored"], second["reused"], second["unchanged_blob"]) == (0, 1, 0)
+
+    # Nothing collected since: the blob check alone keeps it
+    third = precompute.precompute(container_client, [SITE], model_path, now=hour + timedelta(hours=1, minutes=20))
+    assert (third["scored"], third["unchanged_blob"]) == (0, 1)
+
+def test_changed_forecast_is_rescored(tmp_path):
+    container_client = LocalContainerClient(str(tmp_path / "blobs"))
+    model_path = save_model(tmp_path)
+    hour = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) - timedelta(hours=3)
+
+    collect(container_client, hour)
+    precompute.precompute(container_client, [SITE], model_path, now=hour + timedelta(minutes=10))
+    collect(container_client, hour + timedelta(hours=1), temperature=28.0)
+    result = precompute.precompute(container_client, [SITE], model_path, now=hour + timedelta(hours=1, minutes=10))
+    assert (result["scored"], result["reused"]) == (1, 0)
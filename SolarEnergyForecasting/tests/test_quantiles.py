@@ -0,0 +1,24 @@
+# Quantile levels shared by the scoring endpoint and the dashboard API
+import pytest
+
+from quantiles import DEFAULT_QUANTILES, parse_quantiles, quantile_name
+
+@pytest.mark.parametrize("value", [None, False, '', 'false', '0'])
+def test_no_quantiles(value):
+    assert parse_quantiles(value) is None
+
+@pytest.mark.parametrize("value", [True, 'true', '1'])
+def test_default_quantiles(value):
+    assert parse_quantiles(value) == DEFAULT_QUANTILES
+
+@pytest.mark.parametrize("value", ['0.05,0.95', [0.05, 0.95], ['0.05', '0.95']])
+def test_explicit_levels(value):
+    assert parse_quantiles(value) == (0.05, 0.95)
+
+@pytest.mark.parametrize("value", [[], 'abc', [1.5], {"p10": 0.1}, 'true,false'])
+def test_invalid_levels(value):
+    with pytest.raises(ValueError):
+        parse_quantiles(value)
+
+def test_names():
+    assert [quantile_name(q) for q in (0.1, 0.5, 0.9, 0.025)] == ['p10', 'p50', 'p90', 'p2.5']
@@ -0,0 +1,71 @@
+# Model loading and scoring in score.py
+import json
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+import score
+from features import BASE_FEATURES, FeaturePipeline, feature_sidecar_path
+from flat_forest import FlatForest, export_forest, flat_model_path
+
+def save_model(tmp_path, n_features=len(BASE_FEATURES), sidecar=True):
+    rng = np.random.default_rng(0)
+    model = RandomForestRegressor(n_estimators=5, max_depth=4, random_state=0)
+    model.fit(rng.random((200, n_features)), rng.random(200) * 100)
+    model_path = str(tmp_path / "solar_forecast_rf_model.joblib")
+    joblib.dump(model, model_path)
+    if sidecar:
+        FeaturePipeline().save(feature_sidecar_path(model_path))
+    return model, model_path
+
+def test_current_flat_export_is_preferred(tmp_path):
+    model, model_path = save_model(tmp_path)
+    export_forest(model, flat_model_path(model_path))
+    score.load_model(model_path)
+    assert isinstance(score.model, FlatForest)
+
+def test_outdated_flat_export_falls_back_to_joblib(tmp_path):
+    _, model_path = save_model(tmp_path)
+    joblib.dump({'version': 1}, flat_model_path(model_path))
+    score.load_model(model_path)
+    assert isinstance(score.model, RandomForestRegressor)
+    forecast = json.loads(score.run(json.dumps({"location": "solar_farm_1", "forecast_days": 1})))
+    assert len(forecast["forecast_values"]) == 24
+
+def test_model_without_a_sidecar_gets_the_legacy_features(tmp_path):
+    _, model_path = save_model(tmp_path, n_features=len(BASE_FEATURES) - 1, sidecar=False)
+    score.load_model(model_path)
+    assert 'clear_sky_ghi' not in score.feature_pipeline.feature_names
+    forecast = json.loads(score.run(json.dumps({"location": "solar_farm_1", "forecast_days": 1})))
+    assert len(forecast["forecast_values"]) == 24
+
+def test_invalid_requests_are_client_errors(tmp_path):
+    _, model_path = save_model(tmp_path)
+    score.load_model(model_path)
+    assert score.score_response("not json")[0] == 400
+    assert score.score_response('"abc"')[0] == 400
+    assert score.score_response(json.dumps({"location": "solar_farm_1", "forecast_days": "x"}))[0] == 400
+
+def test_scoring_failures_are_server_errors(tmp_path, monkeypatch):
+    _, model_path = save_model(tmp_path)
+    score.load_model(model_path)
+    monkeypatch.setattr(score, "predict_batch", lambda *args, **kwargs: 1 / 0)
+    status, body = score.score_response(json.dumps({"location": "solar_farm_1"}))
+    assert status == 500
+    assert "error" in json.loads(body)
+
+def test_predict_batch_reads_weather_from_the_store_passed_in(tmp_path, monkeypatch):
+    _, model_path = save_model(tmp_path)
+    score.load_model(model_path)
+    monkeypatch.setattr(score, "feature_store", None)
+    looked_up = []
+
+    class Store:
+        def lookup(self, location, timestamps):
+            looked_up.append(location)
+            return {'temperature': np.full(len(timestamps), 10.0), 'cloud_cover': np.full(len(timestamps), 90.0),
+                    'wind_speed': np.full(len(timestamps), 2.0), 'weather_description': None}
+
+    score.predict_batch([{"location": "solar_farm_1", "forecast_days": 1}], store=Store())
+    assert looked_up == ["solar_farm_1"]
+    assert score.feature_store is None
@@ -0,0 +1,34 @@
+# Retrain strategies in training.py
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+
+from training import run_strategy, warm_start_base
+
+FEATURES = ['temperature', 'cloud_cover']
+
+def hourly_frame(days, seed=0):
+    rng = np.random.default_rng(seed)
+    n = days * 24
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2025-06-01', periods=n, freq='h', tz='UTC'),
+        'temperature': rng.normal(20, 5, n),
+        'cloud_cover': rng.uniform(0, 100, n),
+        'solar_energy_kwh': rng.uniform(0, 80, n)
+    })
+
+def test_warm_start_without_a_base_model_when_all_history_fits_in_the_window():
+    df = hourly_frame(10)
+    model, report = run_strategy('warm_start', df.iloc[:200], df.iloc[200:], FEATURES,
+                                 window_days=14, trees_per_update=5, rf_params={'n_estimators': 10})
+    assert len(model.estimators_) == 15
+    assert np.isfinite(report['mae'])
+
+def test_only_a_forest_on_the_same_features_is_a_warm_start_base(capsys):
+    df = hourly_frame(3)
+    forest = RandomForestRegressor(n_estimators=3).fit(df[FEATURES], df['solar_energy_kwh'])
+    boosted = HistGradientBoostingRegressor(max_iter=5).fit(df[FEATURES], df['solar_energy_kwh'])
+    assert warm_start_base(forest, FEATURES) is forest
+    assert warm_start_base(forest, FEATURES + ['wind_speed']) is None
+    assert warm_start_base(boosted, FEATURES) is None
+    assert "HistGradientBoostingRegressor" in capsys.readouterr().out
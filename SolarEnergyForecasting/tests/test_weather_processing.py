@@ -0,0 +1,39 @@
+# clean_weather_data: observation dedup and forecast policies
+import numpy as np
+import pandas as pd
+
+from weather_processing import clean_weather_data
+
+def weather_rows(rows):
+    return pd.DataFrame([{
+        'timestamp': pd.Timestamp(timestamp, tz='UTC'),
+        'location': 'solar_farm_1',
+        'temperature': temperature,
+        'cloud_cover': 20.0,
+        'wind_speed': 3.0,
+        'weather_description': 'clear sky',
+        'is_forecast': is_forecast,
+        'issue_time': pd.Timestamp(issue_time or timestamp, tz='UTC')
+    } for timestamp, temperature, is_forecast, issue_time in rows])
+
+def test_one_observation_per_hour_the_last_collected():
+    weather_df = weather_rows([
+        ('2025-06-01 10:00:05', 20.0, False, None),
+        ('2025-06-01 10:30:00', 21.0, False, None),
+        ('2025-06-01 10:59:59', 22.0, False, None),
+        ('2025-06-01 11:00:02', 23.0, False, None),
+    ])
+    observations = clean_weather_data(weather_df)
+    assert observations['temperature'].tolist() == [22.0, 23.0]
+    assert observations['timestamp'].tolist() == [pd.Timestamp('2025-06-01 10:59:59', tz='UTC'),
+                                                  pd.Timestamp('2025-06-01 11:00:02', tz='UTC')]
+
+def test_freshest_forecast_per_target_hour():
+    weather_df = weather_rows([
+        ('2025-06-01 12:00', 25.0, True, '2025-06-01 06:00'),
+        ('2025-06-01 12:00', 26.0, True, '2025-06-01 09:00'),
+    ])
+    forecasts = clean_weather_data(weather_df)
+    assert forecasts['temperature'].tolist() == [26.0]
+    lead_times = clean_weather_data(weather_df, forecast_policy='lead_time')['lead_time_hours']
+    assert np.allclose(lead_times, [6, 3])